@@ -0,0 +1,203 @@
+# bench/dataset.py
+"""
+benchmark 用的合成 Postgres 数据集。每个规模一个独立的库（wq_bench_1k / wq_bench_100k / wq_bench_1m），
+灌一次之后按 (n_alphas, seed) 复用，不会碰正式的 wq 库。
+
+数据和 fake_wq 服务的是同一套（bench.synthetic.alpha_doc，id 前缀 B），
+写的是 ingestion 会写的那几张表：
+    wq_alpha / wq_backtest_metrics（EAV）/ wq_alpha_metrics_wide / alpha_backtest_results / wq_expression
+
+1M 个 alpha 的 EAV 是 2400 万行，第一次灌要几分钟。
+"""
+import io
+import json
+import time
+from typing import Dict, Iterable, List, Sequence
+
+import psycopg2
+from psycopg2 import sql
+
+from bench.synthetic import alpha_doc, alpha_id
+from dump_wq_alphas_to_postgres import _parse_alpha, ensure_metrics_unique, parse_backtest_metrics
+from fingerprint import EXPRESSION_TABLE, ensure_fingerprint_schema
+from metrics_wide import METRIC_COLUMNS, WIDE_TABLE, ensure_wide_table
+from sim.compiler import canonical_text, hash_canonical
+from tools.get_backtest_metrics import ensure_backtest_results_index
+from tools.list_alphas import ensure_alpha_list_index
+from tools.sim_jobs import ensure_sim_results_columns
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+
+# 正式库里这几张表是预先建好的；这里按代码里读写到的列建最小版本
+BASE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS wq_alpha (
+        alpha_id        TEXT PRIMARY KEY,
+        expression      TEXT,
+        universe        TEXT,
+        region          TEXT,
+        delay           INTEGER,
+        neutralization  TEXT,
+        created_at      TIMESTAMPTZ
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS wq_backtest_metrics (
+        alpha_id      TEXT NOT NULL,
+        metric_name   TEXT NOT NULL,
+        metric_value  DOUBLE PRECISION,
+        period        TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS alpha_backtest_results (
+        alpha_id      TEXT NOT NULL,
+        sharpe        DOUBLE PRECISION,
+        fitness       DOUBLE PRECISION,
+        turnover      DOUBLE PRECISION,
+        max_drawdown  DOUBLE PRECISION,
+        margin        DOUBLE PRECISION,
+        updated_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bench_dataset (
+        id         INTEGER PRIMARY KEY DEFAULT 1,
+        n_alphas   INTEGER NOT NULL,
+        seed       INTEGER NOT NULL,
+        seeded_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+]
+
+TABLES = ["wq_alpha", "wq_backtest_metrics", WIDE_TABLE, "alpha_backtest_results", EXPRESSION_TABLE]
+
+_ALPHA_COLUMNS = ["alpha_id", "expression", "universe", "region", "delay", "neutralization",
+                  "created_at", "fingerprint", "settings"]
+_WIDE_COLUMNS = ["alpha_id", "region", "universe", "delay", "neutralization", "created_at"] + METRIC_COLUMNS
+_RESULT_COLUMNS = ["alpha_id", "expression", "sharpe", "fitness", "turnover", "max_drawdown", "margin"]
+
+
+def parse_size(size: str) -> int:
+    if size in SIZES:
+        return SIZES[size]
+    s = size.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s.rstrip("km")) * mult)
+
+
+def database_name(size: str) -> str:
+    return f"wq_bench_{size.lower()}"
+
+
+def ensure_database(name: str, **connect_kwargs) -> None:
+    """库不存在就建（连到 postgres 库上执行 CREATE DATABASE）。"""
+    conn = psycopg2.connect(**{**connect_kwargs, "dbname": "postgres"})
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+            if cur.fetchone() is None:
+                cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+    finally:
+        conn.close()
+
+
+def _copy(cur, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> None:
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join("\\N" if v is None else str(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def ensure_schema(conn) -> None:
+    with conn.cursor() as cur:
+        for ddl in BASE_DDL:
+            cur.execute(ddl)
+        ensure_metrics_unique(conn, cur)
+        ensure_wide_table(cur)
+        ensure_alpha_list_index(cur)
+        ensure_backtest_results_index(cur)
+        ensure_fingerprint_schema(cur)
+        ensure_sim_results_columns(cur)
+    conn.commit()
+
+
+def seeded(conn, n_alphas: int, seed: int) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT n_alphas, seed FROM bench_dataset WHERE id = 1")
+        row = cur.fetchone()
+    if row is None:
+        return False
+    if isinstance(row, dict):
+        row = (row["n_alphas"], row["seed"])
+    return tuple(row) == (n_alphas, seed)
+
+
+def seed_dataset(conn, n_alphas: int, seed: int = 0, chunk: int = 50_000, force: bool = False) -> bool:
+    """
+    灌 n_alphas 个合成 alpha；已经是同样的 (n_alphas, seed) 就直接返回 False。
+    """
+    ensure_schema(conn)
+    if not force and seeded(conn, n_alphas, seed):
+        return False
+
+    t0 = time.time()
+    fingerprints: Dict[str, tuple] = {}
+    with conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {', '.join(TABLES)}")
+        cur.execute("DELETE FROM bench_dataset")
+
+        for start in range(0, n_alphas, chunk):
+            alphas, metrics, wide, results = [], [], [], []
+            for i in range(start, min(start + chunk, n_alphas)):
+                doc = alpha_doc(seed, i, "B")
+                a = _parse_alpha(doc)
+                m = parse_backtest_metrics(doc)
+
+                expr = a["expression"]
+                if expr not in fingerprints:
+                    canonical = canonical_text(expr)
+                    fingerprints[expr] = (hash_canonical(canonical), canonical, a["alpha_id"])
+                fp = fingerprints[expr][0]
+
+                alphas.append((a["alpha_id"], expr, a["universe"], a["region"], a["delay"],
+                               a["neutralization"], a["created_at"], fp,
+                               json.dumps(a["settings"], sort_keys=True)))
+                metrics.extend((a["alpha_id"], k, v, "full") for k, v in m.items())
+                wide.append([a["alpha_id"], a["region"], a["universe"], a["delay"],
+                             a["neutralization"], a["created_at"]] + [m.get(c) for c in METRIC_COLUMNS])
+                results.append((a["alpha_id"], expr, m["is_ic_sharpe"], m["is_ic_fitness"],
+                                m["is_ic_turnover"], m["is_ic_drawdown"], m["is_ic_margin"]))
+
+            _copy(cur, "wq_alpha", _ALPHA_COLUMNS, alphas)
+            _copy(cur, "wq_backtest_metrics", ["alpha_id", "metric_name", "metric_value", "period"], metrics)
+            _copy(cur, WIDE_TABLE, _WIDE_COLUMNS, wide)
+            _copy(cur, "alpha_backtest_results", _RESULT_COLUMNS, results)
+            conn.commit()
+            print(f"  seeded {min(start + chunk, n_alphas)}/{n_alphas} alphas")
+
+        # 不同写法可能是同一个指纹，只留最先出现的
+        expressions: Dict[str, tuple] = {}
+        for row in fingerprints.values():
+            expressions.setdefault(row[0], row)
+        _copy(cur, EXPRESSION_TABLE, ["fingerprint", "canonical", "first_alpha_id"], expressions.values())
+        cur.execute("INSERT INTO bench_dataset (id, n_alphas, seed) VALUES (1, %s, %s)", (n_alphas, seed))
+        conn.commit()
+
+    # 统计信息要跟上，不然 planner 按空表估计
+    old = conn.autocommit
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        for table in TABLES:
+            cur.execute(f"ANALYZE {table}")
+    conn.autocommit = old
+
+    print(f"  seeded {n_alphas} alphas in {time.time() - t0:.1f}s")
+    return True
+
+
+def sample_ids(n_alphas: int, k: int, rng) -> List[str]:
+    return [alpha_id("B", rng.randrange(n_alphas)) for _ in range(k)]
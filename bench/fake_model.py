@@ -0,0 +1,86 @@
+# bench/fake_model.py
+"""
+脚本化的模型替身：接口和 OpenAI client 的 responses.create 一样，
+按脚本每轮吐出固定的一组 function_call，脚本走完返回最终文本。
+用来在不打模型的情况下跑 run_agent 的循环（调度、工具、数据库）。
+
+    client = ScriptedModel(SCRIPTS["research"], latency=0.5)
+    resp = run_agent._loop(client, dispatcher)
+"""
+import itertools
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+from bench.synthetic import alpha_id
+
+Turn = List[Tuple[str, Dict[str, Any]]]
+
+_CUTOFF_INPUT = {
+    "alpha_id": "B0000001",
+    "alpha_context": {"region": "USA", "universe": "TOP3000"},
+    "metrics": {"fitness": 1.3, "sharpe": 1.7, "turnover": 0.3, "sub_universe_sharpe": 0.9},
+    "cutoff_policy": {"allow_soft_fail": True},
+}
+
+# 固定的工具调用序列；参数里的 alpha id 都在 bench.dataset 灌的数据里（所有规模都有前 1000 个）
+SCRIPTS: Dict[str, List[Turn]] = {
+    # 纯计算，不需要数据库
+    "cutoff": [
+        [("resolve_cutoff", {"input": {**_CUTOFF_INPUT, "alpha_id": alpha_id("B", i)}}) for i in range(4)],
+        [("resolve_cutoff", {"input": {**_CUTOFF_INPUT, "alpha_context": {"region": "CHN"}}})],
+    ],
+    "research": [
+        [
+            ("rank_alphas", {"metric": "fitness", "region": "USA", "limit": 20}),
+            ("rank_alphas", {"weights": {"sharpe": 1.0, "fitness": 1.0, "turnover": -1.0},
+                             "region": "EUR", "limit": 20}),
+            ("list_alphas_db", {"limit": 50, "region": "USA"}),
+        ],
+        [
+            ("get_backtest_metrics_batch", {"alpha_ids": [alpha_id("B", i) for i in range(0, 1000, 25)]}),
+            ("lookup_expression", {"expression": "rank(ts_mean(close, 20))", "region": "USA"}),
+            ("screen_alphas", {"region": "USA", "limit": 50}),
+        ],
+        [
+            ("rank_alphas", {"pareto": True, "region": "USA", "universe": "TOP500", "limit": 50}),
+        ],
+    ],
+}
+
+
+class ScriptedModel:
+    """替代 OpenAI()：client.responses.create(...) 依次返回脚本里的每一轮。"""
+
+    def __init__(self, script: List[Turn], final_text: str = "done", latency: float = 0.0,
+                 tokens: Tuple[int, int] = (2000, 300)):
+        self.script = script
+        self.final_text = final_text
+        self.latency = latency
+        self.tokens = tokens
+        self.responses = self
+        self._turn = 0
+        self._ids = itertools.count(1)
+
+    def create(self, **kwargs) -> SimpleNamespace:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        output = []
+        if self._turn < len(self.script):
+            for name, args in self.script[self._turn]:
+                output.append(SimpleNamespace(
+                    type="function_call",
+                    call_id=f"call_{next(self._ids)}",
+                    name=name,
+                    arguments=json.dumps(args),
+                ))
+        self._turn += 1
+
+        return SimpleNamespace(
+            id=f"resp_{self._turn}",
+            output=output,
+            output_text="" if output else self.final_text,
+            usage=SimpleNamespace(input_tokens=self.tokens[0], output_tokens=self.tokens[1]),
+        )
@@ -0,0 +1,196 @@
+# bench/fake_wq.py
+"""
+本地的 WQ API 替身，离线跑 ingestion benchmark 用。
+
+    POST /authentication                      200
+    GET  /users/self/alphas?limit=&offset=    {"count", "results"}，按 -dateCreated
+    GET  /alphas/{id}                         合成的详情文档（bench/synthetic.alpha_doc）
+    GET  /alphas/{id}/recordsets/pnl          累计 PnL recordset
+
+每个请求先睡 latency * (1 ± jitter) 秒；throttle 是随机回 429（Retry-After: 0）的比例。
+HTTP/1.1 keep-alive，和真实 API 一样能复用连接。
+
+单独起一个给手动测试用：
+    python -m bench.fake_wq --alphas 5000 --latency 0.05 --port 8080
+    WQ_API_BASE=http://127.0.0.1:8080 python dump_wq_alphas_to_postgres.py
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+from bench.synthetic import EPOCH, alpha_doc, alpha_index
+
+_ALPHA = re.compile(r"^/alphas/([^/]+)$")
+_RECORDSET = re.compile(r"^/alphas/([^/]+)/recordsets/([^/]+)$")
+
+
+class FakeWQServer:
+    def __init__(self, n_alphas: int, latency: float = 0.02, jitter: float = 0.5,
+                 throttle: float = 0.0, seed: int = 0, prefix: str = "ING",
+                 host: str = "127.0.0.1", port: int = 0, pnl_days: int = 1008):
+        self.n_alphas = n_alphas
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = throttle
+        self.seed = seed
+        self.prefix = prefix
+        self.pnl_days = pnl_days
+        self.stats: Counter = Counter()
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeWQServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name="fake-wq")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeWQServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---------- 响应 ----------
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _delay_and_throttle(self) -> bool:
+        """睡一段模拟延迟；返回 True 表示这次回 429。"""
+        with self._lock:
+            delay = self.latency * (1 + self.jitter * (2 * self._rng.random() - 1))
+            throttled = self._rng.random() < self.throttle
+        if delay > 0:
+            time.sleep(delay)
+        return throttled
+
+    def _page(self, query: str) -> Any:
+        q = parse_qs(query)
+        limit = int(q.get("limit", ["100"])[0])
+        offset = int(q.get("offset", ["0"])[0])
+        stop = min(offset + limit, self.n_alphas)
+        results = []
+        for i in range(offset, stop):
+            doc = alpha_doc(self.seed, i, self.prefix)
+            results.append({k: doc[k] for k in ("id", "type", "dateCreated", "settings", "regular")})
+        return {"count": self.n_alphas, "results": results}
+
+    def _alpha(self, alpha_id: str) -> Optional[Any]:
+        try:
+            i = alpha_index(self.prefix, alpha_id)
+        except ValueError:
+            return None
+        if not 0 <= i < self.n_alphas:
+            return None
+        return alpha_doc(self.seed, i, self.prefix)
+
+    def _pnl(self, alpha_id: str) -> Optional[Any]:
+        doc = self._alpha(alpha_id)
+        if doc is None:
+            return None
+        rng = random.Random(self.seed * 7919 + alpha_index(self.prefix, alpha_id))
+        start = EPOCH.date() - timedelta(days=int(self.pnl_days * 7 / 5))
+        records, total, day = [], 0.0, start
+        while len(records) < self.pnl_days:
+            if day.weekday() < 5:
+                total += rng.gauss(500.0, 10000.0)
+                records.append([day.isoformat(), round(total, 2)])
+            day += timedelta(days=1)
+        return {
+            "schema": {"properties": [{"name": "date"}, {"name": "pnl"}]},
+            "records": records,
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: Any, headers: Optional[dict] = None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.headers.get("Content-Length"):
+                    self.rfile.read(int(self.headers["Content-Length"]))
+                server._count("auth")
+                self._send(200, {"user": {"id": "bench"}})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if server._delay_and_throttle():
+                    server._count("throttled")
+                    return self._send(429, {"detail": "throttled"}, {"Retry-After": "0"})
+
+                if url.path == "/users/self/alphas":
+                    server._count("pages")
+                    return self._send(200, server._page(url.query))
+
+                m = _ALPHA.match(url.path)
+                if m:
+                    server._count("details")
+                    doc = server._alpha(m.group(1))
+                    return self._send(200, doc) if doc else self._send(404, {"detail": "Not found."})
+
+                m = _RECORDSET.match(url.path)
+                if m and m.group(2) == "pnl":
+                    server._count("recordsets")
+                    doc = server._pnl(m.group(1))
+                    return self._send(200, doc) if doc else self._send(404, {"detail": "Not found."})
+
+                self._send(404, {"detail": "Not found."})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alphas", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--throttle", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    srv = FakeWQServer(args.alphas, latency=args.latency, jitter=args.jitter,
+                       throttle=args.throttle, seed=args.seed, port=args.port)
+    print(f"Serving {args.alphas} synthetic alphas on {srv.base_url}")
+    try:
+        srv._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,394 @@
+# bench/run.py
+"""
+离线 benchmark：ingestion、查询工具、agent 循环。每个场景输出吞吐和 p50 / p99 延迟（JSON），
+再和存下来的 baseline 比较，超出容忍度的算回归，退出码 1。
+
+    python -m bench.run                                   # 全部场景，1k 数据集
+    python -m bench.run --sizes 1k,100k,1M --scenarios tools,agent
+    python -m bench.run --save-baseline                   # 把这次结果存成 baseline
+    python -m bench.run --tolerance 0.25                  # 和 bench/baseline.json 比较
+
+需要一个本地 Postgres（PG_HOST / PG_PORT / PG_USER / PG_PASSWORD，docker-compose.yml 里那个就行）。
+数据集灌在 wq_bench_<size> 库里，ingestion 写 wq_bench_ingest，都不碰 PG_DB。
+WQ API（bench.fake_wq）和模型（bench.fake_model）都是本地替身，不联网；同一个 --seed 数据完全一样。
+
+场景：
+    ingest.<thread|async>   dump_alphas 对着 fake_wq 全量拉取入库；吞吐是 alpha/s，延迟是单个详情请求
+    tools.<tool>@<size>     查询工具在各规模数据集上的单次调用
+    agent.<script>[@size]   run_agent 的循环跑一遍脚本（fake model + 真实工具和数据库）
+"""
+import contextlib
+import importlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+import db
+import instrument
+from bench import dataset
+from bench.fake_model import SCRIPTS, ScriptedModel
+from bench.fake_wq import FakeWQServer
+from bench.synthetic import REGIONS, UNIVERSES, expression
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_OUT = os.path.join(os.path.dirname(__file__), "results", "latest.json")
+
+# 越低越好 / 越高越好
+LOWER_IS_BETTER = ("p50_ms", "p99_ms")
+HIGHER_IS_BETTER = ("throughput",)
+
+Results = Dict[str, Dict[str, Any]]
+
+
+def _stats(latencies: List[float], elapsed: float, items: Optional[int] = None, errors: int = 0) -> Dict[str, Any]:
+    lat = np.asarray(latencies) * 1000.0
+    n = items if items is not None else len(latencies)
+    return {
+        "n": n,
+        "errors": errors,
+        "throughput": n / elapsed if elapsed > 0 else None,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+        "mean_ms": float(lat.mean()) if len(lat) else None,
+    }
+
+
+def _failed(output: Any) -> bool:
+    return isinstance(output, dict) and output.get("ok") is False
+
+
+def _breakdown() -> Dict[str, Any]:
+    """--instrument 时附上每一层的耗时（instrument 的直方图），看回归出在哪一层。"""
+    out = {}
+    for h in instrument.snapshot()["histograms"]:
+        labels = ",".join(f"{k}={v}" for k, v in h["labels"].items())
+        out[h["name"] + (f"{{{labels}}}" if labels else "")] = {"count": h["count"], "sum": h["sum"]}
+    return out
+
+
+def _record(results: Results, key: str, stats: Dict[str, Any]) -> None:
+    if instrument.enabled():
+        stats["breakdown"] = _breakdown()
+        instrument.reset()
+    results[key] = stats
+    p50 = f"{stats['p50_ms']:.1f}" if stats["p50_ms"] is not None else "-"
+    p99 = f"{stats['p99_ms']:.1f}" if stats["p99_ms"] is not None else "-"
+    print(f"{key:<44} n={stats['n']:<6} err={stats['errors']:<4} "
+          f"thr={stats['throughput'] or 0:>9.1f}/s p50={p50:>8}ms p99={p99:>8}ms")
+
+
+# ========== 数据库 ==========
+
+def _pg_kwargs() -> Dict[str, Any]:
+    return {
+        "host": os.getenv("PG_HOST", "localhost"),
+        "port": os.getenv("PG_PORT", 5432),
+        "user": os.getenv("PG_USER", "postgres"),
+        "password": os.getenv("PG_PASSWORD", "postgres"),
+    }
+
+
+def _use_database(name: str) -> None:
+    """工具走 db.pg_conn()，按 PG_DB 连；切库时把旧连接池关掉。"""
+    dataset.ensure_database(name, **_pg_kwargs())
+    os.environ["PG_DB"] = name
+    db.close_pool()
+
+
+def _prepare_dataset(size: str, seed: int) -> int:
+    n = dataset.parse_size(size)
+    _use_database(dataset.database_name(size))
+    conn = db.get_pg_conn()
+    try:
+        if dataset.seed_dataset(conn, n, seed):
+            print(f"Seeded {dataset.database_name(size)}")
+    finally:
+        conn.close()
+    return n
+
+
+# ========== 场景 ==========
+
+def _call(fn: Callable, kwargs: Dict[str, Any]) -> bool:
+    """调一次；返回 False 表示出错（抛异常或 ok: False），不让一个工具的错误中断整个 benchmark。"""
+    try:
+        return not _failed(fn(**kwargs))
+    except Exception:
+        return False
+
+
+def _time_calls(fn: Callable, calls: List[Dict[str, Any]], warmup: int = 2) -> Dict[str, Any]:
+    errors = sum(not _call(fn, kwargs) for kwargs in calls[:warmup])
+    instrument.reset()
+
+    latencies = []
+    t0 = time.perf_counter()
+    for kwargs in calls:
+        t = time.perf_counter()
+        if not _call(fn, kwargs):
+            errors += 1
+        latencies.append(time.perf_counter() - t)
+    return _stats(latencies, time.perf_counter() - t0, errors=errors)
+
+
+def bench_tools(results: Results, size: str, n: int, seed: int, reps: int) -> None:
+    from registry import TOOL_REGISTRY as tools
+
+    rng = random.Random(seed)
+    cases = {
+        "rank_alphas.metric": [
+            {"metric": rng.choice(["fitness", "sharpe"]), "region": rng.choice(REGIONS), "limit": 20}
+            for _ in range(reps)
+        ],
+        "rank_alphas.weighted": [
+            {"weights": {"sharpe": 1.0, "fitness": 1.0, "turnover": -rng.uniform(0.5, 2.0)},
+             "region": rng.choice(REGIONS), "limit": 20}
+            for _ in range(reps)
+        ],
+        # 全表流式，单次就慢，少跑几次
+        "rank_alphas.pareto": [
+            {"pareto": True, "region": rng.choice(REGIONS), "universe": rng.choice(UNIVERSES)}
+            for _ in range(max(3, reps // 10))
+        ],
+        "list_alphas_db": [
+            {"limit": 100, "region": rng.choice(REGIONS)} for _ in range(reps)
+        ],
+        "screen_alphas": [
+            {"region": rng.choice(REGIONS), "limit": 100} for _ in range(reps)
+        ],
+        "get_backtest_metrics_batch": [
+            {"alpha_ids": dataset.sample_ids(n, 200, rng)} for _ in range(reps)
+        ],
+        "lookup_expression": [
+            {"expression": expression(rng), "region": rng.choice(REGIONS)} for _ in range(reps)
+        ],
+    }
+    for name, calls in cases.items():
+        tool = name.split(".")[0]
+        _record(results, f"tools.{name}@{size}", _time_calls(tools[tool], calls))
+
+
+def bench_agent(results: Results, script: str, key: str, reps: int, model_latency: float) -> None:
+    import run_agent
+    from registry import TOOL_POLICIES, TOOL_REGISTRY
+    from tool_dispatch import ToolDispatcher, ToolMemo
+
+    latencies, errors = [], 0
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        # 每次一个新 session：memo 不跨 run 复用
+        dispatcher = ToolDispatcher(TOOL_REGISTRY, TOOL_POLICIES, memo=ToolMemo())
+        run = dispatcher.run
+
+        def counted(calls, run=run):
+            nonlocal errors
+            out = run(calls)
+            errors += sum(1 for r in out if not r.ok or _failed(r.output))
+            return out
+
+        dispatcher.run = counted
+        t = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_agent._loop(ScriptedModel(SCRIPTS[script], latency=model_latency), dispatcher)
+        except Exception:
+            errors += 1
+        finally:
+            dispatcher.shutdown()
+        latencies.append(time.perf_counter() - t)
+    _record(results, key, _stats(latencies, time.perf_counter() - t0, errors=errors))
+
+
+def bench_ingest(results: Results, n: int, latency: float, throttle: float, workers: int,
+                 seed: int, modes: List[str]) -> None:
+    name = "wq_bench_ingest"
+    _use_database(name)
+    conn = db.get_pg_conn()
+    try:
+        dataset.ensure_schema(conn)
+    finally:
+        conn.close()
+
+    with FakeWQServer(n, latency=latency, throttle=throttle, seed=seed) as srv:
+        os.environ.update({
+            "WQ_API_BASE": srv.base_url,
+            "WQ_USERNAME": "bench",
+            "WQ_PASSWORD": "bench",
+            "PAGE_SLEEP": "0",
+            "SLEEP_BETWEEN_BATCH": "0",
+            "POSTGRES_DSN": " ".join(f"{k}={v}" for k, v in {**_pg_kwargs(), "dbname": name}.items()),
+        })
+        os.environ.pop("WQ_CACHE_PATH", None)
+
+        # 模块级的配置在 import 时读环境变量
+        import dump_wq_alphas_to_postgres as dump
+        dump = importlib.reload(dump)
+
+        for mode in modes:
+            if mode == "async" and importlib.util.find_spec("aiohttp") is None:
+                print("ingest.async skipped: aiohttp not installed")
+                continue
+
+            conn = db.get_pg_conn()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(f"TRUNCATE {', '.join(dataset.TABLES)}")
+                conn.commit()
+            finally:
+                conn.close()
+
+            latencies: List[float] = []
+            get, aget = dump.get_backtest_metrics, dump.aget_backtest_metrics
+
+            def timed_get(wq, alpha_id):
+                t = time.perf_counter()
+                try:
+                    return get(wq, alpha_id)
+                finally:
+                    latencies.append(time.perf_counter() - t)
+
+            async def timed_aget(wq, alpha_id):
+                t = time.perf_counter()
+                try:
+                    return await aget(wq, alpha_id)
+                finally:
+                    latencies.append(time.perf_counter() - t)
+
+            dump.get_backtest_metrics, dump.aget_backtest_metrics = timed_get, timed_aget
+            dump.FETCH_MODE = mode
+            instrument.reset()
+            t0 = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    dump.dump_alphas(workers=workers, rps=0)
+            finally:
+                dump.get_backtest_metrics, dump.aget_backtest_metrics = get, aget
+            elapsed = time.perf_counter() - t0
+            _record(results, f"ingest.{mode}", _stats(latencies, elapsed, items=n))
+
+
+# ========== baseline ==========
+
+def compare(current: Results, baseline: Results, tolerance: float) -> List[Dict[str, Any]]:
+    """逐个场景、逐个指标和 baseline 比；两边都有的才比。"""
+    rows = []
+    for key, cur in current.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            b, c = base.get(metric), cur.get(metric)
+            if not b or c is None:
+                continue
+            change = (c - b) / b
+            worse = change > tolerance if metric in LOWER_IS_BETTER else change < -tolerance
+            rows.append({"scenario": key, "metric": metric, "baseline": b, "current": c,
+                         "change": change, "regression": worse})
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline benchmarks for ingestion, tools and the agent loop")
+    parser.add_argument("--scenarios", default="ingest,tools,agent")
+    parser.add_argument("--sizes", default="1k", help="dataset sizes for tools / agent, e.g. 1k,100k,1M")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reps", type=int, default=50, help="calls per tool case")
+    parser.add_argument("--agent-reps", type=int, default=10)
+    parser.add_argument("--model-latency", type=float, default=0.0, help="seconds per fake model call")
+    parser.add_argument("--ingest-alphas", type=int, default=2000)
+    parser.add_argument("--ingest-workers", type=int, default=16)
+    parser.add_argument("--ingest-modes", default="thread,async")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake WQ API latency per request (s)")
+    parser.add_argument("--throttle", type=float, default=0.0, help="fraction of fake WQ responses that are 429")
+    parser.add_argument("--instrument", action="store_true", help="attach per-layer timing to each scenario")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    scenarios = set(args.scenarios.split(","))
+    sizes = [s for s in args.sizes.split(",") if s]
+    if args.instrument:
+        instrument.enable()
+
+    results: Results = {}
+    if "ingest" in scenarios:
+        bench_ingest(results, args.ingest_alphas, args.latency, args.throttle, args.ingest_workers,
+                     args.seed, args.ingest_modes.split(","))
+    if "agent" in scenarios:
+        bench_agent(results, "cutoff", "agent.cutoff", args.agent_reps, args.model_latency)
+    for size in sizes:
+        if not scenarios & {"tools", "agent"}:
+            break
+        n = _prepare_dataset(size, args.seed)
+        if "tools" in scenarios:
+            bench_tools(results, size, n, args.seed, args.reps)
+        if "agent" in scenarios:
+            bench_agent(results, "research", f"agent.research@{size}", args.agent_reps, args.model_latency)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    rows = compare(results, baseline, args.tolerance)
+    report["comparison"] = rows
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    regressions = [r for r in rows if r["regression"]]
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else ""
+        print(f"{r['scenario']:<44} {r['metric']:<10} {r['baseline']:>10.2f} -> {r['current']:>10.2f} "
+              f"({r['change']:+.0%}) {flag}")
+    print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
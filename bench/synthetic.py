@@ -0,0 +1,85 @@
+# bench/synthetic.py
+"""
+合成 alpha 的公共定义：fake_wq 服务的详情文档和 dataset 灌进 Postgres 的行用同一套取值范围。
+给定 (seed, i) 结果是确定的，两次跑出来的数据完全一样。
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from metrics_wide import FIELDS
+
+REGIONS = ["USA", "CHN", "EUR", "ASI", "GLB"]
+UNIVERSES = ["TOP3000", "TOP1000", "TOP500", "TOP200"]
+NEUTRALIZATIONS = ["MARKET", "INDUSTRY", "SUBINDUSTRY", "SECTOR", "NONE"]
+DELAYS = [0, 1]
+
+DATA_FIELDS = ["close", "open", "high", "low", "vwap", "volume", "returns", "cap"]
+TEMPLATES = [
+    "rank(ts_mean({f}, {w}))",
+    "-ts_delta({f}, {w})",
+    "ts_rank({f}, {w}) - ts_rank({g}, {w})",
+    "group_neutralize(rank(ts_std_dev({f}, {w})), industry)",
+    "rank({f} / ts_mean({g}, {w}))",
+    "ts_mean({f}, {w}) * rank({g})",
+]
+WINDOWS = [3, 5, 10, 20, 40, 60, 120, 250]
+
+# 最新的 alpha 的创建时间；第 i 个比它早 i 分钟，列表接口按 -dateCreated 就是 i 升序
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def alpha_id(prefix: str, i: int) -> str:
+    return f"{prefix}{i:07d}"
+
+
+def alpha_index(prefix: str, alpha_id_: str) -> int:
+    if not alpha_id_.startswith(prefix):
+        raise ValueError(alpha_id_)
+    return int(alpha_id_[len(prefix):])
+
+
+def expression(rng: random.Random) -> str:
+    f, g = rng.sample(DATA_FIELDS, 2)
+    return rng.choice(TEMPLATES).format(f=f, g=g, w=rng.choice(WINDOWS))
+
+
+def metric_block(rng: random.Random) -> Dict[str, float]:
+    """一组 FIELDS 指标（sharpe / fitness / turnover / returns / drawdown / margin）。"""
+    sharpe = rng.gauss(1.0, 0.8)
+    turnover = rng.uniform(0.01, 0.8)
+    returns = rng.gauss(0.08, 0.06)
+    values = {
+        "sharpe": sharpe,
+        "fitness": sharpe * abs(returns) ** 0.5 / max(turnover, 0.125) ** 0.5,
+        "turnover": turnover,
+        "returns": returns,
+        "drawdown": abs(rng.gauss(0.08, 0.05)),
+        "margin": rng.gauss(0.0008, 0.0005),
+    }
+    return {k: values[k] for k in FIELDS}
+
+
+def alpha_doc(seed: int, i: int, prefix: str = "B") -> Dict[str, Any]:
+    """一个 /alphas/{id} 详情文档（列表页里的条目是同一个结构）。"""
+    rng = random.Random(seed * 1_000_003 + i)
+    return {
+        "id": alpha_id(prefix, i),
+        "type": "REGULAR",
+        "dateCreated": (EPOCH - timedelta(minutes=i)).isoformat().replace("+00:00", "Z"),
+        "settings": {
+            "region": rng.choice(REGIONS),
+            "universe": rng.choice(UNIVERSES),
+            "delay": rng.choice(DELAYS),
+            "neutralization": rng.choice(NEUTRALIZATIONS),
+        },
+        "regular": {"code": expression(rng)},
+        "is": {
+            "investabilityConstrained": metric_block(rng),
+            "riskNeutralized": metric_block(rng),
+        },
+        "test": {
+            "investabilityConstrained": metric_block(rng),
+            "riskNeutralized": metric_block(rng),
+        },
+    }
@@ -0,0 +1,235 @@
+# correlation.py
+"""
+自相关检查：候选 alpha 的日 PnL（每日盈亏，不是累计曲线）和已提交池子里每个 alpha 的相关系数，取最大值。
+
+池子是一个 float32 矩阵 Z (n_alphas × W)，W 是池子日期轴的长度（比如最近 4 年的交易日）。
+每行在入池时就标准化：去均值、除以 sqrt(sum(dev²))，缺失的日子记 0。
+于是 corr(a, b) = Z[a] · z_b，一个候选对整个池子就是一次矩阵-向量乘，
+多个候选就是一次矩阵-矩阵乘；按行分块（block_rows），每块 Z 留在缓存里。
+
+缺失日按 0 处理是近似：两个序列重叠的日子不同时，和只在重叠日上算的 Pearson 有偏差，
+对日度 PnL、重叠 4 年的情况可以忽略。
+
+池子文件（CORR_POOL_PATH）是 CorrelationPool.save 写出的 .npz。
+"""
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+MIN_OVERLAP = 60  # 至少这么多个有效交易日才算相关系数
+
+
+class CorrelationPool:
+    def __init__(self, dates: Sequence[Any], capacity: int = 1024):
+        self.dates = np.asarray(dates)
+        self.window = len(self.dates)
+        self._z = np.zeros((max(capacity, 1), self.window), dtype=np.float32)
+        self.alpha_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.alpha_ids)
+
+    def __contains__(self, alpha_id: str) -> bool:
+        return alpha_id in self._index
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """已标准化的 (n, W) 视图，只读用。"""
+        return self._z[:len(self.alpha_ids)]
+
+    # ---------- 标准化 ----------
+
+    def align(self, pnl: Sequence[float], dates: Optional[Sequence[Any]] = None) -> np.ndarray:
+        """
+        对齐到池子的日期轴，缺失为 NaN。
+        没给 dates 时按右对齐：序列最后一天对应池子最后一天。
+        """
+        x = np.asarray(pnl, dtype=np.float64)
+        out = np.full(self.window, np.nan)
+        if dates is None:
+            n = min(len(x), self.window)
+            if n:
+                out[self.window - n:] = x[len(x) - n:]
+            return out
+
+        dates = np.asarray(dates)
+        pos = np.searchsorted(self.dates, dates)
+        ok = pos < self.window
+        ok[ok] = self.dates[pos[ok]] == dates[ok]
+        out[pos[ok]] = x[ok]
+        return out
+
+    def standardize(self, pnl: Sequence[float], dates: Optional[Sequence[Any]] = None) -> Optional[np.ndarray]:
+        """标准化后的 float32 行；有效天数不足 MIN_OVERLAP 或方差为 0 时返回 None。"""
+        x = self.align(pnl, dates)
+        valid = np.isfinite(x)
+        if valid.sum() < MIN_OVERLAP:
+            return None
+        dev = np.where(valid, x - x[valid].mean(), 0.0)
+        norm = np.sqrt(np.dot(dev, dev))
+        if norm == 0:
+            return None
+        return (dev / norm).astype(np.float32)
+
+    # ---------- 增量维护 ----------
+
+    def _grow(self, need: int) -> None:
+        if need <= len(self._z):
+            return
+        cap = len(self._z)
+        while cap < need:
+            cap *= 2
+        z = np.zeros((cap, self.window), dtype=np.float32)
+        z[:len(self.alpha_ids)] = self.matrix
+        self._z = z
+
+    def add(self, alpha_id: str, pnl: Sequence[float], dates: Optional[Sequence[Any]] = None) -> bool:
+        """加入 / 替换一个 alpha；序列不够长的不入池，返回 False。"""
+        z = self.standardize(pnl, dates)
+        if z is None:
+            return False
+        i = self._index.get(alpha_id)
+        if i is None:
+            self._grow(len(self.alpha_ids) + 1)
+            i = len(self.alpha_ids)
+            self.alpha_ids.append(alpha_id)
+            self._index[alpha_id] = i
+        self._z[i] = z
+        return True
+
+    def add_many(self, items: Iterable[tuple]) -> int:
+        """items 是 (alpha_id, pnl) 或 (alpha_id, pnl, dates)。返回入池个数。"""
+        return sum(self.add(*item) for item in items)
+
+    def remove(self, alpha_id: str) -> bool:
+        i = self._index.pop(alpha_id, None)
+        if i is None:
+            return False
+        last = len(self.alpha_ids) - 1
+        if i != last:
+            # 最后一行挪过来填洞，矩阵保持紧凑
+            moved = self.alpha_ids[last]
+            self._z[i] = self._z[last]
+            self.alpha_ids[i] = moved
+            self._index[moved] = i
+        self.alpha_ids.pop()
+        self._z[last] = 0.0
+        return True
+
+    # ---------- 查询 ----------
+
+    def correlations(self, z: np.ndarray, block_rows: int = 4096) -> np.ndarray:
+        """标准化后的候选 z (W,) 对池子每个 alpha 的相关系数，(n,) float32。"""
+        n = len(self.alpha_ids)
+        out = np.empty(n, dtype=np.float32)
+        for start in range(0, n, block_rows):
+            stop = min(start + block_rows, n)
+            np.dot(self._z[start:stop], z, out=out[start:stop])
+        return out
+
+    def max_correlation(
+        self,
+        pnl: Sequence[float],
+        dates: Optional[Sequence[Any]] = None,
+        exclude: Optional[str] = None,
+        top_k: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        候选对池子的最大相关系数。exclude: 候选本身已在池子里时排除它自己。
+        """
+        z = self.standardize(pnl, dates)
+        if z is None:
+            return {"max_correlation": None, "alpha_id": None, "top": [],
+                    "reason": f"fewer than {MIN_OVERLAP} overlapping days"}
+        corr = self.correlations(z)
+        if exclude is not None and exclude in self._index:
+            corr[self._index[exclude]] = -np.inf
+        if len(corr) == 0 or not np.isfinite(corr).any():
+            return {"max_correlation": None, "alpha_id": None, "top": [], "reason": "empty pool"}
+
+        i = int(np.argmax(corr))
+        out: Dict[str, Any] = {
+            "max_correlation": float(corr[i]),
+            "alpha_id": self.alpha_ids[i],
+            "top": [],
+        }
+        if top_k > 0:
+            k = min(top_k, len(corr))
+            idx = np.argpartition(-corr, k - 1)[:k]
+            idx = idx[np.argsort(-corr[idx])]
+            out["top"] = [
+                {"alpha_id": self.alpha_ids[j], "correlation": float(corr[j])}
+                for j in idx if np.isfinite(corr[j])
+            ]
+        return out
+
+    def max_correlation_many(
+        self,
+        pnls: np.ndarray,
+        exclude: Optional[Sequence[Optional[str]]] = None,
+        block_rows: int = 4096,
+    ) -> np.ndarray:
+        """
+        多个候选（已对齐到池子日期轴的 (m, W) 矩阵，缺失为 NaN）各自的最大相关系数，
+        一次分块矩阵乘完成。序列不够长的候选结果为 NaN。
+        exclude: 每个候选的 alpha_id，已在池子里的排除它自己，同 max_correlation。
+        """
+        pnls = np.asarray(pnls, dtype=np.float64)
+        m = len(pnls)
+        c = np.zeros((m, self.window), dtype=np.float32)
+        ok = np.zeros(m, dtype=bool)
+        for r in range(m):
+            z = self.standardize(pnls[r])
+            if z is not None:
+                c[r], ok[r] = z, True
+
+        # (候选行, 池子行) 对，乘完之后把这些位置置为 -inf
+        pairs = [(r, self._index[a]) for r, a in enumerate(exclude or ()) if a in self._index]
+        ex_rows = np.array([r for r, _ in pairs], dtype=np.intp)
+        ex_pool = np.array([i for _, i in pairs], dtype=np.intp)
+
+        best = np.full(m, -np.inf, dtype=np.float32)
+        n = len(self.alpha_ids)
+        for start in range(0, n, block_rows):
+            stop = min(start + block_rows, n)
+            block = self._z[start:stop] @ c.T  # (rows, m)
+            hit = (ex_pool >= start) & (ex_pool < stop)
+            block[ex_pool[hit] - start, ex_rows[hit]] = -np.inf
+            np.maximum(best, block.max(axis=0), out=best)
+        best[~ok | ~np.isfinite(best)] = np.nan
+        return best
+
+    # ---------- 持久化 ----------
+
+    def save(self, path: str) -> None:
+        np.savez(path, dates=self.dates, alpha_ids=np.asarray(self.alpha_ids), z=self.matrix)
+
+    @classmethod
+    def load(cls, path: str) -> "CorrelationPool":
+        data = np.load(path, allow_pickle=False)
+        z = data["z"]
+        pool = cls(data["dates"], capacity=max(len(z) * 2, 1024))
+        pool._z[:len(z)] = z
+        pool.alpha_ids = [str(a) for a in data["alpha_ids"]]
+        pool._index = {a: i for i, a in enumerate(pool.alpha_ids)}
+        return pool
+
+
+_POOL: Optional[CorrelationPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> CorrelationPool:
+    """进程内共享的池子，从 CORR_POOL_PATH 加载。"""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                path = os.getenv("CORR_POOL_PATH")
+                if not path:
+                    raise RuntimeError("Missing CORR_POOL_PATH (submitted-alpha PnL pool)")
+                _POOL = CorrelationPool.load(path)
+    return _POOL
@@ -1,13 +1,165 @@
 import psycopg2
+import psycopg2.pool
 from psycopg2.extras import RealDictCursor
 import os
+import threading
+import time
+from contextlib import contextmanager
 
-def get_pg_conn():
-    return psycopg2.connect(
+import instrument
+
+
+class TimedCursor(RealDictCursor):
+    """开了 instrument 时每条语句记一个 sql span（按语句类型分桶）；关闭时只多一次布尔判断。"""
+
+    def execute(self, query, vars=None):
+        if not instrument.enabled():
+            return super().execute(query, vars)
+        with instrument.span("sql", statement=_statement_kind(query)):
+            return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        if not instrument.enabled():
+            return super().executemany(query, vars_list)
+        with instrument.span("sql", statement=_statement_kind(query)):
+            return super().executemany(query, vars_list)
+
+
+def _statement_kind(query) -> str:
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", errors="replace")
+    if not isinstance(query, str):
+        return "COMPOSED"
+    head = query.lstrip().split(None, 1)
+    return head[0].upper() if head else ""
+
+
+def _connect_kwargs():
+    kwargs = dict(
         host=os.getenv("PG_HOST", "localhost"),
         port=os.getenv("PG_PORT", 5432),
         dbname=os.getenv("PG_DB", "wq"),
         user=os.getenv("PG_USER", "postgres"),
         password=os.getenv("PG_PASSWORD", "postgres"),
-        cursor_factory=RealDictCursor,
-    )
\ No newline at end of file
+        cursor_factory=TimedCursor,
+    )
+    # 单条语句超时，防止某个工具调用把连接长时间占住；0 = 不限制
+    timeout_ms = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "30000"))
+    if timeout_ms > 0:
+        kwargs["options"] = f"-c statement_timeout={timeout_ms}"
+    return kwargs
+
+
+def get_pg_conn():
+    with instrument.span("pg_connect"):
+        return psycopg2.connect(**_connect_kwargs())
+
+
+class PgPool:
+    """
+    进程级、线程安全的连接池。
+
+    - ThreadedConnectionPool 用完会直接抛 PoolError，这里用信号量让调用方排队等
+    - 取出的连接如果空闲超过 healthcheck_after 秒，先 SELECT 1 验一下，坏连接丢掉重建
+    """
+
+    def __init__(self, minconn: int, maxconn: int, healthcheck_after: float = 30.0,
+                 acquire_timeout: float = 30.0):
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **_connect_kwargs())
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self.healthcheck_after = healthcheck_after
+        self.acquire_timeout = acquire_timeout
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle < self.healthcheck_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        t0 = time.perf_counter()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise psycopg2.pool.PoolError("timed out waiting for a pooled connection")
+        # 连接池是不是瓶颈：排队等名额的时间
+        instrument.observe("pg_pool_wait_seconds", time.perf_counter() - t0)
+        try:
+            conn = self._pool.getconn()
+            if not self._healthy(conn):
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close: bool = False) -> None:
+        try:
+            close = close or bool(conn.closed)
+            if close:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    def closeall(self) -> None:
+        self._pool.closeall()
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> PgPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = PgPool(
+                    minconn=int(os.getenv("PG_POOL_MIN", "1")),
+                    maxconn=int(os.getenv("PG_POOL_MAX", "10")),
+                    healthcheck_after=float(os.getenv("PG_POOL_HEALTHCHECK_SECS", "30")),
+                )
+    return _POOL
+
+
+def close_pool() -> None:
+    """关掉进程级连接池（比如切换到另一个库之前）；下次 get_pool() 按当前环境变量重建。"""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.closeall()
+            _POOL = None
+
+
+@contextmanager
+def pg_conn():
+    """
+    从进程级连接池借一个连接，用完自动归还。
+    正常退出 commit，异常 rollback；连接已断开的直接丢弃。
+
+        with pg_conn() as conn:
+            with conn.cursor() as cur:
+                ...
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
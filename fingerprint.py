@@ -0,0 +1,153 @@
+# fingerprint.py
+"""
+表达式指纹：同一个 alpha 的不同写法（空白、加法 / 乘法的操作数顺序、1.0 vs 1）
+得到同一个指纹，见 sim.compiler.canonical_text / fingerprint。
+
+  wq_alpha.fingerprint   每个 alpha 的指纹，普通索引，用来找出所有重复写法
+  wq_alpha.settings      alpha 的完整 simulation settings（JSONB），判断"同一个模拟"时
+                         decay / truncation / pasteurization 等也要一致
+  wq_expression          每个规范表达式一行，fingerprint 是主键（唯一索引），
+                         first_alpha_id 是最先入库的那个 alpha
+
+ingestion 每写完一个 batch 调 record_fingerprints(cur, alpha_rows)；
+已有数据用 backfill_fingerprints(cur) 补。
+模拟之前（本地 / 远程）用 find_by_fingerprint 查有没有已经跑过的同一个表达式。
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import Json, execute_values
+
+from metrics_wide import WIDE_TABLE
+from sim.compiler import canonical_text, hash_canonical
+
+EXPRESSION_TABLE = "wq_expression"
+
+FINGERPRINT_DDL = [
+    "ALTER TABLE wq_alpha ADD COLUMN IF NOT EXISTS fingerprint TEXT",
+    "ALTER TABLE wq_alpha ADD COLUMN IF NOT EXISTS settings JSONB",
+    "CREATE INDEX IF NOT EXISTS wq_alpha_fingerprint_idx ON wq_alpha (fingerprint)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {EXPRESSION_TABLE} (
+        fingerprint     TEXT PRIMARY KEY,
+        canonical       TEXT NOT NULL,
+        first_alpha_id  TEXT,
+        created_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+]
+
+
+def ensure_fingerprint_schema(cur) -> None:
+    for ddl in FINGERPRINT_DDL:
+        cur.execute(ddl)
+
+
+def record_fingerprints(cur, alphas: Sequence[Tuple[Any, ...]]) -> int:
+    """
+    alphas 是 (alpha_id, expression, ...) 形式的行（即 _alpha_row 的前两列）。
+    回填 wq_alpha.fingerprint，并登记新出现的规范表达式。返回处理的 alpha 数。
+    """
+    rows = []
+    for a in alphas:
+        alpha_id, expression = a[0], a[1]
+        if not expression:
+            continue
+        canonical = canonical_text(expression)
+        rows.append((alpha_id, hash_canonical(canonical), canonical))
+    if not rows:
+        return 0
+
+    execute_values(
+        cur,
+        """
+        UPDATE wq_alpha AS a
+        SET fingerprint = v.fingerprint
+        FROM (VALUES %s) AS v (alpha_id, fingerprint)
+        WHERE a.alpha_id = v.alpha_id
+          AND a.fingerprint IS DISTINCT FROM v.fingerprint
+        """,
+        [(alpha_id, fp) for alpha_id, fp, _ in rows],
+    )
+
+    unique = {fp: (fp, canonical, alpha_id) for alpha_id, fp, canonical in reversed(rows)}
+    execute_values(
+        cur,
+        f"""
+        INSERT INTO {EXPRESSION_TABLE} (fingerprint, canonical, first_alpha_id)
+        VALUES %s
+        ON CONFLICT (fingerprint) DO NOTHING
+        """,
+        list(unique.values()),
+    )
+    return len(rows)
+
+
+def backfill_fingerprints(cur, batch_size: int = 5000) -> int:
+    """给还没有指纹的 wq_alpha 行补上，按 batch 走。返回处理的 alpha 数。"""
+    total = 0
+    while True:
+        cur.execute(
+            """
+            SELECT alpha_id, expression
+            FROM wq_alpha
+            WHERE fingerprint IS NULL AND expression <> ''
+            ORDER BY created_at, alpha_id
+            LIMIT %s
+            """,
+            (batch_size,),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return total
+        # RealDictCursor / 普通 cursor 都能用
+        pairs = [(r["alpha_id"], r["expression"]) if isinstance(r, dict) else tuple(r) for r in rows]
+        total += record_fingerprints(cur, pairs)
+
+
+def find_by_fingerprint(
+    cur,
+    fp: str,
+    region: Optional[str] = None,
+    universe: Optional[str] = None,
+    delay: Optional[int] = None,
+    neutralization: Optional[str] = None,
+    settings: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    指纹相同的已入库 alpha，带宽表里的主要指标；给了 settings 的只返回 settings 也相同的。
+    settings 是其余的 simulation settings（decay / truncation / ...），要求 wq_alpha.settings 包含它们；
+    没存 settings 的旧行（加这一列之前入库、还没重新 dump 过）不算匹配。
+    """
+    filters = ["a.fingerprint = %s"]
+    params: List[Any] = [fp]
+    for col, value in (("region", region), ("universe", universe),
+                       ("delay", delay), ("neutralization", neutralization)):
+        if value is not None:
+            filters.append(f"a.{col} = %s")
+            params.append(value)
+    if settings:
+        filters.append("a.settings @> %s")
+        params.append(Json(settings))
+
+    cur.execute(
+        f"""
+        SELECT
+            a.alpha_id,
+            a.expression,
+            a.region,
+            a.universe,
+            a.delay,
+            a.neutralization,
+            a.settings,
+            a.created_at,
+            w.is_ic_sharpe,
+            w.is_ic_fitness,
+            w.is_ic_turnover
+        FROM wq_alpha a
+        LEFT JOIN {WIDE_TABLE} w ON w.alpha_id = a.alpha_id
+        WHERE {" AND ".join(filters)}
+        ORDER BY a.created_at, a.alpha_id
+        """,
+        params,
+    )
+    return cur.fetchall()
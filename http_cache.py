@@ -0,0 +1,152 @@
+# http_cache.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class ResponseCache:
+    """
+    GET 响应的持久化缓存（SQLite 单文件），按 URL 为 key。
+
+    - 每条记录带 TTL；过期后如果有 ETag / Last-Modified，就发条件请求，304 直接续期
+    - 总大小超过 max_bytes 时按最近访问时间做 LRU 淘汰；命中时的访问时间最多每 touch_interval 秒
+      写一次，读多的时候不用每次命中都抢 SQLite 的写锁
+    - WAL 模式 + busy timeout，多个进程（agent、dump 脚本）可以共享同一个文件
+    - sqlite3 连接不能跨线程共享，这里每个线程一个连接
+    """
+
+    def __init__(self, path: str, ttl: float = 3600.0, max_bytes: int = 512 * 1024 * 1024,
+                 touch_interval: float = 60.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url           TEXT PRIMARY KEY,
+                body          BLOB NOT NULL,
+                etag          TEXT,
+                last_modified TEXT,
+                stored_at     REAL NOT NULL,
+                expires_at    REAL NOT NULL,
+                accessed_at   REAL NOT NULL,
+                size          INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS http_cache_accessed ON http_cache (accessed_at)")
+        conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """WQ_CACHE_PATH 没设置时返回 None（不缓存）。"""
+        path = os.getenv("WQ_CACHE_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            ttl=float(os.getenv("WQ_CACHE_TTL", "3600")),
+            max_bytes=int(os.getenv("WQ_CACHE_MAX_MB", "512")) * 1024 * 1024,
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT body, etag, last_modified, stored_at, expires_at, accessed_at "
+            "FROM http_cache WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[5] >= self.touch_interval:
+            conn.execute("UPDATE http_cache SET accessed_at = ? WHERE url = ?", (now, url))
+            conn.commit()
+        return CacheEntry(bytes(row[0]), row[1], row[2], row[3], row[4])
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        conn = self._conn()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO http_cache
+            (url, body, etag, last_modified, stored_at, expires_at, accessed_at, size)
+            VALUES (?,?,?,?,?,?,?,?)
+            """,
+            (url, body, etag, last_modified, now, expires, now, len(body)),
+        )
+        conn.commit()
+        self._evict(conn)
+
+    def refresh(self, url: str, ttl: Optional[float] = None) -> None:
+        """304 之后续期，不改 body。"""
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        conn = self._conn()
+        conn.execute(
+            "UPDATE http_cache SET expires_at = ?, accessed_at = ? WHERE url = ?",
+            (expires, now, url),
+        )
+        conn.commit()
+
+    def invalidate(self, url: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+        conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        victims = []
+        for url, size in conn.execute("SELECT url, size FROM http_cache ORDER BY accessed_at"):
+            victims.append((url,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM http_cache WHERE url = ?", victims)
+        conn.commit()
@@ -0,0 +1,312 @@
+# instrument.py
+"""
+轻量埋点：嵌套的计时 span（LLM 调用 → 工具调用 → HTTP 请求 / SQL 语句）、计数器、延迟直方图。
+
+默认关闭。关闭时 span() 返回同一个空 context manager，count() / observe() 第一行就返回，
+热路径上只多一次全局布尔判断。
+
+开启：INSTRUMENT=1，或代码里 instrument.enable()。
+    INSTRUMENT_TRACE=path     每个结束的 span 追加一行 JSON（一次 run 的 trace）
+    INSTRUMENT_METRICS=path   run_agent 结束时导出指标：.json 写 JSON，其它写 Prometheus 文本格式
+
+span 名 <name> 同时是直方图 <name>_seconds 的名字，span 的 labels 就是直方图的 labels，
+所以 labels 只放低基数的值（工具名、HTTP 方法和状态码、SQL 语句类型）；
+URL、alpha_id 这类高基数的东西放 attrs，只进 trace。
+
+父子关系走 contextvars：同一个线程 / asyncio task 里自然嵌套；
+丢进线程池的函数用 bind() 包一下，把提交时的 span 带过去。
+"""
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 直方图桶上界（秒），覆盖 SQL 的毫秒级到模拟 / LLM 的分钟级
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_enabled = False
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, tuple], float] = {}
+_hists: Dict[Tuple[str, tuple], "_Histogram"] = {}
+
+_trace = None
+_trace_lock = threading.Lock()
+
+_ids = itertools.count(1)
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("instrument_span", default=None)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(trace_path: Optional[str] = None) -> None:
+    global _enabled, _trace
+    if trace_path:
+        d = os.path.dirname(trace_path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with _trace_lock:
+            if _trace is not None:
+                _trace.close()
+            _trace = open(trace_path, "a", encoding="utf-8")
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled, _trace
+    _enabled = False
+    with _trace_lock:
+        if _trace is not None:
+            _trace.close()
+            _trace = None
+
+
+def reset() -> None:
+    """清空已收集的计数器和直方图。"""
+    with _lock:
+        _counters.clear()
+        _hists.clear()
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, tuple]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+# ========== 计数器 / 直方图 ==========
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "n")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # 最后一格是 +Inf
+        self.sum = 0.0
+        self.n = 0
+
+    def add(self, v: float) -> None:
+        self.counts[bisect_left(BUCKETS, v)] += 1
+        self.sum += v
+        self.n += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """桶内线性插值的近似分位数。"""
+        if not self.n:
+            return None
+        rank = q * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = BUCKETS[i - 1] if i > 0 else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+
+def count(name: str, value: float = 1.0, **labels: Any) -> None:
+    if not _enabled:
+        return
+    k = _key(name, labels)
+    with _lock:
+        _counters[k] = _counters.get(k, 0.0) + value
+
+
+def observe(name: str, seconds: float, **labels: Any) -> None:
+    if not _enabled:
+        return
+    k = _key(name, labels)
+    with _lock:
+        h = _hists.get(k)
+        if h is None:
+            h = _hists[k] = _Histogram()
+        h.add(seconds)
+
+
+# ========== span ==========
+
+class Span:
+    __slots__ = ("name", "labels", "attrs", "span_id", "parent_id", "start", "_t0", "_token")
+
+    def __init__(self, name: str, labels: Dict[str, Any], attrs: Optional[Dict[str, Any]]):
+        self.name = name
+        self.labels = labels
+        self.attrs = dict(attrs) if attrs else {}
+
+    def set(self, **labels: Any) -> None:
+        """补充 labels（比如请求结束后才知道的状态码）。"""
+        self.labels.update(labels)
+
+    def note(self, **attrs: Any) -> None:
+        """只进 trace 的属性。"""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        parent = _current.get()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.span_id = next(_ids)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._t0
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        observe(f"{self.name}_seconds", duration, **self.labels)
+        if _trace is not None:
+            _write_trace({
+                "name": self.name,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "start": self.start,
+                "duration": duration,
+                "thread": threading.current_thread().name,
+                "labels": self.labels,
+                "attrs": self.attrs,
+            })
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **labels: Any) -> None:
+        pass
+
+    def note(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NULL = _NullSpan()
+
+
+def span(name: str, attrs: Optional[Dict[str, Any]] = None, **labels: Any):
+    """
+        with instrument.span("http", method="GET", attrs={"url": url}) as sp:
+            ...
+            sp.set(status=resp.status_code)
+    """
+    if not _enabled:
+        return _NULL
+    return Span(name, labels, attrs)
+
+
+def bind(fn: Callable) -> Callable:
+    """把当前 span 上下文带进线程池；每次调用都 copy 一份 context，可并发提交。"""
+    if not _enabled:
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def _write_trace(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, default=str)
+    with _trace_lock:
+        if _trace is not None:
+            _trace.write(line + "\n")
+
+
+# ========== 导出 ==========
+
+def snapshot() -> Dict[str, List[Dict[str, Any]]]:
+    with _lock:
+        counters = list(_counters.items())
+        hists = [(k, list(h.counts), h.sum, h.n, h.quantile(0.5), h.quantile(0.99))
+                 for k, h in _hists.items()]
+
+    out: Dict[str, List[Dict[str, Any]]] = {"counters": [], "histograms": []}
+    for (name, labels), value in sorted(counters):
+        out["counters"].append({"name": name, "labels": dict(labels), "value": value})
+    for (name, labels), counts, total, n, p50, p99 in sorted(hists, key=lambda x: x[0]):
+        cumulative, running = {}, 0
+        for bound, c in zip(list(BUCKETS) + ["+Inf"], counts):
+            running += c
+            cumulative[str(bound)] = running
+        out["histograms"].append({
+            "name": name, "labels": dict(labels), "count": n, "sum": total,
+            "p50": p50, "p99": p99, "buckets": cumulative,
+        })
+    return out
+
+
+def _labels_text(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+def _num(v: float) -> str:
+    """整数值原样输出；:g 只保留 6 位有效数字，百万级的计数器会被截断。"""
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def export_prometheus() -> str:
+    snap = snapshot()
+    lines: List[str] = []
+    typed = set()
+    for c in snap["counters"]:
+        if c["name"] not in typed:
+            lines.append(f"# TYPE {c['name']} counter")
+            typed.add(c["name"])
+        lines.append(f"{c['name']}{_labels_text(c['labels'])} {_num(c['value'])}")
+    for h in snap["histograms"]:
+        name = h["name"]
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        for le, v in h["buckets"].items():
+            lines.append(f"{name}_bucket{_labels_text(h['labels'], ('le', le))} {v}")
+        lines.append(f"{name}_sum{_labels_text(h['labels'])} {h['sum']:.6f}")
+        lines.append(f"{name}_count{_labels_text(h['labels'])} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def export_json() -> str:
+    return json.dumps(snapshot(), indent=2)
+
+
+def write_metrics(path: str) -> None:
+    text = export_json() if path.endswith(".json") else export_prometheus()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def summary() -> str:
+    """按总耗时排序的一览：哪一层（llm / tool / http / sql）最花时间。"""
+    snap = snapshot()
+    lines = []
+    for h in sorted(snap["histograms"], key=lambda h: -h["sum"]):
+        labels = ",".join(f"{k}={v}" for k, v in h["labels"].items())
+        lines.append(
+            f"{h['name']:<24} {labels:<40} n={h['count']:<6} total={h['sum']:.2f}s "
+            f"p50={h['p50']:.3f}s p99={h['p99']:.3f}s"
+        )
+    for c in snap["counters"]:
+        labels = ",".join(f"{k}={v}" for k, v in c["labels"].items())
+        lines.append(f"{c['name']:<24} {labels:<40} {c['value']:g}")
+    return "\n".join(lines)
+
+
+atexit.register(disable)
+
+if os.getenv("INSTRUMENT", "0") == "1":
+    enable(os.getenv("INSTRUMENT_TRACE") or None)
@@ -0,0 +1,103 @@
+# metrics_wide.py
+"""
+wq_backtest_metrics 是 EAV 形式（alpha_id, metric_name, metric_value, period），
+跨 alpha 筛选时要先 pivot 几百万行。这里维护一张宽表 wq_alpha_metrics_wide：
+每个 alpha 一行，每个常用指标一列，常筛的列上建索引。
+
+ingestion 每写完一个 batch 调 refresh_wide_metrics(cur, alpha_ids) 增量刷新；
+refresh_wide_metrics(cur) 不带 alpha_ids 时全量重建。
+"""
+from typing import List, Optional, Sequence
+
+# 和 dump_wq_alphas_to_postgres.get_backtest_metrics 的前缀保持一致
+PREFIXES = ["is_ic", "is_rn", "test_ic", "test_rn"]
+FIELDS = ["sharpe", "fitness", "turnover", "returns", "drawdown", "margin"]
+
+METRIC_COLUMNS: List[str] = [f"{p}_{f}" for p in PREFIXES for f in FIELDS]
+
+# 常用筛选列，单列 btree 索引
+INDEXED_COLUMNS = [
+    "is_ic_sharpe",
+    "is_ic_fitness",
+    "is_ic_turnover",
+    "test_rn_fitness",
+    "test_rn_sharpe",
+]
+
+WIDE_TABLE = "wq_alpha_metrics_wide"
+
+
+def ensure_wide_table(cur) -> None:
+    cols = ",\n    ".join(f"{c} DOUBLE PRECISION" for c in METRIC_COLUMNS)
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {WIDE_TABLE} (
+            alpha_id        TEXT PRIMARY KEY,
+            region          TEXT,
+            universe        TEXT,
+            delay           INTEGER,
+            neutralization  TEXT,
+            created_at      TIMESTAMPTZ,
+            {cols},
+            updated_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+    for c in INDEXED_COLUMNS:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {WIDE_TABLE}_{c}_idx ON {WIDE_TABLE} ({c})")
+        # rank_alphas 的 "某 region 按某指标取 top-k"：等值 + 排序走同一个索引，倒序扫 k 行就停
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS {WIDE_TABLE}_region_{c}_idx ON {WIDE_TABLE} (region, {c})"
+        )
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS {WIDE_TABLE}_region_universe_delay_idx "
+        f"ON {WIDE_TABLE} (region, universe, delay)"
+    )
+
+
+def refresh_wide_metrics(cur, alpha_ids: Optional[Sequence[str]] = None,
+                         period: str = "full") -> int:
+    """
+    从 wq_backtest_metrics pivot 到宽表，一条 INSERT ... SELECT ... GROUP BY 完成。
+    alpha_ids 为 None 时全量刷新。返回写入行数。
+    """
+    pivots = ",\n            ".join(
+        f"MAX(m.metric_value) FILTER (WHERE m.metric_name = '{c}') AS {c}"
+        for c in METRIC_COLUMNS
+    )
+    updates = ",\n            ".join(
+        f"{c} = EXCLUDED.{c}"
+        for c in ["region", "universe", "delay", "neutralization", "created_at"] + METRIC_COLUMNS
+    )
+
+    where = "m.period = %s"
+    params: list = [period]
+    if alpha_ids is not None:
+        if not alpha_ids:
+            return 0
+        where += " AND m.alpha_id = ANY(%s)"
+        params.append(list(alpha_ids))
+
+    cur.execute(
+        f"""
+        INSERT INTO {WIDE_TABLE}
+        (alpha_id, region, universe, delay, neutralization, created_at, {", ".join(METRIC_COLUMNS)})
+        SELECT
+            m.alpha_id,
+            MAX(a.region),
+            MAX(a.universe),
+            MAX(a.delay)::integer,
+            MAX(a.neutralization),
+            MAX(a.created_at)::timestamptz,
+            {pivots}
+        FROM wq_backtest_metrics m
+        LEFT JOIN wq_alpha a ON a.alpha_id = m.alpha_id
+        WHERE {where}
+        GROUP BY m.alpha_id
+        ON CONFLICT (alpha_id) DO UPDATE SET
+            {updates},
+            updated_at = now()
+        """,
+        params,
+    )
+    return cur.rowcount
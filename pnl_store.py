@@ -0,0 +1,216 @@
+# pnl_store.py
+"""
+alpha 的日度时间序列（PnL 等 recordset）的紧凑存储。
+
+每个 (alpha_id, recordset) 一行，不是每天一行：
+    dates   bytea  int32，1970-01-01 起的天数（datetime64[D] 的底层表示）
+    data    bytea  float32，(n_columns, n_days) 列主序，每一列在内存里是连续的
+    columns TEXT[] 列名，比如 {pnl}
+
+读的时候 np.frombuffer 直接包 psycopg2 返回的 memoryview，数据不复制；
+recordset 是空的 alpha 也存一行（n_days = 0），增量 ingestion 就不会每次都重新拉它；读的时候跳过。
+10 万个 alpha × 几年日度数据也只是几百 MB 的 float32。
+
+recordset 的 JSON 形如：
+    {"schema": {"properties": [{"name": "date"}, {"name": "pnl"}]},
+     "records": [["2019-01-02", 0.0], ["2019-01-03", 1234.5], ...]}
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+SERIES_TABLE = "wq_alpha_series"
+
+SERIES_DDL = f"""
+CREATE TABLE IF NOT EXISTS {SERIES_TABLE} (
+    alpha_id    TEXT NOT NULL,
+    recordset   TEXT NOT NULL,
+    columns     TEXT[] NOT NULL,
+    n_days      INTEGER NOT NULL,
+    start_date  DATE,
+    end_date    DATE,
+    dates       BYTEA NOT NULL,
+    data        BYTEA NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (alpha_id, recordset)
+)
+"""
+
+
+def ensure_series_table(cur) -> None:
+    cur.execute(SERIES_DDL)
+
+
+class Series:
+    """一个 recordset：dates (n,) datetime64[D]，values (k, n) float32，都是只读视图。"""
+
+    def __init__(self, alpha_id: str, recordset: str, columns: List[str],
+                 dates: np.ndarray, values: np.ndarray):
+        self.alpha_id = alpha_id
+        self.recordset = recordset
+        self.columns = columns
+        self.dates = dates
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def column(self, name: Optional[str] = None) -> np.ndarray:
+        """某一列（默认第一列），连续的 float32 视图。"""
+        if name is None:
+            return self.values[0]
+        if name not in self.columns:
+            raise KeyError(f"unknown column {name!r} in {self.recordset}; available: {self.columns}")
+        return self.values[self.columns.index(name)]
+
+
+def parse_recordset(data: Dict[str, Any]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    recordset JSON -> (columns, dates int32 (n,), values float32 (k, n))。
+    非数值列（除 date 外）丢掉；日期升序。
+    """
+    names = [p.get("name") for p in (data.get("schema") or {}).get("properties", [])]
+    records = data.get("records") or []
+    if "date" not in names or not records:
+        return [], np.empty(0, np.int32), np.empty((0, 0), np.float32)
+
+    di = names.index("date")
+    dates = np.array([r[di] for r in records], dtype="datetime64[D]").astype(np.int32)
+
+    columns, cols = [], []
+    for j, name in enumerate(names):
+        if j == di:
+            continue
+        try:
+            col = np.array([np.nan if r[j] is None else r[j] for r in records], dtype=np.float32)
+        except (TypeError, ValueError):
+            continue
+        columns.append(name)
+        cols.append(col)
+
+    order = np.argsort(dates, kind="stable")
+    values = np.stack(cols)[:, order] if cols else np.empty((0, len(dates)), np.float32)
+    return columns, dates[order], np.ascontiguousarray(values)
+
+
+def series_row(alpha_id: str, recordset: str, columns: List[str],
+               dates: np.ndarray, values: np.ndarray) -> tuple:
+    d = dates.astype("datetime64[D]")
+    return (
+        alpha_id,
+        recordset,
+        columns,
+        len(dates),
+        d[0].item() if len(d) else None,
+        d[-1].item() if len(d) else None,
+        psycopg2.Binary(np.ascontiguousarray(dates, dtype=np.int32).tobytes()),
+        psycopg2.Binary(np.ascontiguousarray(values, dtype=np.float32).tobytes()),
+    )
+
+
+def write_series(cur, rows: Sequence[tuple]) -> None:
+    """rows 是 series_row 的结果；同一个 (alpha_id, recordset) 覆盖写。"""
+    if not rows:
+        return
+    execute_values(
+        cur,
+        f"""
+        INSERT INTO {SERIES_TABLE}
+            (alpha_id, recordset, columns, n_days, start_date, end_date, dates, data)
+        VALUES %s
+        ON CONFLICT (alpha_id, recordset) DO UPDATE SET
+            columns = EXCLUDED.columns,
+            n_days = EXCLUDED.n_days,
+            start_date = EXCLUDED.start_date,
+            end_date = EXCLUDED.end_date,
+            dates = EXCLUDED.dates,
+            data = EXCLUDED.data,
+            updated_at = now()
+        """,
+        rows,
+        page_size=200,
+    )
+
+
+def missing_series(cur, alpha_ids: Sequence[str], recordset: str) -> List[str]:
+    """还没有存这个 recordset 的 alpha（增量 ingestion 用）。"""
+    cur.execute(
+        f"""
+        SELECT a.id
+        FROM unnest(%s::text[]) AS a(id)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {SERIES_TABLE} s
+            WHERE s.alpha_id = a.id AND s.recordset = %s
+        )
+        """,
+        (list(alpha_ids), recordset),
+    )
+    return [r["id"] if isinstance(r, dict) else r[0] for r in cur.fetchall()]
+
+
+def _decode(row) -> Series:
+    if not isinstance(row, dict):
+        row = dict(zip(("alpha_id", "recordset", "columns", "n_days", "dates", "data"), row))
+    n = row["n_days"]
+    columns = list(row["columns"])
+    # memoryview -> ndarray，values 不复制；dates 是 int32，转 datetime64[D]（8 字节）要复制一份，很小
+    dates = np.frombuffer(row["dates"], dtype=np.int32).astype("datetime64[D]")
+    values = np.frombuffer(row["data"], dtype=np.float32).reshape(len(columns), n)
+    return Series(row["alpha_id"], row["recordset"], columns, dates, values)
+
+
+_SELECT = f"SELECT alpha_id, recordset, columns, n_days, dates, data FROM {SERIES_TABLE}"
+
+
+def load_series(cur, alpha_ids: Sequence[str], recordset: str = "pnl") -> Dict[str, Series]:
+    cur.execute(
+        f"{_SELECT} WHERE alpha_id = ANY(%s) AND recordset = %s AND n_days > 0",
+        (list(alpha_ids), recordset),
+    )
+    return {s.alpha_id: s for s in map(_decode, cur.fetchall())}
+
+
+def iter_series(conn, recordset: str = "pnl", alpha_ids: Optional[Sequence[str]] = None,
+                itersize: int = 2000) -> Iterator[Series]:
+    """流式读整张表（named cursor），内存里只保留 itersize 行。"""
+    with conn.cursor(name=f"series_{recordset}_scan") as cur:
+        cur.itersize = itersize
+        if alpha_ids is None:
+            cur.execute(f"{_SELECT} WHERE recordset = %s AND n_days > 0", (recordset,))
+        else:
+            cur.execute(f"{_SELECT} WHERE recordset = %s AND n_days > 0 AND alpha_id = ANY(%s)",
+                        (recordset, list(alpha_ids)))
+        for row in cur:
+            yield _decode(row)
+
+
+def build_correlation_pool(conn, alpha_ids: Optional[Sequence[str]] = None,
+                           days: int = 4 * 252, recordset: str = "pnl",
+                           column: Optional[str] = None, cumulative: bool = True):
+    """
+    用存好的 PnL 建自相关池子：日期轴是最近 `days` 个工作日，
+    BRAIN 的 pnl recordset 是累计曲线，cumulative=True 时先差分成日 PnL。
+    """
+    from correlation import CorrelationPool
+
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT max(end_date) AS end_date FROM {SERIES_TABLE} WHERE recordset = %s",
+                    (recordset,))
+        row = cur.fetchone()
+    end = row["end_date"] if isinstance(row, dict) else row[0]
+    if end is None:
+        raise RuntimeError(f"no {recordset} series stored")
+
+    last = np.busday_offset(np.datetime64(end, "D"), 0, roll="backward")
+    dates = np.busday_offset(last, np.arange(-(days - 1), 1))
+
+    pool = CorrelationPool(dates, capacity=1024)
+    for s in iter_series(conn, recordset, alpha_ids):
+        x = s.column(column).astype(np.float64)
+        d = s.dates
+        if cumulative:
+            x, d = np.diff(x), d[1:]
+        pool.add(s.alpha_id, x, d)
+    return pool
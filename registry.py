@@ -1,9 +1,14 @@
 # registry.py
 
+from tools.check_correlation import check_correlation
 from tools.get_alpha_detail import get_alpha_detail
-from tools.get_backtest_metrics import get_backtest_metrics
-from tools.list_alphas import list_alphas
+from tools.get_backtest_metrics import get_backtest_metrics, get_backtest_metrics_batch
+from tools.list_alphas import list_alphas, list_alphas_db
+from tools.lookup_expression import lookup_expression
+from tools.rank_alphas import rank_alphas
 from tools.resolve_cutoff import resolve_cutoff
+from tools.screen_alphas import screen_alphas
+from tools.sim_jobs import cancel_simulations, enqueue_simulations, poll_simulations
 from tools.simulate_alpha import simulate_alpha
 
 
@@ -44,6 +49,21 @@ get_backtest_metrics_schema = _wrap(
     },
 )
 
+get_backtest_metrics_batch_schema = _wrap(
+    "get_backtest_metrics_batch",
+    "Get the latest backtest metrics for many alphas in one call.",
+    {
+        "type": "object",
+        "properties": {
+            "alpha_ids": {
+                "type": "array",
+                "items": {"type": "string"},
+            },
+        },
+        "required": ["alpha_ids"],
+    },
+)
+
 list_alphas_schema = _wrap(
     "list_alphas",
     "List available alphas with optional limit.",
@@ -51,6 +71,85 @@ list_alphas_schema = _wrap(
         "type": "object",
         "properties": {
             "limit": {"type": "integer"},
+            "since": {
+                "type": "string",
+                "description": "ISO timestamp; only alphas created after it are returned.",
+            },
+        },
+    },
+)
+
+list_alphas_db_schema = _wrap(
+    "list_alphas_db",
+    "List ingested alphas from Postgres, newest first, one keyset page at a time.",
+    {
+        "type": "object",
+        "properties": {
+            "limit": {"type": "integer"},
+            "after_created_at": {
+                "type": ["string", "null"],
+                "description": "created_at from the previous page's next_cursor (null for alphas without a creation time).",
+            },
+            "after_alpha_id": {
+                "type": "string",
+                "description": "alpha_id from the previous page's next_cursor.",
+            },
+            "region": {"type": "string"},
+            "universe": {"type": "string"},
+            "delay": {"type": "integer"},
+            "neutralization": {"type": "string"},
+        },
+    },
+)
+
+lookup_expression_schema = _wrap(
+    "lookup_expression",
+    "Find existing alphas equivalent to an expression (ignoring whitespace, operand order "
+    "and number formatting) and their metrics. Use before simulating.",
+    {
+        "type": "object",
+        "properties": {
+            "expression": {"type": "string"},
+            "region": {"type": "string"},
+            "universe": {"type": "string"},
+            "delay": {"type": "integer"},
+            "neutralization": {"type": "string"},
+        },
+        "required": ["expression"],
+    },
+)
+
+rank_alphas_schema = _wrap(
+    "rank_alphas",
+    "Top-k ingested alphas by a metric or a weighted score, or the Pareto front over "
+    "sharpe / fitness / turnover, with region / universe / delay / date filters.",
+    {
+        "type": "object",
+        "properties": {
+            "metric": {
+                "type": "string",
+                "description": "e.g. fitness, sharpe, turnover, test_rn_sharpe. Bare names mean is_ic_.",
+            },
+            "weights": {
+                "type": "object",
+                "additionalProperties": {"type": "number"},
+                "description": "Rank by sum(weight * metric) instead, e.g. {\"sharpe\": 1, \"turnover\": -2}.",
+            },
+            "ascending": {"type": "boolean", "description": "Lowest metric first."},
+            "limit": {"type": "integer"},
+            "region": {"type": "string"},
+            "universe": {"type": "string"},
+            "delay": {"type": "integer"},
+            "neutralization": {"type": "string"},
+            "created_after": {"type": "string", "description": "ISO date/timestamp."},
+            "created_before": {"type": "string", "description": "ISO date/timestamp."},
+            "pareto": {"type": "boolean", "description": "Return the Pareto front instead of top-k."},
+            "objectives": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Pareto objectives; prefix with - for lower-is-better. "
+                               "Default [\"sharpe\", \"fitness\", \"-turnover\"].",
+            },
         },
     },
 )
@@ -68,15 +167,107 @@ resolve_cutoff_schema = _wrap(
     },
 )
 
+screen_alphas_schema = _wrap(
+    "screen_alphas",
+    "List alphas that pass the cutoff policy for a region / frequency / universe.",
+    {
+        "type": "object",
+        "properties": {
+            "region": {"type": "string"},
+            "frequency": {"type": "string"},
+            "universe": {"type": "string"},
+            "include_soft": {"type": "boolean"},
+            "limit": {"type": "integer"},
+        },
+        "required": ["region"],
+    },
+)
+
 simulate_alpha_schema = _wrap(
     "simulate_alpha",
-    "Run simulation for a given alpha.",
+    "Run a local backtest simulation for an alpha expression.",
     {
         "type": "object",
         "properties": {
-            "alpha_id": {"type": "string"},
+            "expression": {"type": "string"},
+            "universe": {"type": "string"},
+            "delay": {"type": "integer"},
+            "neutralization": {
+                "type": "string",
+                "description": "NONE, MARKET, or a group field such as INDUSTRY.",
+            },
+        },
+        "required": ["expression"],
+    },
+)
+
+enqueue_simulations_schema = _wrap(
+    "enqueue_simulations",
+    "Queue many local simulations at once; returns a batch_id to poll. "
+    "Equivalent expressions and already-simulated ones are not re-run.",
+    {
+        "type": "object",
+        "properties": {
+            "expressions": {
+                "type": "array",
+                "items": {"type": "string"},
+            },
+            "universe": {"type": "string"},
+            "delay": {"type": "integer"},
+            "neutralization": {"type": "string"},
+            "priority": {
+                "type": "integer",
+                "description": "Higher runs first. Default 0.",
+            },
+        },
+        "required": ["expressions"],
+    },
+)
+
+poll_simulations_schema = _wrap(
+    "poll_simulations",
+    "Check progress of a simulation batch and page through finished results, best sharpe first.",
+    {
+        "type": "object",
+        "properties": {
+            "batch_id": {"type": "string"},
+            "limit": {"type": "integer"},
+            "offset": {"type": "integer"},
+        },
+        "required": ["batch_id"],
+    },
+)
+
+cancel_simulations_schema = _wrap(
+    "cancel_simulations",
+    "Cancel the unfinished simulations of a batch.",
+    {
+        "type": "object",
+        "properties": {
+            "batch_id": {"type": "string"},
+        },
+        "required": ["batch_id"],
+    },
+)
+
+check_correlation_schema = _wrap(
+    "check_correlation",
+    "Maximum correlation of a candidate's daily PnL against the submitted alpha pool. "
+    "Pass an expression (simulated locally) or a daily pnl series.",
+    {
+        "type": "object",
+        "properties": {
+            "expression": {"type": "string"},
+            "pnl": {
+                "type": "array",
+                "items": {"type": "number"},
+                "description": "Daily PnL, last value on the pool's last day.",
+            },
+            "universe": {"type": "string"},
+            "delay": {"type": "integer"},
+            "neutralization": {"type": "string"},
+            "top_k": {"type": "integer"},
         },
-        "required": ["alpha_id"],
     },
 )
 
@@ -84,15 +275,53 @@ simulate_alpha_schema = _wrap(
 TOOLS = [
     get_alpha_detail_schema,
     get_backtest_metrics_schema,
+    get_backtest_metrics_batch_schema,
     list_alphas_schema,
+    list_alphas_db_schema,
+    lookup_expression_schema,
+    rank_alphas_schema,
     resolve_cutoff_schema,
+    check_correlation_schema,
+    screen_alphas_schema,
     simulate_alpha_schema,
+    enqueue_simulations_schema,
+    poll_simulations_schema,
+    cancel_simulations_schema,
 ]
 
 TOOL_REGISTRY = {
     "get_alpha_detail": get_alpha_detail,
     "get_backtest_metrics": get_backtest_metrics,
+    "get_backtest_metrics_batch": get_backtest_metrics_batch,
     "list_alphas": list_alphas,
+    "list_alphas_db": list_alphas_db,
+    "lookup_expression": lookup_expression,
+    "rank_alphas": rank_alphas,
     "resolve_cutoff": resolve_cutoff,
+    "check_correlation": check_correlation,
+    "screen_alphas": screen_alphas,
     "simulate_alpha": simulate_alpha,
-}
\ No newline at end of file
+    "enqueue_simulations": enqueue_simulations,
+    "poll_simulations": poll_simulations,
+    "cancel_simulations": cancel_simulations,
+}
+
+# 工具级的超时（秒）和同时执行上限，tool_dispatch.ToolDispatcher 使用；
+# 没列出的工具用 dispatcher 的默认值。
+# cacheable: 纯查询 / 纯计算的工具，同一个 session 内相同参数的结果可以复用
+TOOL_POLICIES = {
+    "get_alpha_detail": {"timeout": 30, "max_concurrency": 8, "cacheable": True},
+    "get_backtest_metrics": {"timeout": 30, "max_concurrency": 8, "cacheable": True},
+    "get_backtest_metrics_batch": {"timeout": 120, "max_concurrency": 2},
+    "list_alphas": {"timeout": 120, "max_concurrency": 1},
+    "list_alphas_db": {"timeout": 60, "max_concurrency": 4},
+    "lookup_expression": {"timeout": 30, "max_concurrency": 8},
+    "rank_alphas": {"timeout": 60, "max_concurrency": 4, "cacheable": True},
+    "resolve_cutoff": {"timeout": 10, "max_concurrency": 8, "cacheable": True},
+    "check_correlation": {"timeout": 120, "max_concurrency": 4},
+    "screen_alphas": {"timeout": 60, "max_concurrency": 4},
+    "simulate_alpha": {"timeout": 600, "max_concurrency": 2},
+    "enqueue_simulations": {"timeout": 60, "max_concurrency": 2},
+    "poll_simulations": {"timeout": 30, "max_concurrency": 8},
+    "cancel_simulations": {"timeout": 10, "max_concurrency": 8},
+}
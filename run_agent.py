@@ -1,46 +1,120 @@
 # run_agent.py
 
 import json
+import os
 from openai import OpenAI
+import instrument
 from agent_prompt import RESEARCH_PROMPT
-from registry import TOOLS, TOOL_REGISTRY
+from registry import TOOLS, TOOL_REGISTRY, TOOL_POLICIES
+from tool_dispatch import ToolCall, ToolDispatcher, ToolMemo
 
+MODEL = os.getenv("MODEL_NAME", "gpt-4.1")
+# 防止无限调用工具：最多这么多轮模型调用
+MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "8"))
 
-def main():
-    client = OpenAI()
 
-    resp = client.responses.create(
-        model="gpt-4.1",
-        input=RESEARCH_PROMPT,
-        tools=TOOLS,
-    )
-
-    print("\n=== RAW RESPONSE OUTPUT ===")
+def _tool_calls(resp):
+    calls = []
     for o in resp.output:
-        print(o)
+        # 注意：type 是 "function_call"
+        if getattr(o, "type", None) == "function_call":
+            # arguments 不合法只影响这一个 call：作为它的错误结果喂回模型，不中断整个 run
+            try:
+                args = json.loads(o.arguments or "{}")
+            except json.JSONDecodeError as e:
+                calls.append(ToolCall(call_id=o.call_id, name=o.name, error=f"invalid JSON arguments: {e}"))
+                continue
+            if not isinstance(args, dict):
+                calls.append(ToolCall(call_id=o.call_id, name=o.name,
+                                      error="arguments must be a JSON object"))
+                continue
+            calls.append(ToolCall(call_id=o.call_id, name=o.name, arguments=args))
+    return calls
 
-    print("\n=== PARSED TOOL CALLS ===")
 
-    tool_called = False
+def _create(client, **kwargs):
+    """一次模型调用；开了 instrument 时计时并累计 token 用量。"""
+    with instrument.span("llm", model=MODEL):
+        resp = client.responses.create(model=MODEL, tools=TOOLS, **kwargs)
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        instrument.count("llm_tokens_total", getattr(usage, "input_tokens", 0) or 0, kind="input")
+        instrument.count("llm_tokens_total", getattr(usage, "output_tokens", 0) or 0, kind="output")
+    return resp
 
-    for o in resp.output:
-        # 注意：type 是 "function_call"
-        if getattr(o, "type", None) == "function_call":
-            tool_called = True
 
-            tool_name = o.name
-            args = json.loads(o.arguments or "{}")
+def _report():
+    if not instrument.enabled():
+        return
+    print("\n=== TIMING ===")
+    print(instrument.summary())
+    path = os.getenv("INSTRUMENT_METRICS")
+    if path:
+        instrument.write_metrics(path)
+
 
-            print(f">>> TOOL CALL: {tool_name}({args})")
+def _loop(client, dispatcher):
+    resp = _create(client, input=RESEARCH_PROMPT)
 
-            result = TOOL_REGISTRY[tool_name](**args)
+    for step in range(1, MAX_ITERATIONS + 1):
+        calls = _tool_calls(resp)
+        if not calls:
+            break
 
-            print(">>> TOOL RESULT:")
-            print(result)
+        print(f"\n=== STEP {step}: {len(calls)} TOOL CALL(S) ===")
+        for c in calls:
+            print(f">>> TOOL CALL: {c.name}({c.arguments})")
+
+        # 同一轮里的 call 互相独立，并发执行；结果按调用顺序返回
+        with instrument.span("agent_step", attrs={"step": step, "calls": len(calls)}):
+            results = dispatcher.run(calls)
+
+        for r in results:
+            print(f">>> TOOL RESULT: {r.name} ({r.elapsed:.2f}s)")
+            print(r.output if r.ok else f"ERROR: {r.error}")
+
+        # 把结果喂回模型，继续下一轮
+        resp = _create(
+            client,
+            previous_response_id=resp.id,
+            input=[
+                {
+                    "type": "function_call_output",
+                    "call_id": r.call_id,
+                    "output": r.to_output(),
+                }
+                for r in results
+            ],
+        )
+    else:
+        if _tool_calls(resp):
+            print(f"\n⚠️ Stopped after MAX_ITERATIONS={MAX_ITERATIONS} with tool calls pending.")
+
+    return resp
+
+
+def main():
+    client = OpenAI()
+
+    # session 级的 memo：同一次研究里重复查同一个 alpha / 指标直接复用结果
+    memo = ToolMemo()
+    dispatcher = ToolDispatcher(
+        TOOL_REGISTRY,
+        TOOL_POLICIES,
+        max_workers=int(os.getenv("TOOL_WORKERS", "8")),
+        memo=memo,
+    )
 
-    if not tool_called:
-        print("\n⚠️ No tool call detected.")
+    try:
+        with instrument.span("agent_run", attrs={"model": MODEL}):
+            resp = _loop(client, dispatcher)
+    finally:
+        dispatcher.shutdown()
 
+    print("\n=== FINAL ANSWER ===")
+    print(resp.output_text)
+    print(f"\n(tool memo: {memo.hits} hits / {memo.misses} misses)")
+    _report()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
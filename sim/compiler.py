@@ -0,0 +1,232 @@
+# sim/compiler.py
+"""
+表达式规范化 + 批量求值时的公共子表达式复用。
+
+canonicalize(node):
+  - add / multiply 满足交换律、结合律：展开嵌套、参数按规范文本排序、常数合并
+  - subtract(x, c) -> add(x, -c)，neg(neg(x)) -> x，x + 0 / x * 1 去掉
+  这样 "rank(volume) + close" 和 "close+rank( volume )" 得到同一棵树。
+
+to_string(node):
+  规范树的文本形式，也是公共子表达式 / 指纹的 key。
+
+fingerprint(expression):
+  规范文本的 sha1。解析不了的表达式（本地算子子集之外的语法）退化成去掉空白后的原文。
+
+BatchEvaluator:
+  一批表达式先规范化，按节点求值；同一个子树（比如 ts_mean(close, 20)）只算一次。
+  中间结果放在按字节数限制的 LRU 里，跨批次复用 —— 研究时一批表达式多是同一个
+  父表达式的小改动，共享的中间结果很多。
+  可以被多个线程共用（工具是并发调用的）：LRU 的读写在锁里，算子求值在锁外。
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from sim.expr import Call, ExpressionError, Node, Num, Var, apply_op, parse, value_args
+from sim.panel import Panel
+
+_COMMUTATIVE = {"add": 0.0, "multiply": 1.0}  # 运算 -> 单位元
+
+
+def _fmt_num(v: float) -> str:
+    if v == int(v) and abs(v) < 1e15:
+        return str(int(v))
+    # repr 是能还原成同一个 float 的最短写法：不同的常数不会被写成同一个文本 / 指纹
+    return repr(float(v))
+
+
+def to_string(node: Node) -> str:
+    if isinstance(node, Num):
+        return _fmt_num(node.value)
+    if isinstance(node, Var):
+        return node.name
+    return f"{node.op}({','.join(to_string(a) for a in node.args)})"
+
+
+def _flatten(op: str, node: Node, out: List[Node]) -> None:
+    if isinstance(node, Call) and node.op == op:
+        for a in node.args:
+            _flatten(op, a, out)
+    else:
+        out.append(node)
+
+
+def canonicalize(node: Node) -> Node:
+    if not isinstance(node, Call):
+        return node
+
+    args = tuple(
+        canonicalize(a) if is_value else a
+        for a, is_value in zip(node.args, value_args(node))
+    )
+    op = node.op
+
+    if op == "neg":
+        inner = args[0]
+        if isinstance(inner, Num):
+            return Num(-inner.value)
+        if isinstance(inner, Call) and inner.op == "neg":
+            return inner.args[0]
+        return Call(op, args)
+
+    if op == "subtract" and isinstance(args[1], Num):
+        return canonicalize(Call("add", (args[0], Num(-args[1].value))))
+
+    if op in _COMMUTATIVE:
+        flat: List[Node] = []
+        for a in args:
+            _flatten(op, a, flat)
+
+        identity = _COMMUTATIVE[op]
+        const = identity
+        terms = []
+        for a in flat:
+            if isinstance(a, Num):
+                const = const + a.value if op == "add" else const * a.value
+            else:
+                terms.append(a)
+
+        terms.sort(key=to_string)
+        if const != identity or not terms:
+            terms.append(Num(const))
+        if len(terms) == 1:
+            return terms[0]
+
+        out = terms[0]
+        for t in terms[1:]:
+            out = Call(op, (out, t))
+        return out
+
+    return Call(op, args)
+
+
+def compile_expression(expression: Union[str, Node]) -> Node:
+    node = parse(expression) if isinstance(expression, str) else expression
+    return canonicalize(node)
+
+
+def canonical_text(expression: str) -> str:
+    try:
+        return to_string(compile_expression(expression))
+    except ExpressionError:
+        return re.sub(r"\s+", "", expression)
+
+
+def hash_canonical(canonical: str) -> str:
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def fingerprint(expression: str) -> str:
+    return hash_canonical(canonical_text(expression))
+
+
+class BatchEvaluator:
+    """
+    绑定一个 Panel 的求值器。中间结果按规范子树缓存，总大小不超过 max_bytes。
+    缓存里的数组是只读的，调用方要改请先 copy。
+    线程安全；两个线程同时算同一个子树时各算一次，缓存里只留一份。
+    """
+
+    def __init__(self, panel: Panel, max_bytes: int = 1024 * 1024 * 1024):
+        self.panel = panel
+        self.max_bytes = max_bytes
+        self._cache: "OrderedDict[Node, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _get(self, node: Node) -> Optional[np.ndarray]:
+        with self._lock:
+            arr = self._cache.get(node)
+            if arr is not None:
+                self._cache.move_to_end(node)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return arr
+
+    def _put(self, node: Node, arr: np.ndarray) -> None:
+        if arr.nbytes > self.max_bytes:
+            return
+        arr.setflags(write=False)
+        with self._lock:
+            old = self._cache.pop(node, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._cache[node] = arr
+            self._bytes += arr.nbytes
+            while self._bytes > self.max_bytes:
+                _, old = self._cache.popitem(last=False)
+                self._bytes -= old.nbytes
+
+    def _eval(self, node: Node, pinned: Optional[Dict[Node, np.ndarray]] = None,
+              shared: frozenset = frozenset()) -> np.ndarray:
+        if isinstance(node, Num):
+            return np.broadcast_to(np.float64(node.value), self.panel.shape)
+        if isinstance(node, Var):
+            return self.panel.field(node.name)
+
+        if pinned is not None and node in pinned:
+            with self._lock:
+                self.hits += 1
+            return pinned[node]
+        cached = self._get(node)
+        if cached is not None:
+            return cached
+
+        args = [
+            self._eval(a, pinned, shared) if is_value else None
+            for a, is_value in zip(node.args, value_args(node))
+        ]
+        out = np.asarray(apply_op(node, args, self.panel))
+        if out.flags.owndata:
+            self._put(node, out)
+            if pinned is not None and node in shared:
+                pinned[node] = out
+        return out
+
+    def evaluate(self, expression: Union[str, Node]) -> np.ndarray:
+        return self._eval(compile_expression(expression))
+
+    def evaluate_many(self, expressions: List[Union[str, Node]]) -> List[np.ndarray]:
+        """
+        整批求值。所有表达式先规范化，合成一个 DAG：相同子树是同一个节点。
+        在这批里出现不止一次的节点在整批期间钉住，不受 LRU 淘汰影响，保证只算一次；
+        批次结束后只留在 LRU 里给下一批用。
+        """
+        roots = [compile_expression(e) for e in expressions]
+
+        counts: Dict[Node, int] = {}
+
+        def visit(node: Node) -> None:
+            if not isinstance(node, Call):
+                return
+            counts[node] = counts.get(node, 0) + 1
+            if counts[node] > 1:
+                return  # 子树已经数过
+            for a, is_value in zip(node.args, value_args(node)):
+                if is_value:
+                    visit(a)
+
+        for r in roots:
+            visit(r)
+
+        # 钉住的节点是这一批自己的，不放在 self 上，并发的批次互不影响
+        shared = frozenset(n for n, c in counts.items() if c > 1)
+        pinned: Dict[Node, np.ndarray] = {}
+        return [self._eval(r, pinned, shared) for r in roots]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,132 @@
+# sim/engine.py
+"""
+本地向量化回测：表达式 -> alpha 面板 -> 持仓 -> 日 PnL -> 指标。
+
+流程和 BRAIN 的设置对应：
+  1. 求值表达式，得到 (T, N) 的 alpha
+  2. universe 之外的置为 NaN
+  3. neutralization：NONE / MARKET（截面去均值）/ 任意分组字段名（组内去均值）
+  4. 每天按 sum|w| = 1 归一化成持仓
+  5. delay：第 t 天收盘建的仓用 t-delay 天的 alpha，赚 t+1 天的收益
+
+指标口径（近似 BRAIN）：
+  sharpe   = mean(pnl) / std(pnl) * sqrt(252)
+  returns  = mean(pnl) * 252
+  turnover = 日均 sum|w_t - w_{t-1}|
+  fitness  = sharpe * sqrt(|returns| / max(turnover, 0.125))
+  drawdown = 累计 PnL 的最大回撤
+  margin   = 总 PnL / 总交易额
+"""
+import warnings
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from sim.expr import Node, evaluate, parse
+from sim.operators import group_neutralize
+from sim.panel import Panel
+
+TRADING_DAYS = 252
+
+
+def neutralize(alpha: np.ndarray, panel: Panel, neutralization: Optional[str]) -> np.ndarray:
+    mode = (neutralization or "NONE").upper()
+    if mode == "NONE":
+        return alpha
+    if mode == "MARKET":
+        # 整行都是 NaN 的日期（universe 为空）nanmean 会告警，结果照样是 NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return alpha - np.nanmean(alpha, axis=1, keepdims=True)
+    # 其余按分组字段处理：INDUSTRY -> groups["industry"]
+    return group_neutralize(alpha, panel.group(mode.lower()))
+
+
+def to_weights(alpha: np.ndarray) -> np.ndarray:
+    gross = np.nansum(np.abs(alpha), axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        w = np.where(gross > 0, alpha / gross, 0.0)
+    return np.nan_to_num(w, nan=0.0)
+
+
+def backtest(weights: np.ndarray, returns: np.ndarray, delay: int = 1) -> Dict[str, Any]:
+    """weights[t] 是用第 t 天 alpha 算出的目标持仓。"""
+    T = len(weights)
+    lag = 1 + delay
+    held = np.zeros_like(weights)
+    if lag < T:
+        held[lag:] = weights[:T - lag]
+
+    pnl = np.nansum(held * np.nan_to_num(returns, nan=0.0), axis=1)
+    traded = np.abs(np.diff(held, axis=0, prepend=0.0)).sum(axis=1)
+
+    # 从第一天有持仓开始算指标
+    active = np.flatnonzero(np.abs(held).sum(axis=1) > 0)
+    start = active[0] if len(active) else T
+    pnl_a = pnl[start:]
+    traded_a = traded[start:]
+
+    if len(pnl_a) < 2:
+        return {"pnl": pnl, "sharpe": 0.0, "returns": 0.0, "turnover": 0.0,
+                "fitness": 0.0, "drawdown": 0.0, "margin": 0.0}
+
+    mean, std = pnl_a.mean(), pnl_a.std(ddof=1)
+    sharpe = float(mean / std * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0
+    ann_ret = float(mean * TRADING_DAYS)
+    turnover = float(traded_a.mean())
+    fitness = sharpe * float(np.sqrt(abs(ann_ret) / max(turnover, 0.125)))
+
+    cum = np.cumsum(pnl_a)
+    drawdown = float(np.max(np.maximum.accumulate(np.maximum(cum, 0.0)) - cum))
+    total_traded = traded_a.sum()
+    margin = float(pnl_a.sum() / total_traded) if total_traded > 0 else 0.0
+
+    return {
+        "pnl": pnl,
+        "sharpe": sharpe,
+        "returns": ann_ret,
+        "turnover": turnover,
+        "fitness": fitness,
+        "drawdown": drawdown,
+        "margin": margin,
+    }
+
+
+def simulate(
+    expression: Union[str, Node],
+    panel: Panel,
+    delay: int = 1,
+    universe: Optional[str] = None,
+    neutralization: Optional[str] = "MARKET",
+    alpha: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate an expression over the panel and backtest it.
+    Pass a precomputed `alpha` panel to skip expression evaluation.
+    """
+    if alpha is None:
+        node = parse(expression) if isinstance(expression, str) else expression
+        alpha = evaluate(node, panel)
+
+    alpha = np.array(alpha, dtype=np.float64)  # 拷贝：evaluate 可能返回只读视图 / 共享缓存
+    alpha[~panel.universe(universe)] = np.nan
+    alpha = neutralize(alpha, panel, neutralization)
+
+    return backtest(to_weights(alpha), panel.returns(), delay=delay)
+
+
+def simulate_many(
+    expressions: List[Union[str, Node]],
+    panel: Panel,
+    evaluator: Optional["BatchEvaluator"] = None,
+    **settings: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Backtest a batch of expressions with shared-subexpression evaluation.
+    `settings` are passed to simulate (delay, universe, neutralization).
+    """
+    from sim.compiler import BatchEvaluator
+
+    evaluator = evaluator or BatchEvaluator(panel)
+    alphas = evaluator.evaluate_many(expressions)
+    return [simulate(e, panel, alpha=a, **settings) for e, a in zip(expressions, alphas)]
@@ -0,0 +1,182 @@
+# sim/expr.py
+"""
+FASTEXPR 表达式的解析和求值。
+
+语法（子集）：
+    expr   := term (('+' | '-') term)*
+    term   := unary (('*' | '/') unary)*
+    unary  := '-' unary | atom
+    atom   := NUMBER | NAME | NAME '(' expr (',' expr)* ')' | '(' expr ')'
+
+四则运算统一成 Call("add" / "subtract" / "multiply" / "divide" / "neg")，
+这样求值、后续的规范化都只需要处理 Num / Var / Call 三种节点。
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from sim.operators import OPERATORS
+from sim.panel import Panel
+
+
+@dataclass(frozen=True)
+class Num:
+    value: float
+
+
+@dataclass(frozen=True)
+class Var:
+    name: str
+
+
+@dataclass(frozen=True)
+class Call:
+    op: str
+    args: Tuple["Node", ...]
+
+
+Node = Union[Num, Var, Call]
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.\d*|\.\d+|\d+)|([A-Za-z_][A-Za-z0-9_]*)|(.))")
+_BINARY = {"+": "add", "-": "subtract", "*": "multiply", "/": "divide"}
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    for num, name, sym in _TOKEN.findall(text.strip()):
+        if num:
+            tokens.append(("num", num))
+        elif name:
+            tokens.append(("name", name))
+        elif sym.strip():
+            tokens.append(("sym", sym))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, value=None):
+        tok = self.peek()
+        if tok[0] is None or (value is not None and tok[1] != value):
+            raise ExpressionError(f"expected {value or 'token'} at position {self.pos} in {self.text!r}")
+        self.pos += 1
+        return tok
+
+    def parse(self) -> Node:
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"unexpected {self.peek()[1]!r} in {self.text!r}")
+        return node
+
+    def expr(self) -> Node:
+        node = self.term()
+        while self.peek()[1] in ("+", "-"):
+            op = _BINARY[self.take()[1]]
+            node = Call(op, (node, self.term()))
+        return node
+
+    def term(self) -> Node:
+        node = self.unary()
+        while self.peek()[1] in ("*", "/"):
+            op = _BINARY[self.take()[1]]
+            node = Call(op, (node, self.unary()))
+        return node
+
+    def unary(self) -> Node:
+        if self.peek()[1] == "-":
+            self.take()
+            inner = self.unary()
+            if isinstance(inner, Num):
+                return Num(-inner.value)
+            return Call("neg", (inner,))
+        return self.atom()
+
+    def atom(self) -> Node:
+        kind, value = self.peek()
+        if kind == "num":
+            self.take()
+            return Num(float(value))
+        if kind == "name":
+            self.take()
+            if self.peek()[1] != "(":
+                return Var(value)
+            self.take("(")
+            args = [self.expr()]
+            while self.peek()[1] == ",":
+                self.take()
+                args.append(self.expr())
+            self.take(")")
+            return Call(value, tuple(args))
+        if value == "(":
+            self.take()
+            node = self.expr()
+            self.take(")")
+            return node
+        raise ExpressionError(f"unexpected {value!r} in {self.text!r}")
+
+
+def parse(text: str) -> Node:
+    return _Parser(text).parse()
+
+
+def _window(node: Node) -> int:
+    if not isinstance(node, Num) or node.value != int(node.value) or node.value < 1:
+        raise ExpressionError(f"window must be a positive integer constant, got {node}")
+    return int(node.value)
+
+
+def apply_op(node: Call, args: List, panel: Panel) -> np.ndarray:
+    """
+    调用算子。args 是已经算好的 "x" 参数（按位置，非 "x" 位置为 None）；
+    窗口常量和分组字段直接从 AST 上取。
+    """
+    if node.op not in OPERATORS:
+        raise ExpressionError(f"unsupported operator: {node.op}")
+    fn, kinds = OPERATORS[node.op]
+    if len(node.args) != len(kinds):
+        raise ExpressionError(f"{node.op} expects {len(kinds)} arguments, got {len(node.args)}")
+
+    call_args = []
+    for kind, arg_node, value in zip(kinds, node.args, args):
+        if kind == "d":
+            call_args.append(_window(arg_node))
+        elif kind == "g":
+            if not isinstance(arg_node, Var):
+                raise ExpressionError(f"{node.op} expects a group field name")
+            call_args.append(panel.group(arg_node.name))
+        else:
+            call_args.append(value)
+    return fn(*call_args)
+
+
+def value_args(node: Call) -> List[bool]:
+    """哪些参数位置需要先求值（"x"）。"""
+    kinds = OPERATORS.get(node.op, (None, ("x",) * len(node.args)))[1]
+    return [k == "x" for k in kinds]
+
+
+def evaluate(node: Node, panel: Panel) -> np.ndarray:
+    if isinstance(node, Num):
+        # 只读的广播视图，不占 T×N 的内存
+        return np.broadcast_to(np.float64(node.value), panel.shape)
+    if isinstance(node, Var):
+        return panel.field(node.name)
+    args = [
+        evaluate(a, panel) if is_value else None
+        for a, is_value in zip(node.args, value_args(node))
+    ]
+    return apply_op(node, args, panel)
@@ -0,0 +1,167 @@
+# sim/operators.py
+"""
+FASTEXPR 算子子集的 NumPy 实现。所有输入输出都是 (T, N) float 数组，NaN 表示缺失。
+
+截面算子（按行）：rank、group_neutralize
+时序算子（按列）：ts_mean、ts_sum、ts_std_dev、ts_delta、ts_delay、ts_rank
+逐元素：abs、log、sign 以及四则运算
+"""
+import numpy as np
+
+
+def _shift(x: np.ndarray, d: int) -> np.ndarray:
+    out = np.full(x.shape, np.nan)
+    if d < len(x):
+        out[d:] = x[:len(x) - d]
+    return out
+
+
+def _rolling_sum_count(x: np.ndarray, d: int):
+    valid = ~np.isnan(x)
+    # PanelStore 的字段是 float32；float32 的前缀和相减会严重抵消，累加一律用 float64
+    s = np.cumsum(np.where(valid, x, 0.0), axis=0, dtype=np.float64)
+    c = np.cumsum(valid, axis=0)
+    s[d:] = s[d:] - s[:-d]
+    c[d:] = c[d:] - c[:-d]
+    return s, c
+
+
+def rank(x: np.ndarray) -> np.ndarray:
+    """截面排名，映射到 [0, 1]；并列值取平均排名，整行相同就都是 0.5。"""
+    T, N = x.shape
+    order = np.argsort(x, axis=1, kind="stable")  # NaN 排在最后
+    s = np.take_along_axis(x, order, axis=1)
+    pos = np.broadcast_to(np.arange(N), (T, N))
+    # 排序后相等的一段是一组并列值，组内的名次取首尾的平均
+    starts = np.ones((T, N), dtype=bool)
+    starts[:, 1:] = s[:, 1:] != s[:, :-1]
+    ends = np.ones((T, N), dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    first = np.maximum.accumulate(np.where(starts, pos, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends, pos, N - 1)[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty(x.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2.0, axis=1)
+    valid = ~np.isnan(x)
+    n = valid.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(n > 1, ranks / (n - 1), 0.5)
+    out[~valid] = np.nan
+    return out
+
+
+def ts_sum(x: np.ndarray, d: int) -> np.ndarray:
+    s, c = _rolling_sum_count(x, d)
+    out = np.where(c > 0, s, np.nan)
+    out[:d - 1] = np.nan
+    return out
+
+
+def ts_mean(x: np.ndarray, d: int) -> np.ndarray:
+    s, c = _rolling_sum_count(x, d)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(c > 0, s / c, np.nan)
+    out[:d - 1] = np.nan
+    return out
+
+
+def ts_std_dev(x: np.ndarray, d: int) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    mean = ts_mean(x, d)
+    sq = ts_mean(x * x, d)
+    return np.sqrt(np.maximum(sq - mean * mean, 0.0))
+
+
+def ts_delay(x: np.ndarray, d: int) -> np.ndarray:
+    return _shift(x, d)
+
+
+def ts_delta(x: np.ndarray, d: int) -> np.ndarray:
+    return x - _shift(x, d)
+
+
+def ts_rank(x: np.ndarray, d: int) -> np.ndarray:
+    """当前值在过去 d 天（含当天）里的排名，映射到 [0, 1]。"""
+    out = np.full(x.shape, np.nan)
+    T = len(x)
+    if d > T:
+        return out
+    # 逐个 lag 累加计数，只占 (T, N) 的内存，不展开成 (T, N, d) 的窗口
+    cur = x[d - 1:]
+    below = np.zeros(cur.shape, dtype=np.int64)
+    n = np.zeros(cur.shape, dtype=np.int64)
+    with np.errstate(invalid="ignore"):
+        for k in range(d):
+            w = x[k:k + T - d + 1]
+            below += w < cur
+            n += ~np.isnan(w)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.where(n > 1, below / (n - 1), 0.5)
+    r[np.isnan(cur)] = np.nan
+    out[d - 1:] = r
+    return out
+
+
+def group_neutralize(x: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """每一天每个分组内减去组均值。用 bincount 一次算完所有 (日期, 分组) 的均值。"""
+    T, N = x.shape
+    g = np.asarray(group, dtype=np.int64)
+    n_groups = int(g.max()) + 1 if g.size else 1
+    key = (np.arange(T)[:, None] * n_groups + g).ravel()
+
+    valid = ~np.isnan(x).ravel()
+    vals = np.where(valid, x.ravel(), 0.0)
+    sums = np.bincount(key, weights=vals, minlength=T * n_groups)
+    counts = np.bincount(key, weights=valid.astype(float), minlength=T * n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    return x - means[key].reshape(T, N)
+
+
+def add(a, b):
+    return a + b
+
+
+def subtract(a, b):
+    return a - b
+
+
+def multiply(a, b):
+    return a * b
+
+
+def divide(a, b):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.divide(a, b)
+    return np.where(np.isinf(out), np.nan, out)
+
+
+def neg(a):
+    return -a
+
+
+def log(a):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.log(a)
+    return np.where(np.isinf(out), np.nan, out)
+
+
+# 算子表：名字 -> (函数, 参数种类)
+#   "x" = 表达式（数组），"d" = 整数窗口常量，"g" = 分组字段名
+OPERATORS = {
+    "rank": (rank, ("x",)),
+    "ts_mean": (ts_mean, ("x", "d")),
+    "ts_sum": (ts_sum, ("x", "d")),
+    "ts_std_dev": (ts_std_dev, ("x", "d")),
+    "ts_delay": (ts_delay, ("x", "d")),
+    "ts_delta": (ts_delta, ("x", "d")),
+    "ts_rank": (ts_rank, ("x", "d")),
+    "group_neutralize": (group_neutralize, ("x", "g")),
+    "abs": (np.abs, ("x",)),
+    "sign": (np.sign, ("x",)),
+    "log": (log, ("x",)),
+    "add": (add, ("x", "x")),
+    "subtract": (subtract, ("x", "x")),
+    "multiply": (multiply, ("x", "x")),
+    "divide": (divide, ("x", "x")),
+    "neg": (neg, ("x",)),
+}
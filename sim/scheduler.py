@@ -0,0 +1,314 @@
+# sim/scheduler.py
+"""
+批量模拟调度：提交一批表达式，后台用进程池跑，调用方轮询结果。
+
+submit(expressions, priority, **settings) -> 批次摘要
+  - 每个表达式先规范化，(指纹, settings) 的 hash 作为 key：
+    同一个 key 已经在队列里 / 跑完的直接复用那个 job；known 回调认为已经落库的标成 skipped
+  - 进优先级队列：priority 大的先跑，同优先级先进先出
+
+调度线程按优先级每次取 chunk_size 个 job 作为一块交给进程池，在途的块不超过 worker 数；
+其余都留在队列里，所以 cancel 对还没开跑的 job 立即生效，已经在跑的结果直接丢弃。
+
+worker 进程启动时打开一次面板（PanelStore 目录是 memmap，多个进程共享 page cache），
+进程内的 BatchEvaluator 跨块复用公共子表达式。
+
+跑完的结果攒够 persist_batch 条或者每 persist_interval 秒交给 persist 回调批量落库。
+"""
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sim.compiler import BatchEvaluator, compile_expression, fingerprint
+from sim.engine import simulate
+from sim.expr import ExpressionError
+from sim.store import open_panel
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"  # known 回调说已经模拟过
+
+METRICS = ("sharpe", "fitness", "turnover", "returns", "drawdown", "margin")
+
+
+def normalize_settings(universe: Optional[str] = None, delay: int = 1,
+                       neutralization: Optional[str] = "MARKET") -> Dict[str, Any]:
+    return {
+        "universe": universe or None,
+        "delay": int(delay),
+        "neutralization": (neutralization or "NONE").upper(),
+    }
+
+
+def job_key(expression: str, settings: Dict[str, Any]) -> str:
+    """表达式指纹 + settings 的 hash；写法不同但等价的表达式得到同一个 key。"""
+    compile_expression(expression)  # 本地跑不了的表达式在提交时就报错
+    raw = f"{fingerprint(expression)}|{settings['universe'] or ''}|{settings['delay']}|{settings['neutralization']}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+@dataclass
+class SimJob:
+    job_id: str
+    key: str
+    expression: str
+    settings: Dict[str, Any]
+    priority: int = 0
+    status: str = QUEUED
+    result: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+    batches: Set[str] = field(default_factory=set)
+    finished_at: Optional[float] = None
+
+
+# ---------- worker 进程 ----------
+
+_WORKER_EVALUATOR: Optional[BatchEvaluator] = None
+
+
+def _init_worker(panel_path: str, cache_bytes: int) -> None:
+    global _WORKER_EVALUATOR
+    _WORKER_EVALUATOR = BatchEvaluator(open_panel(panel_path), max_bytes=cache_bytes)
+
+
+def _run_chunk(items: List[Tuple[str, str, Dict[str, Any]]]) -> List[Tuple[str, Optional[Dict], Optional[str]]]:
+    evaluator = _WORKER_EVALUATOR
+    out = []
+    for job_id, expression, settings in items:
+        try:
+            r = simulate(expression, evaluator.panel, alpha=evaluator.evaluate(expression), **settings)
+        except KeyError as e:
+            out.append((job_id, None, e.args[0]))
+        except Exception as e:
+            out.append((job_id, None, str(e)))
+        else:
+            out.append((job_id, {k: float(r[k]) for k in METRICS}, None))
+    return out
+
+
+# ---------- 调度 ----------
+
+class SimScheduler:
+    def __init__(
+        self,
+        panel_path: str,
+        workers: int = 4,
+        chunk_size: int = 16,
+        cache_bytes: int = 512 * 1024 * 1024,
+        known: Optional[Callable[[List[str]], Iterable[str]]] = None,
+        persist: Optional[Callable[[List[SimJob]], None]] = None,
+        persist_batch: int = 500,
+        persist_interval: float = 5.0,
+    ):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.known = known
+        self.persist = persist
+        self.persist_batch = persist_batch
+        self.persist_interval = persist_interval
+
+        self.jobs: Dict[str, SimJob] = {}
+        self.batches: Dict[str, List[str]] = {}
+        self._by_key: Dict[str, str] = {}
+        self._heap: List[Tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        self._to_persist: List[SimJob] = []
+        self._last_flush = time.monotonic()
+        self._in_flight = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # spawn：调度线程 / 连接池线程还在跑，fork 出来的子进程可能继承到被锁住的锁
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(panel_path, cache_bytes),
+        )
+        self._thread = threading.Thread(target=self._loop, name="sim-scheduler", daemon=True)
+        self._thread.start()
+
+    # ----- 提交 / 取消 / 查询 -----
+
+    def submit(self, expressions: List[str], priority: int = 0, **settings: Any) -> Dict[str, Any]:
+        settings = normalize_settings(**settings)
+        batch_id = uuid.uuid4().hex[:12]
+
+        keyed: List[Tuple[str, str]] = []
+        invalid = []
+        for expr in expressions:
+            try:
+                keyed.append((expr, job_key(expr, settings)))
+            except ExpressionError as e:
+                invalid.append({"expression": expr, "error": str(e)})
+
+        known = set(self.known([k for _, k in keyed])) if self.known and keyed else set()
+
+        job_ids: List[str] = []
+        counts = {"queued": 0, "duplicates": 0, "skipped": 0}
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("scheduler is closed")
+            for expr, key in keyed:
+                job = self.jobs.get(self._by_key.get(key, ""))
+                if job is not None and job.status not in (FAILED, CANCELLED):
+                    counts["duplicates"] += 1
+                    if job.status == QUEUED and priority > job.priority:
+                        job.priority = priority
+                        heapq.heappush(self._heap, (-priority, next(self._seq), job.job_id))
+                else:
+                    job = SimJob(job_id=uuid.uuid4().hex[:16], key=key, expression=expr,
+                                 settings=settings, priority=priority)
+                    self.jobs[job.job_id] = job
+                    self._by_key[key] = job.job_id
+                    if key in known:
+                        job.status = SKIPPED
+                        job.finished_at = time.time()
+                        counts["skipped"] += 1
+                    else:
+                        heapq.heappush(self._heap, (-priority, next(self._seq), job.job_id))
+                        counts["queued"] += 1
+                if batch_id not in job.batches:
+                    job.batches.add(batch_id)
+                    job_ids.append(job.job_id)
+            self.batches[batch_id] = job_ids
+            self._cond.notify_all()
+
+        return {"batch_id": batch_id, "jobs": len(job_ids), **counts, "invalid": invalid}
+
+    def cancel(self, batch_id: str) -> int:
+        """取消一个批次；被其它批次共用的 job 不受影响。返回取消的 job 数。"""
+        n = 0
+        with self._cond:
+            for job_id in self.batches.get(batch_id, []):
+                job = self.jobs[job_id]
+                job.batches.discard(batch_id)
+                if not job.batches and job.status in (QUEUED, RUNNING):
+                    job.status = CANCELLED
+                    job.finished_at = time.time()
+                    n += 1
+        return n
+
+    def batch_jobs(self, batch_id: str) -> Optional[List[SimJob]]:
+        with self._cond:
+            ids = self.batches.get(batch_id)
+            return None if ids is None else [self.jobs[i] for i in ids]
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            out: Dict[str, int] = {}
+            for job in self.jobs.values():
+                out[job.status] = out.get(job.status, 0) + 1
+            out["in_flight_chunks"] = self._in_flight
+            return out
+
+    # ----- 调度线程 -----
+
+    def _take_chunk(self) -> List[SimJob]:
+        chunk = []
+        while self._heap and len(chunk) < self.chunk_size:
+            _, _, job_id = heapq.heappop(self._heap)
+            job = self.jobs[job_id]
+            if job.status != QUEUED:
+                continue  # 已取消，或者提过优先级后的旧条目
+            job.status = RUNNING
+            chunk.append(job)
+        return chunk
+
+    def _flush_due(self) -> bool:
+        if not self._to_persist:
+            return False
+        return (self._closed or len(self._to_persist) >= self.persist_batch
+                or time.monotonic() - self._last_flush >= self.persist_interval)
+
+    def _ready(self) -> bool:
+        if self._closed:
+            return self._in_flight == 0 or self._flush_due()
+        return self._flush_due() or (bool(self._heap) and self._in_flight < self.workers)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(self._ready, timeout=self.persist_interval)
+                chunks = []
+                while not self._closed and self._in_flight < self.workers:
+                    chunk = self._take_chunk()
+                    if not chunk:
+                        break
+                    self._in_flight += 1
+                    chunks.append(chunk)
+                flush: List[SimJob] = []
+                if self._flush_due():
+                    flush, self._to_persist = self._to_persist, []
+                    self._last_flush = time.monotonic()
+                stop = self._closed and self._in_flight == 0 and not self._to_persist
+
+            for chunk in chunks:
+                items = [(j.job_id, j.expression, j.settings) for j in chunk]
+                try:
+                    fut = self._pool.submit(_run_chunk, items)
+                except Exception as e:
+                    self._finish(chunk, [(j.job_id, None, f"submit failed: {e}") for j in chunk])
+                else:
+                    fut.add_done_callback(partial(self._on_done, chunk))
+
+            if flush:
+                self._flush(flush)
+            if stop:
+                return
+
+    def _on_done(self, chunk: List[SimJob], fut) -> None:
+        try:
+            results = fut.result()
+        except Exception as e:
+            results = [(j.job_id, None, f"worker failed: {e}") for j in chunk]
+        self._finish(chunk, results)
+
+    def _finish(self, chunk: List[SimJob], results) -> None:
+        now = time.time()
+        with self._cond:
+            self._in_flight -= 1
+            for job_id, metrics, error in results:
+                job = self.jobs[job_id]
+                if job.status != RUNNING:
+                    continue  # 跑的时候被取消了
+                job.finished_at = now
+                if error is None:
+                    job.status, job.result = DONE, metrics
+                    if self.persist is not None:
+                        self._to_persist.append(job)
+                else:
+                    job.status, job.error = FAILED, error
+            self._cond.notify_all()
+
+    def _flush(self, jobs: List[SimJob]) -> None:
+        try:
+            self.persist(jobs)
+        except Exception:
+            # 落库失败不影响调度，结果还在内存里可以轮询到
+            traceback.print_exc()
+
+    def close(self, wait: bool = True) -> None:
+        """停止调度：排队中的 job 取消，在跑的跑完，剩下的结果落库。"""
+        with self._cond:
+            self._closed = True
+            for job in self.jobs.values():
+                if job.status == QUEUED:
+                    job.status = CANCELLED
+            self._heap.clear()
+            self._cond.notify_all()
+        if wait:
+            self._thread.join()
+        self._pool.shutdown(wait=wait)
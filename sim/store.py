@@ -0,0 +1,166 @@
+# sim/store.py
+"""
+内存映射的面板数据存储。
+
+目录结构：
+    <root>/meta.json              dates（及其 dtype）/ instruments / 各字段的 shape / universe 所属 region
+    <root>/fields/<name>.f32      float32，(T, N) 行主序，一个字段一个文件
+    <root>/groups/<name>.i32      int32，(N,) 或 (T, N)
+    <root>/universes/<name>.u8    uint8 掩码，(T, N)
+
+读的时候用 np.memmap(mode="r")：
+  - 每个字段第一次被用到时才映射（lazy），不用的字段不占内存
+  - 按日期区间切片就是 memmap 上的切片，零拷贝
+  - 多个 worker 进程打开同一个目录，共享操作系统 page cache 里的同一份数据，
+    不用每个进程各自加载几个 GB 的 dataframe
+"""
+import json
+import os
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from sim.panel import Panel
+
+_KINDS = {
+    "fields": (".f32", np.float32),
+    "groups": (".i32", np.int32),
+    "universes": (".u8", np.uint8),
+}
+
+
+def _path(root: str, kind: str, name: str) -> str:
+    return os.path.join(root, kind, name + _KINDS[kind][0])
+
+
+class _LazyArrays(Mapping):
+    """按需打开 memmap 的只读字典；rows 是日期切片。"""
+
+    def __init__(self, store: "PanelStore", kind: str, rows: slice, as_bool: bool = False):
+        self._store = store
+        self._kind = kind
+        self._rows = rows
+        self._as_bool = as_bool
+        self._opened: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._opened:
+            arr = self._store.open_array(self._kind, name)
+            if arr.ndim == 2:
+                arr = arr[self._rows]
+            if self._as_bool:
+                arr = arr.view(np.bool_)
+            self._opened[name] = arr
+        return self._opened[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.meta[self._kind])
+
+    def __len__(self) -> int:
+        return len(self._store.meta[self._kind])
+
+
+class PanelStore:
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, "meta.json")) as f:
+            self.meta = json.load(f)
+        # datetime64 的日期在 meta 里存成 ISO 字符串，按记下的 dtype 还原
+        self.dates = np.asarray(self.meta["dates"], dtype=self.meta.get("dates_dtype"))
+        self.instruments = np.asarray(self.meta["instruments"])
+        self._maps: Dict[tuple, np.memmap] = {}
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.instruments)
+
+    def open_array(self, kind: str, name: str) -> np.memmap:
+        key = (kind, name)
+        if key not in self._maps:
+            info = self.meta[kind].get(name)
+            if info is None:
+                raise KeyError(f"unknown {kind[:-1]}: {name}")
+            self._maps[key] = np.memmap(
+                _path(self.root, kind, name), dtype=_KINDS[kind][1], mode="r", shape=tuple(info["shape"])
+            )
+        return self._maps[key]
+
+    def date_slice(self, start: Any = None, end: Any = None) -> slice:
+        """[start, end] 闭区间对应的行切片；dates 是升序的。"""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, start, side="left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, end, side="right"))
+        return slice(lo, hi)
+
+    def universe_region(self, name: str) -> Optional[str]:
+        return self.meta["universes"].get(name, {}).get("region")
+
+    def panel(self, start: Any = None, end: Any = None) -> Panel:
+        """
+        Panel view over a date range. Fields, groups and universe masks are
+        memmap slices opened on first access; nothing is copied.
+        Universes stay as masks (the engine NaNs out non-members), which keeps
+        universe selection zero-copy as well.
+        """
+        rows = self.date_slice(start, end)
+        return Panel(
+            dates=self.dates[rows],
+            instruments=self.instruments,
+            fields=_LazyArrays(self, "fields", rows),
+            groups=_LazyArrays(self, "groups", rows),
+            universes=_LazyArrays(self, "universes", rows, as_bool=True),
+        )
+
+    def load(self, name: str, start: Any = None, end: Any = None) -> np.ndarray:
+        """单个字段在日期区间上的零拷贝视图。"""
+        return self.open_array("fields", name)[self.date_slice(start, end)]
+
+    @classmethod
+    def write(cls, root: str, panel: Panel, regions: Optional[Dict[str, str]] = None) -> "PanelStore":
+        """
+        Write a Panel to a store directory. `regions` maps universe name to
+        region for the metadata index.
+        """
+        regions = regions or {}
+        dates = np.asarray(panel.dates)
+        meta: Dict[str, Any] = {
+            "dates": _dates_json(dates),
+            "dates_dtype": dates.dtype.str if dates.dtype.kind in "iufM" else None,
+            "instruments": [str(i) for i in panel.instruments],
+            "fields": {},
+            "groups": {},
+            "universes": {},
+        }
+
+        sources = {"fields": panel.fields, "groups": panel.groups, "universes": panel.universes}
+        for kind, arrays in sources.items():
+            os.makedirs(os.path.join(root, kind), exist_ok=True)
+            for name, arr in arrays.items():
+                data = np.ascontiguousarray(arr, dtype=_KINDS[kind][1])
+                out = np.memmap(_path(root, kind, name), dtype=data.dtype,
+                                mode="w+", shape=data.shape)
+                out[:] = data
+                out.flush()
+                del out
+                info: Dict[str, Any] = {"shape": list(data.shape)}
+                if kind == "universes" and name in regions:
+                    info["region"] = regions[name]
+                meta[kind][name] = info
+
+        with open(os.path.join(root, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        return cls(root)
+
+
+def _dates_json(dates: np.ndarray) -> list:
+    """json 能直接写的日期列表：datetime64 -> ISO 字符串，数值 -> Python 数字。"""
+    if dates.dtype.kind == "M":
+        return np.datetime_as_string(dates).tolist()
+    return [d.item() if hasattr(d, "item") else str(d) for d in dates]
+
+
+def open_panel(path: str, start: Any = None, end: Any = None) -> Panel:
+    """SIM_PANEL_PATH 可以是 PanelStore 目录，也可以是 Panel.save_npz 写出的 .npz。"""
+    if os.path.isdir(path):
+        return PanelStore(path).panel(start, end)
+    return Panel.load_npz(path)
@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _Server:
+    """/authentication 回 200；其他路径按 path 回 503 / 429 / 慢响应，记录每个 (method, path) 的次数。"""
+
+    def __init__(self):
+        self.hits = Counter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, headers=None):
+                if self.headers.get("Content-Length"):
+                    self.rfile.read(int(self.headers["Content-Length"]))
+                server.hits[(self.command, self.path)] += 1
+                attempts = server.hits[(self.command, self.path)]
+                if self.path == "/slow" and attempts == 1:
+                    time.sleep(0.5)
+                if self.path == "/throttled" and attempts == 1:
+                    status, headers = 429, {"Retry-After": "0"}
+                data = json.dumps({"attempt": attempts}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                self._reply(503 if self.path == "/unavailable" else 200)
+
+            do_GET = do_POST
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    srv = _Server()
+    yield srv
+    srv.close()
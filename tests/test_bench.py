@@ -0,0 +1,21 @@
+from bench.run import _time_calls, compare
+
+
+def test_failing_calls_are_counted_not_raised():
+    def boom(**kwargs):
+        raise RuntimeError("tool broke")
+
+    stats = _time_calls(boom, [{}] * 5, warmup=2)
+    assert stats["n"] == 5
+    assert stats["errors"] == 7  # 2 次预热 + 5 次计时
+
+    stats = _time_calls(lambda **kw: {"ok": False, "error": "x"}, [{}] * 3, warmup=0)
+    assert stats["errors"] == 3
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = {"s": {"p50_ms": 10.0, "p99_ms": 20.0, "throughput": 100.0}}
+    current = {"s": {"p50_ms": 12.0, "p99_ms": 30.0, "throughput": 70.0},
+               "new": {"p50_ms": 1.0, "p99_ms": 1.0, "throughput": 1.0}}
+    rows = {r["metric"]: r["regression"] for r in compare(current, baseline, 0.25)}
+    assert rows == {"p50_ms": False, "p99_ms": True, "throughput": True}
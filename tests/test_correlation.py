@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import correlation
+from correlation import MIN_OVERLAP, CorrelationPool
+
+W = 200
+DATES = np.arange("2024-01-01", W, dtype="datetime64[D]")
+
+
+def _series(seed):
+    return np.random.default_rng(seed).normal(size=W)
+
+
+@pytest.fixture
+def pool():
+    p = CorrelationPool(DATES, capacity=2)
+    assert p.add_many([("A", _series(1)), ("B", _series(2)), ("C", _series(3))]) == 3
+    return p
+
+
+def test_correlations_match_pearson(pool):
+    x = _series(1) + 0.5 * _series(4)
+    out = pool.correlations(pool.standardize(x), block_rows=2)
+    expected = [np.corrcoef(x, _series(s))[0, 1] for s in (1, 2, 3)]
+    np.testing.assert_allclose(out, expected, atol=1e-5)
+
+
+def test_align_by_dates_and_right_aligned():
+    p = CorrelationPool(DATES)
+    out = p.align([1.0, 2.0, 3.0], np.array(["2024-01-02", "2023-12-31", DATES[-1]], dtype="datetime64[D]"))
+    assert out[1] == 1.0 and out[-1] == 3.0
+    assert np.isnan(out).sum() == W - 2
+
+    out = p.align([1.0, 2.0])
+    assert list(out[-2:]) == [1.0, 2.0] and np.isnan(out[:-2]).all()
+
+
+def test_short_or_flat_series_not_pooled():
+    p = CorrelationPool(DATES)
+    assert not p.add("short", np.ones(MIN_OVERLAP - 1))
+    assert not p.add("flat", np.ones(W))
+    assert len(p) == 0
+    assert p.max_correlation(_series(1))["max_correlation"] is None
+
+
+def test_max_correlation_excludes_self(pool):
+    assert pool.max_correlation(_series(2))["alpha_id"] == "B"
+    out = pool.max_correlation(_series(2), exclude="B", top_k=5)
+    assert out["alpha_id"] != "B"
+    assert [t["alpha_id"] for t in out["top"]] == [out["alpha_id"]] + [
+        a for a in ("A", "C") if a != out["alpha_id"]]
+
+
+def test_many_matches_single(pool):
+    pnls = np.stack([_series(2), _series(5), np.full(W, np.nan)])
+    many = pool.max_correlation_many(pnls, exclude=["B", "X", None], block_rows=2)
+    single = [pool.max_correlation(pnls[0], exclude="B")["max_correlation"],
+              pool.max_correlation(pnls[1])["max_correlation"]]
+    np.testing.assert_allclose(many[:2], single, atol=1e-6)
+    assert np.isnan(many[2])
+    assert pool.max_correlation_many(pnls[:1])[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_remove_keeps_matrix_compact(pool):
+    z_c = pool.matrix[pool._index["C"]].copy()
+    assert pool.remove("A") and not pool.remove("A")
+    assert pool.alpha_ids == ["C", "B"] and "A" not in pool
+    np.testing.assert_array_equal(pool.matrix[0], z_c)
+    assert not pool._z[2:].any()
+
+
+def test_save_load_round_trip(pool, tmp_path):
+    path = str(tmp_path / "pool.npz")
+    pool.save(path)
+    loaded = CorrelationPool.load(path)
+    assert loaded.alpha_ids == pool.alpha_ids
+    np.testing.assert_array_equal(loaded.dates, DATES)
+    np.testing.assert_array_equal(loaded.matrix, pool.matrix)
+    assert loaded.max_correlation(_series(3))["alpha_id"] == "C"
+
+
+def test_batch_cutoff_excludes_own_row(pool, monkeypatch):
+    from tools.resolve_cutoff import resolve_cutoff_batch
+
+    monkeypatch.setattr(correlation, "_POOL", pool)
+    pnls = np.stack([_series(2), _series(2)])
+    out = resolve_cutoff_batch({"alpha_id": np.array(["B", "NEW"]), "region": np.array(["EUR", "EUR"]),
+                                "fitness": np.array([2.0, 2.0]), "sharpe": np.array([2.0, 2.0])}, pnl=pnls)
+    assert list(out["final_decision"]) == ["PASS", "REJECT"]
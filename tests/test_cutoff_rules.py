@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from tools.cutoff_rules import RuleSet
+from tools.resolve_cutoff import resolve_cutoff, resolve_cutoff_batch
+
+CONFIG = {
+    "sql_columns": {"fitness": "is_ic_fitness", "sharpe": "is_ic_sharpe", "turnover": "is_ic_turnover"},
+    "default": [
+        {"name": "fitness", "metric": "fitness", "op": ">=", "value": 1.0, "report_pass": True},
+        {"name": "sharpe", "metric": "sharpe", "op": ">=", "value": 1.2, "report_pass": True},
+        {"name": "turnover", "metric": "turnover", "op": "between", "value": [0.01, 0.7],
+         "severity": "soft", "optional": True},
+        {"name": "ladder_sharpe", "metric": "ladder_sharpe", "op": ">=", "value": 2.0,
+         "severity": "soft", "optional": True, "each": True},
+    ],
+    "policies": [
+        {"match": {"region": "USA", "universe": "TOP500"},
+         "rules": [{"name": "sharpe", "metric": "sharpe", "op": ">=", "value": 2.0}]},
+        {"match": {"region": "USA"},
+         "rules": [{"name": "sharpe", "metric": "sharpe", "op": ">=", "value": 1.5}]},
+    ],
+}
+
+
+def test_more_specific_policy_wins_and_is_cached():
+    rules = RuleSet(CONFIG)
+    sharpe = lambda p: next(r.value for r in p.rules if r.name == "sharpe")
+    assert sharpe(rules.resolve("EUR")) == 1.2
+    assert sharpe(rules.resolve("USA")) == 1.5
+    assert sharpe(rules.resolve("USA", None, "TOP500")) == 2.0
+    assert rules.resolve("USA") is rules.resolve("USA")
+
+
+def test_unknown_op_is_rejected():
+    with pytest.raises(ValueError):
+        RuleSet({"default": [{"name": "x", "metric": "x", "op": "!=", "value": 1}]}).resolve()
+
+
+def test_evaluate_buckets_failures():
+    policy = RuleSet(CONFIG).resolve("USA")
+    out = policy.evaluate({
+        "fitness": 1.1, "sharpe": 1.4, "turnover": 0.9,
+        "ladder_sharpe": {"2Y": 2.5, "1Y": 1.0},
+    })
+    assert out["hard_fail"] == [{"metric": "sharpe", "value": 1.4, "cutoff": 1.5}]
+    assert out["soft_fail"] == [
+        {"metric": "turnover", "value": 0.9, "range": [0.01, 0.7]},
+        {"metric": "ladder_sharpe_1Y", "value": 1.0, "cutoff": 2.0},
+    ]
+    assert out["pass"] == ["fitness"]
+
+
+def test_to_sql_pushes_down_known_columns_only():
+    where, params, skipped = RuleSet(CONFIG).resolve("USA").to_sql(include_soft=True)
+    assert where == ("is_ic_fitness >= %s AND is_ic_sharpe >= %s AND "
+                     "(is_ic_turnover IS NULL OR is_ic_turnover BETWEEN %s AND %s)")
+    assert params == [1.0, 1.5, 0.01, 0.7]
+    assert skipped == ["ladder_sharpe"]
+
+    where, params, _ = RuleSet(CONFIG).resolve("USA").to_sql()
+    assert "turnover" not in where and params == [1.0, 1.5]
+    assert RuleSet({}).resolve().to_sql() == ("TRUE", [], [])
+
+
+ROWS = [
+    ("a", "USA", 1.5, 1.7, 0.2, 2.5),
+    ("b", "USA", 1.5, 1.3, np.nan, np.nan),
+    ("c", "EUR", 0.5, 1.3, 0.9, 1.0),
+    ("d", "EUR", 1.5, np.nan, np.nan, 2.1),
+    ("e", "CHN", 1.0, 1.2, 0.01, 2.02),
+]
+
+
+def _scalar(row, allow_soft_fail):
+    alpha_id, region, fitness, sharpe, turnover, ladder = row
+    none = lambda x: None if np.isnan(x) else x
+    metrics = {"fitness": fitness, "sharpe": none(sharpe), "turnover": none(turnover)}
+    if not np.isnan(ladder):
+        metrics["ladder_sharpe"] = {"2Y": ladder}
+    return resolve_cutoff({
+        "alpha_id": alpha_id, "alpha_context": {"region": region},
+        "metrics": metrics, "cutoff_policy": {"allow_soft_fail": allow_soft_fail},
+    })
+
+
+@pytest.mark.parametrize("allow_soft_fail", [False, True])
+def test_batch_matches_scalar(allow_soft_fail):
+    cols = list(zip(*ROWS))
+    frame = {
+        "alpha_id": np.array(cols[0]), "region": np.array(cols[1]),
+        "fitness": np.array(cols[2]), "sharpe": np.array(cols[3]),
+        "turnover": np.array(cols[4]), "ladder_sharpe_2Y": np.array(cols[5]),
+    }
+    batch = resolve_cutoff_batch(frame, allow_soft_fail=allow_soft_fail)
+
+    for i, row in enumerate(ROWS):
+        scalar = _scalar(row, allow_soft_fail)
+        assert batch["final_decision"][i] == scalar["final_decision"], row
+        failed = {f["metric"] for f in scalar["hard_fail"] + scalar["soft_fail"]}
+        batch_failed = {
+            name for bucket in ("hard_fail", "soft_fail")
+            for name, mask in batch[bucket].items() if mask[i]
+        }
+        assert batch_failed == failed, row
+        assert {name for name, mask in batch["pass"].items() if mask[i]} == set(scalar["pass"]), row
@@ -0,0 +1,36 @@
+import dump_wq_alphas_to_postgres as dump
+
+
+def test_async_mode_uses_its_own_concurrency_default(monkeypatch):
+    monkeypatch.setattr(dump, "FETCH_WORKERS", 1)
+    monkeypatch.setattr(dump, "FETCH_CONCURRENCY", 64)
+
+    monkeypatch.setattr(dump, "FETCH_MODE", "thread")
+    assert dump._fetch_workers(None) == 1
+
+    monkeypatch.setattr(dump, "FETCH_MODE", "async")
+    assert dump._fetch_workers(None) == 64
+    assert dump._fetch_workers(8) == 8
+
+
+def test_detail_cache_ttl_short_for_alphas_still_changing(monkeypatch):
+    monkeypatch.setattr(dump, "DETAIL_CACHE_TTL", 7 * 24 * 3600.0)
+    monkeypatch.setattr(dump, "DETAIL_PENDING_CACHE_TTL", 0.0)
+
+    assert dump.detail_cache_ttl({"status": "ACTIVE"}) == 7 * 24 * 3600.0
+    assert dump.detail_cache_ttl({"status": "UNSUBMITTED"}) == 0.0
+    assert dump.detail_cache_ttl({}) == 0.0
+
+
+def test_parse_ts_is_always_timezone_aware():
+    from datetime import datetime, timedelta, timezone
+
+    watermark = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    naive = dump._parse_ts("2024-05-01T13:00:00")
+    assert naive.tzinfo is not None and naive > watermark
+
+    assert dump._parse_ts("2024-05-01T12:00:00Z") == watermark
+    assert dump._parse_ts("2024-05-01T08:00:00-04:00") == watermark
+    assert dump._parse_ts(datetime(2024, 5, 1, 11)) < watermark
+    assert dump._parse_ts(watermark + timedelta(hours=1)) > watermark
+    assert dump._parse_ts(None) is None
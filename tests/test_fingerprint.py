@@ -0,0 +1,62 @@
+import dump_wq_alphas_to_postgres as dump
+import wq_simulations
+from fingerprint import find_by_fingerprint
+
+
+class _Cursor:
+    def __init__(self):
+        self.sql, self.params = None, None
+
+    def execute(self, sql, params=None):
+        self.sql, self.params = sql, params
+
+    def fetchall(self):
+        return []
+
+
+def test_find_by_fingerprint_matches_remaining_settings():
+    cur = _Cursor()
+    find_by_fingerprint(cur, "fp", region="USA", settings={"decay": 4, "truncation": 0.08})
+    assert "a.settings @> %s" in cur.sql
+    assert cur.params[:2] == ["fp", "USA"]
+    assert cur.params[2].adapted == {"decay": 4, "truncation": 0.08}
+
+
+def test_find_existing_compares_decay_truncation_pasteurization(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(wq_simulations, "find_by_fingerprint",
+                        lambda cur, fp, **kw: seen.update(kw) or [])
+
+    class _Conn:
+        def cursor(self):
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+    from contextlib import contextmanager
+
+    @contextmanager
+    def fake_pg_conn():
+        yield _Conn()
+
+    monkeypatch.setattr(wq_simulations, "pg_conn", fake_pg_conn)
+    payload = wq_simulations.simulation_payload("rank(close)", decay=6, universe="TOP500")
+    wq_simulations.find_existing("rank(close)", payload["settings"])
+
+    assert seen["universe"] == "TOP500" and seen["region"] == "USA"
+    extra = seen["settings"]
+    assert extra["decay"] == 6
+    assert extra["truncation"] == 0.08 and extra["pasteurization"] == "ON"
+    assert not set(extra) & {"region", "universe", "delay", "neutralization", "visualization"}
+
+
+def test_alpha_row_carries_settings():
+    doc = {"id": "A1", "regular": {"code": "close"}, "dateCreated": "2026-01-01T00:00:00Z",
+           "settings": {"region": "USA", "universe": "TOP3000", "delay": 1, "decay": 4}}
+    row = dump._alpha_row(dump._parse_alpha(doc))
+    assert row[0] == "A1" and row[-1] == '{"decay": 4, "delay": 1, "region": "USA", "universe": "TOP3000"}'
+    assert dump._alpha_row(dump._parse_alpha({"id": "A2"}))[-1] is None
@@ -0,0 +1,30 @@
+import pytest
+
+from tools.get_backtest_metrics import BACKTEST_RESULTS_INDEX_DDL, ensure_backtest_results_index
+
+
+class _Cursor:
+    def __init__(self, present, dict_rows):
+        self.present = present
+        self.dict_rows = dict_rows
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+    def fetchone(self):
+        return {"present": self.present} if self.dict_rows else (self.present,)
+
+
+@pytest.mark.parametrize("dict_rows", [False, True])
+def test_index_skipped_when_table_missing(dict_rows):
+    cur = _Cursor(present=False, dict_rows=dict_rows)
+    assert ensure_backtest_results_index(cur) is False
+    assert BACKTEST_RESULTS_INDEX_DDL not in cur.executed
+
+
+@pytest.mark.parametrize("dict_rows", [False, True])
+def test_index_created_when_table_exists(dict_rows):
+    cur = _Cursor(present=True, dict_rows=dict_rows)
+    assert ensure_backtest_results_index(cur) is True
+    assert cur.executed[-1] == BACKTEST_RESULTS_INDEX_DDL
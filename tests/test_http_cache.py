@@ -0,0 +1,25 @@
+import sqlite3
+
+from http_cache import ResponseCache
+
+
+def _accessed_at(path, url):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT accessed_at FROM http_cache WHERE url = ?", (url,)).fetchone()[0]
+
+
+def test_hits_touch_accessed_at_at_most_once_per_interval(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    now = [1000.0]
+    monkeypatch.setattr("http_cache.time.time", lambda: now[0])
+
+    cache = ResponseCache(path, touch_interval=60.0)
+    cache.put("u", b"{}")
+
+    now[0] = 1030.0
+    assert cache.get("u").body == b"{}"
+    assert _accessed_at(path, "u") == 1000.0
+
+    now[0] = 1061.0
+    cache.get("u")
+    assert _accessed_at(path, "u") == 1061.0
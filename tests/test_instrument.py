@@ -0,0 +1,82 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import instrument
+
+
+@pytest.fixture
+def on(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    instrument.reset()
+    instrument.enable(str(trace))
+    yield trace
+    instrument.disable()
+    instrument.reset()
+
+
+def test_disabled_is_a_no_op():
+    instrument.reset()
+    instrument.count("x_total")
+    instrument.observe("x_seconds", 1.0)
+    with instrument.span("x") as sp:
+        sp.set(a=1)
+        sp.note(b=2)
+    assert instrument.snapshot() == {"counters": [], "histograms": []}
+
+
+def _http():
+    with instrument.span("http", method="GET"):
+        pass
+
+
+def test_spans_nest_across_bound_threads(on):
+    with instrument.span("tool", tool="t", attrs={"alpha_id": "A1"}) as outer:
+        with ThreadPoolExecutor(2) as pool:
+            pool.submit(instrument.bind(_http)).result()
+        outer.set(status="ok")
+    with pytest.raises(KeyError):
+        with instrument.span("sql"):
+            raise KeyError("x")
+
+    instrument.disable()
+    spans = {r["name"]: r for r in map(json.loads, on.read_text().splitlines())}
+    assert spans["http"]["parent_id"] == spans["tool"]["span_id"]
+    assert spans["tool"]["parent_id"] is None
+    assert spans["tool"]["labels"] == {"tool": "t", "status": "ok"}
+    assert spans["tool"]["attrs"] == {"alpha_id": "A1"}
+    assert spans["sql"]["attrs"] == {"error": "KeyError"}
+
+    names = {(h["name"], tuple(h["labels"].items())) for h in instrument.snapshot()["histograms"]}
+    assert names == {("tool_seconds", (("status", "ok"), ("tool", "t"))),
+                     ("http_seconds", (("method", "GET"),)), ("sql_seconds", ())}
+
+
+def test_histogram_buckets_and_quantiles(on):
+    for v in (0.001, 0.002, 0.002, 0.004, 1000.0):
+        instrument.observe("q_seconds", v)
+    (h,) = instrument.snapshot()["histograms"]
+    assert h["count"] == 5 and h["sum"] == pytest.approx(1000.009)
+    assert h["buckets"]["0.001"] == 1  # 上界包含在桶内
+    assert h["buckets"]["0.0025"] == 3
+    assert h["buckets"]["300.0"] == 4 and h["buckets"]["+Inf"] == 5
+    assert 0.001 <= h["p50"] <= 0.0025
+    assert h["p99"] == instrument.BUCKETS[-1]
+
+
+def test_prometheus_export(on):
+    instrument.count("calls_total", 1234567, tool='a"b\nc')
+    instrument.count("calls_total", 0.5, tool="x")
+    instrument.observe("lat_seconds", 0.003, op="select")
+    text = instrument.export_prometheus()
+    lines = text.splitlines()
+
+    assert lines.count("# TYPE calls_total counter") == 1
+    assert 'calls_total{tool="a\\"b\\nc"} 1234567' in lines
+    assert 'calls_total{tool="x"} 0.5' in lines
+    assert "# TYPE lat_seconds histogram" in lines
+    assert 'lat_seconds_bucket{op="select",le="0.0025"} 0' in lines
+    assert 'lat_seconds_bucket{op="select",le="0.005"} 1' in lines
+    assert 'lat_seconds_bucket{op="select",le="+Inf"} 1' in lines
+    assert 'lat_seconds_count{op="select"} 1' in lines
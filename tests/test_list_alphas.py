@@ -0,0 +1,95 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from tools import list_alphas
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self._cur = conn.cursor()
+        self.itersize = 0
+
+    def execute(self, sql, params=()):
+        self._cur.execute(sql.replace("%s", "?"), params)
+
+    def __iter__(self):
+        cols = [d[0] for d in self._cur.description]
+        return (dict(zip(cols, row)) for row in self._cur)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+
+
+class _Conn:
+    def __init__(self, db):
+        self._db = db
+
+    def cursor(self, name=None):
+        return _Cursor(self._db)
+
+
+@pytest.fixture
+def alphas(monkeypatch):
+    db = sqlite3.connect(":memory:")
+    db.execute("""
+        CREATE TABLE wq_alpha (alpha_id TEXT, expression TEXT, region TEXT, universe TEXT,
+                               delay INTEGER, neutralization TEXT, created_at TEXT)
+    """)
+    rows = []
+    for i in range(23):
+        # 每隔几个一个没有 created_at 的，还有几个 created_at 相同的
+        created = None if i % 4 == 0 else f"2026-01-{1 + i // 3:02d}T00:00:00"
+        rows.append((f"A{i:03d}", "close", "USA", "TOP3000", 1, "MARKET", created))
+    db.executemany("INSERT INTO wq_alpha VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    @contextmanager
+    def fake_pg_conn():
+        yield _Conn(db)
+
+    monkeypatch.setattr(list_alphas, "pg_conn", fake_pg_conn)
+    return rows
+
+
+def _page_all(limit):
+    seen, cursor = [], None
+    for _ in range(100):
+        kwargs = {}
+        if cursor:
+            kwargs = {"after_created_at": cursor["created_at"], "after_alpha_id": cursor["alpha_id"]}
+        out = list_alphas.list_alphas_db(limit=limit, **kwargs)
+        assert out["ok"], out["error"]
+        seen.extend(r["alpha_id"] for r in out["data"])
+        cursor = out["next_cursor"]
+        if cursor is None:
+            return seen
+    raise AssertionError("pagination did not terminate")
+
+
+@pytest.mark.parametrize("limit", [1, 3, 5, 23, 50])
+def test_keyset_pages_cover_every_row_once(alphas, limit):
+    seen = _page_all(limit)
+    assert sorted(seen) == sorted(r[0] for r in alphas)
+    assert len(seen) == len(set(seen))
+
+    dated = [r for r in alphas if r[6] is not None]
+    undated = [r for r in alphas if r[6] is None]
+    expected = [r[0] for r in sorted(dated, key=lambda r: (r[6], r[0]), reverse=True)]
+    expected += sorted((r[0] for r in undated), reverse=True)
+    assert seen == expected
+
+
+def test_null_created_at_cursor_is_honoured(alphas):
+    out = list_alphas.list_alphas_db(limit=2, after_created_at=None, after_alpha_id="A012")
+    assert [r["alpha_id"] for r in out["data"]] == ["A008", "A004"]
+
+
+def test_malformed_since_returns_error_dict(monkeypatch):
+    monkeypatch.setattr(list_alphas, "_get_wq", lambda: pytest.fail("must not hit the API"))
+    out = list_alphas.list_alphas(since="last tuesday")
+    assert out["ok"] is False and "last tuesday" in out["error"]
+    assert list_alphas.list_alphas(since=20240101)["ok"] is False
@@ -0,0 +1,53 @@
+import numpy as np
+
+import dump_wq_alphas_to_postgres as dump
+from pnl_store import _decode, parse_recordset, series_row
+
+
+def _recordset(records):
+    return {"schema": {"properties": [{"name": "date"}, {"name": "pnl"}, {"name": "label"}]},
+            "records": records}
+
+
+def _stored(row):
+    """series_row -> 数据库读回来的 dict（bytea 是 bytes）。"""
+    return {"alpha_id": row[0], "recordset": row[1], "columns": row[2], "n_days": row[3],
+            "dates": row[6].adapted, "data": row[7].adapted}
+
+
+def test_series_round_trip_sorted_by_date():
+    data = _recordset([["2024-01-03", 2.0, "x"], ["2024-01-02", 1.0, "y"], ["2024-01-04", None, "z"]])
+    columns, dates, values = parse_recordset(data)
+    assert columns == ["pnl"]
+
+    row = series_row("A1", "pnl", columns, dates, values)
+    assert row[3:6] == (3, np.datetime64("2024-01-02").item(), np.datetime64("2024-01-04").item())
+
+    s = _decode(_stored(row))
+    np.testing.assert_array_equal(s.dates, np.array(["2024-01-02", "2024-01-03", "2024-01-04"],
+                                                    dtype="datetime64[D]"))
+    np.testing.assert_array_equal(s.column("pnl"), np.array([1.0, 2.0, np.nan], dtype=np.float32))
+
+
+def test_empty_recordset_round_trip():
+    row = series_row("A1", "pnl", *parse_recordset(_recordset([])))
+    assert row[3] == 0
+    assert len(_decode(_stored(row))) == 0
+
+
+class _Conn:
+    def commit(self):
+        pass
+
+
+def test_dump_series_records_empty_recordsets(monkeypatch):
+    written = []
+    series = {"A1": _recordset([["2024-01-02", 1.0, "x"]]), "A2": _recordset([])}
+
+    monkeypatch.setattr(dump, "missing_series", lambda cur, ids, name: list(ids))
+    monkeypatch.setattr(dump, "get_recordset", lambda wq, alpha_id, name: parse_recordset(series[alpha_id]))
+    monkeypatch.setattr(dump, "write_series", lambda cur, rows: written.extend(rows))
+
+    n = dump.dump_series(None, _Conn(), None, ["A1", "A2"], ["pnl"], workers=2, rps=0)
+    assert n == 1
+    assert {(r[0], r[3]) for r in written} == {("A1", 1), ("A2", 0)}
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+from psycopg2.errors import UndefinedTable
+
+from tools import rank_alphas as ra
+
+
+def _rows(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "alpha_id": f"A{i:05d}",
+            "region": "USA",
+            "is_ic_sharpe": rng.gauss(1, 1),
+            "is_ic_fitness": rng.gauss(1, 1),
+            "is_ic_turnover": rng.uniform(0, 1),
+            "is_ic_returns": None if i % 17 == 0 else rng.gauss(0.1, 0.05),
+        }
+        for i in range(n)
+    ]
+
+
+def _dominates(a, b):
+    return all(x >= y for x, y in zip(a, b)) and any(x > y for x, y in zip(a, b))
+
+
+@pytest.mark.parametrize("terms", [
+    [("is_ic_sharpe", 1.0)],
+    [("is_ic_turnover", -1.0)],
+    [("is_ic_sharpe", 1.0), ("is_ic_fitness", 0.5), ("is_ic_returns", -2.0)],
+])
+def test_top_k_matches_full_sort(terms):
+    rows = _rows(2000)
+    got = ra._top_k(iter([dict(r) for r in rows]), terms, 25)
+
+    scored = [
+        (sum(w * r[c] for c, w in terms), r["alpha_id"])
+        for r in rows if all(r[c] is not None for c, _ in terms)
+    ]
+    expected = [a for _, a in sorted(scored, key=lambda x: (-x[0], x[1]))[:25]]
+    assert [r["alpha_id"] for r in got] == expected
+
+
+def test_pareto_matches_brute_force():
+    rows = _rows(1500, seed=3)
+    terms = [("is_ic_sharpe", 1.0), ("is_ic_fitness", 1.0), ("is_ic_turnover", -1.0)]
+    front = ra._pareto(iter(rows), terms)
+
+    points = {r["alpha_id"]: [s * r[c] for c, s in terms] for r in rows}
+    expected = {a for a, p in points.items() if not any(_dominates(q, p) for q in points.values())}
+    assert {r["alpha_id"] for r in front} == expected
+    sharpe = [r["is_ic_sharpe"] for r in front]
+    assert sharpe == sorted(sharpe, reverse=True)
+
+
+def test_pareto_falls_back_to_eav_without_wide_table(monkeypatch):
+    rows = _rows(300, seed=5)
+
+    def missing_wide(*args, **kwargs):
+        raise UndefinedTable("relation \"wq_alpha_metrics_wide\" does not exist")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(ra, "_iter_wide", missing_wide)
+    monkeypatch.setattr(ra, "_iter_eav", lambda *args, **kwargs: iter([dict(r) for r in rows]))
+
+    out = ra.rank_alphas(pareto=True, objectives=["sharpe", "fitness", "-turnover"], limit=500)
+    assert out["ok"], out["error"]
+    assert out["source"] == "stream"
+    assert out["front_size"] == len(out["data"]) > 0
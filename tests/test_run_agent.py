@@ -0,0 +1,31 @@
+import json
+from types import SimpleNamespace
+
+import run_agent
+from tool_dispatch import ToolDispatcher
+
+
+def _call(call_id, name, arguments):
+    return SimpleNamespace(type="function_call", call_id=call_id, name=name, arguments=arguments)
+
+
+def test_malformed_arguments_become_a_tool_error():
+    resp = SimpleNamespace(output=[
+        _call("c1", "echo", '{"x": 1}'),
+        _call("c2", "echo", '{"x": '),
+        _call("c3", "echo", "[1, 2]"),
+    ])
+    calls = run_agent._tool_calls(resp)
+    assert [c.error is None for c in calls] == [True, False, False]
+
+    dispatcher = ToolDispatcher({"echo": lambda **kw: {"ok": True, "data": kw, "error": None}})
+    try:
+        results = dispatcher.run(calls)
+    finally:
+        dispatcher.shutdown()
+
+    assert results[0].ok and results[0].output["data"] == {"x": 1}
+    for r in results[1:]:
+        assert not r.ok
+        assert json.loads(r.to_output())["ok"] is False
+    assert "invalid JSON arguments" in results[1].error
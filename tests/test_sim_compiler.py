@@ -0,0 +1,62 @@
+import threading
+
+import numpy as np
+
+from sim.compiler import BatchEvaluator
+from sim.panel import synthetic_panel
+
+
+def _cached_bytes(ev: BatchEvaluator) -> int:
+    return sum(a.nbytes for a in ev._cache.values())
+
+
+def test_evaluator_byte_accounting_under_threads():
+    panel = synthetic_panel(n_dates=120, n_instruments=50)
+    # 只放得下几个中间结果，逼着 LRU 不停淘汰
+    ev = BatchEvaluator(panel, max_bytes=6 * 120 * 50 * 8)
+    windows = [3, 5, 10, 20]
+    errors = []
+
+    def work(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            for _ in range(40):
+                w = [int(x) for x in rng.choice(windows, 2)]
+                ev.evaluate_many([
+                    f"rank(ts_mean(close, {w[0]}))",
+                    f"ts_mean(close, {w[0]}) - ts_mean(close, {w[1]})",
+                    f"rank(ts_mean(close, {w[1]})) * volume",
+                ])
+                ev.evaluate(f"ts_delta(close, {w[1]})")
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    stats = ev.stats()
+    assert stats["bytes"] == _cached_bytes(ev)
+    assert stats["entries"] == len(ev._cache) > 0
+    assert stats["bytes"] <= ev.max_bytes
+
+
+def test_evaluate_many_matches_single():
+    panel = synthetic_panel(n_dates=60, n_instruments=20)
+    exprs = ["rank(ts_mean(close, 5))", "ts_mean(close, 5) + volume", "close + rank(volume)"]
+    batch = BatchEvaluator(panel).evaluate_many(exprs)
+    for e, got in zip(exprs, batch):
+        np.testing.assert_allclose(got, BatchEvaluator(panel).evaluate(e), equal_nan=True)
+
+
+def test_constants_keep_full_precision_in_canonical_text():
+    from sim.compiler import canonical_text, fingerprint
+
+    a, b = "ts_mean(close, 5) * 0.1234567890123", "ts_mean(close, 5) * 0.1234567890124"
+    assert canonical_text(a) != canonical_text(b)
+    assert fingerprint(a) != fingerprint(b)
+    assert fingerprint("close * 0.5") == fingerprint("0.5*close")
+    assert canonical_text("close + 2.0") == canonical_text("2 + close")
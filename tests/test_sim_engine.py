@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from sim import operators as ops
+from sim.engine import backtest, simulate
+from sim.expr import ExpressionError, parse
+from sim.panel import synthetic_panel
+
+
+@pytest.fixture
+def x():
+    rng = np.random.default_rng(7)
+    a = rng.normal(size=(30, 6))
+    a[rng.random(a.shape) < 0.15] = np.nan
+    return a
+
+
+def _naive(x, d, fn):
+    out = np.full(x.shape, np.nan)
+    for t in range(d - 1, len(x)):
+        for j in range(x.shape[1]):
+            w = x[t - d + 1:t + 1, j]
+            w = w[~np.isnan(w)]
+            if len(w):
+                out[t, j] = fn(w, x[t, j])
+    return out
+
+
+def test_time_series_operators_match_naive(x):
+    np.testing.assert_allclose(ops.ts_sum(x, 5), _naive(x, 5, lambda w, c: w.sum()), atol=1e-12)
+    np.testing.assert_allclose(ops.ts_mean(x, 5), _naive(x, 5, lambda w, c: w.mean()), atol=1e-12)
+    np.testing.assert_allclose(ops.ts_std_dev(x, 5), _naive(x, 5, lambda w, c: w.std()), atol=1e-9)
+
+    def rank_in_window(w, c):
+        if np.isnan(c):
+            return np.nan
+        return (w < c).sum() / (len(w) - 1) if len(w) > 1 else 0.5
+    np.testing.assert_allclose(ops.ts_rank(x, 5), _naive(x, 5, rank_in_window))
+    np.testing.assert_allclose(ops.ts_rank(x, 30), _naive(x, 30, rank_in_window))
+    assert np.isnan(ops.ts_rank(x, 31)).all()
+
+    np.testing.assert_array_equal(ops.ts_delay(x, 2)[2:], x[:-2])
+    assert np.isnan(ops.ts_delay(x, 2)[:2]).all()
+    assert np.isnan(ops.ts_mean(x, 40)).all()
+
+
+def test_cross_sectional_operators(x):
+    r = ops.rank(x)
+    for t in range(len(x)):
+        valid = ~np.isnan(x[t])
+        assert np.isnan(r[t][~valid]).all()
+        if valid.sum() > 1:
+            order = np.argsort(x[t][valid])
+            np.testing.assert_allclose(r[t][valid][order], np.linspace(0, 1, valid.sum()))
+
+    ties = np.array([[3.0, 1.0, 3.0, np.nan, 2.0, 1.0],
+                     [5.0, 5.0, 5.0, 5.0, 5.0, 5.0],
+                     [np.nan, 1.0, np.nan, np.nan, np.nan, np.nan]])
+    np.testing.assert_allclose(ops.rank(ties), [[0.875, 0.125, 0.875, np.nan, 0.5, 0.125],
+                                                [0.5] * 6,
+                                                [np.nan, 0.5, np.nan, np.nan, np.nan, np.nan]])
+    assert ops.rank(np.empty((2, 0))).shape == (2, 0)
+
+    group = np.array([0, 1, 0, 1, 2, 2])
+    g = ops.group_neutralize(x, group)
+    for t in range(len(x)):
+        for k in range(3):
+            members = g[t][(group == k) & ~np.isnan(x[t])]
+            if len(members):
+                assert abs(members.mean()) < 1e-12
+
+
+def test_backtest_applies_delay_without_lookahead():
+    # 单只股票，每天固定 +1%，第 0 天起就满仓
+    T = 10
+    returns = np.full((T, 1), 0.01)
+    weights = np.ones((T, 1))
+    out = backtest(weights, returns, delay=1)
+    assert list(out["pnl"][:2]) == [0.0, 0.0]
+    np.testing.assert_allclose(out["pnl"][2:], 0.01)
+    assert out["returns"] == pytest.approx(0.01 * 252)
+    assert out["turnover"] == pytest.approx(1 / (T - 2))
+    assert out["drawdown"] == 0.0
+    assert out["margin"] == pytest.approx(0.01 * (T - 2))
+
+    flat = backtest(np.zeros((T, 1)), returns)
+    assert flat["sharpe"] == 0.0 and not flat["pnl"].any()
+
+
+def test_simulate_cannot_see_same_day_returns():
+    panel = synthetic_panel(n_dates=400, n_instruments=60, seed=3)
+    # 当天收益做 alpha：如果 delay 没生效，夏普会大得离谱
+    out = simulate("returns", panel, delay=0, neutralization="MARKET")
+    assert abs(out["sharpe"]) < 3
+
+    neutral = simulate("rank(ts_delta(close, 5))", panel, universe="TOPHALF", neutralization="INDUSTRY")
+    assert np.isfinite(neutral["sharpe"]) and neutral["turnover"] > 0
+
+
+def test_window_must_be_positive_integer():
+    panel = synthetic_panel(n_dates=20, n_instruments=5)
+    for text in ("ts_mean(close, 0)", "ts_mean(close, 2.5)", "ts_mean(close, volume)"):
+        with pytest.raises(ExpressionError):
+            simulate(parse(text), panel)
@@ -0,0 +1,20 @@
+from sim.scheduler import SKIPPED, SimScheduler
+
+
+def test_equivalent_expressions_in_one_batch_share_a_job(tmp_path):
+    # known 认下所有 key：job 都标成 skipped，不会真的起 worker 进程
+    sched = SimScheduler(str(tmp_path), workers=1, known=lambda keys: keys)
+    try:
+        out = sched.submit(["ts_mean(close, 5)", "ts_mean( close ,5 )", "rank(volume)", "rank(volume)"])
+        assert out["jobs"] == 2
+        assert out["skipped"] == 2 and out["duplicates"] == 2
+
+        jobs = sched.batch_jobs(out["batch_id"])
+        assert len({j.job_id for j in jobs}) == len(jobs) == 2
+        assert all(j.status == SKIPPED and j.batches == {out["batch_id"]} for j in jobs)
+
+        again = sched.submit(["rank(volume)"])
+        assert again["jobs"] == 1 and again["duplicates"] == 1
+        assert sched.batch_jobs(again["batch_id"])[0].batches == {out["batch_id"], again["batch_id"]}
+    finally:
+        sched.close()
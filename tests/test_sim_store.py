@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from sim.panel import synthetic_panel
+from sim.store import PanelStore, open_panel
+
+
+@pytest.mark.parametrize("dates", [
+    np.arange("2024-01-01", "2024-03-01", dtype="datetime64[D]")[:40],
+    np.arange(40),
+    np.array([f"2024-02-{d:02d}" for d in range(1, 29)] + [f"2024-03-{d:02d}" for d in range(1, 13)]),
+])
+def test_write_open_round_trip(tmp_path, dates):
+    panel = synthetic_panel(n_dates=40, n_instruments=12)
+    panel.dates = dates
+
+    PanelStore.write(str(tmp_path), panel, regions={name: "USA" for name in panel.universes})
+    store = PanelStore(str(tmp_path))
+    assert store.dates.dtype == dates.dtype
+    np.testing.assert_array_equal(store.dates, dates)
+
+    out = open_panel(str(tmp_path), start=dates[5], end=dates[14])
+    np.testing.assert_array_equal(out.dates, dates[5:15])
+    for name, arr in panel.fields.items():
+        np.testing.assert_allclose(out.fields[name], arr[5:15].astype(np.float32), equal_nan=True)
+    for name, mask in panel.universes.items():
+        np.testing.assert_array_equal(out.universes[name], mask[5:15])
+        assert store.universe_region(name) == "USA"
+
+
+def test_float32_store_matches_float64_panel(tmp_path):
+    from sim.engine import simulate
+    from sim.expr import evaluate, parse
+
+    panel = synthetic_panel(n_dates=2500, n_instruments=20)
+    panel.fields["close"] = panel.fields["close"] * 2.0 + 100.0
+    PanelStore.write(str(tmp_path), panel)
+    store = open_panel(str(tmp_path))
+    assert store.fields["close"].dtype == np.float32
+
+    # 同样是 float32 精度的输入，只是以 float64 给出
+    panel.fields = {k: np.asarray(store.fields[k], dtype=np.float64) for k in panel.fields}
+    for text in ("ts_std_dev(close, 10)", "ts_mean(close, 20)", "ts_sum(volume, 5)"):
+        node = parse(text)
+        np.testing.assert_allclose(evaluate(node, store), evaluate(node, panel), rtol=1e-6, equal_nan=True)
+
+    expr = "rank(ts_std_dev(close, 10))"
+    assert simulate(expr, store)["sharpe"] == pytest.approx(simulate(expr, panel)["sharpe"], rel=1e-6)
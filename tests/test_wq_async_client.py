@@ -0,0 +1,61 @@
+import asyncio
+import socket
+
+import aiohttp
+import pytest
+
+import instrument
+from wq_async_client import AsyncWQClient
+
+
+def _run(server, coro_fn, **kwargs):
+    async def main():
+        async with AsyncWQClient("u", "p", base_url=server.url, max_retries=3,
+                                 backoff_base=0.0, **kwargs) as wq:
+            return await coro_fn(wq)
+
+    return asyncio.run(main())
+
+
+def test_post_not_retried_on_5xx(server):
+    status, _, _ = _run(server, lambda wq: wq.send("POST", f"{server.url}/unavailable", json={}))
+    assert status == 503
+    assert server.hits[("POST", "/unavailable")] == 1
+
+
+def test_get_retried_on_5xx(server):
+    status, _, _ = _run(server, lambda wq: wq.send("GET", f"{server.url}/unavailable"))
+    assert status == 503
+    assert server.hits[("GET", "/unavailable")] == 4
+
+
+def test_post_retried_on_429(server):
+    assert _run(server, lambda wq: wq.post_json(f"{server.url}/throttled", {})) == {"attempt": 2}
+
+
+def test_post_not_retried_on_timeout(server):
+    with pytest.raises(asyncio.TimeoutError):
+        _run(server, lambda wq: wq.post_json(f"{server.url}/slow", {}), timeout=0.2)
+    assert server.hits[("POST", "/slow")] == 1
+
+
+def test_post_opt_in_retries_on_timeout(server):
+    out = _run(server, lambda wq: wq.post_json(f"{server.url}/slow", {}, idempotent=True), timeout=0.2)
+    assert out == {"attempt": 2}
+
+
+def test_post_retried_when_connection_refused(server):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed = s.getsockname()[1]
+
+    instrument.enable()
+    try:
+        with pytest.raises(aiohttp.ClientConnectorError):
+            _run(server, lambda wq: wq.send("POST", f"http://127.0.0.1:{closed}/simulations", json={}))
+        retries = {c["labels"].get("reason"): c["value"]
+                   for c in instrument.snapshot()["counters"] if c["name"] == "http_retries_total"}
+    finally:
+        instrument.disable()
+        instrument.reset()
+    assert retries == {"connection": 3}
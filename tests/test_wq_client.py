@@ -0,0 +1,77 @@
+import socket
+from collections import Counter
+
+import pytest
+import requests
+
+from wq_client import WQClient
+
+
+def _client(base_url, **kwargs):
+    return WQClient("u", "p", base_url=base_url, max_retries=3, backoff_base=0.0, **kwargs)
+
+
+def test_post_not_retried_on_5xx(server):
+    wq = _client(server.url)
+    resp = wq._send("POST", f"{server.url}/unavailable", json={})
+    assert resp.status_code == 503
+    assert server.hits[("POST", "/unavailable")] == 1
+
+
+def test_get_retried_on_5xx(server):
+    wq = _client(server.url)
+    assert wq._send("GET", f"{server.url}/unavailable").status_code == 503
+    assert server.hits[("GET", "/unavailable")] == 4
+
+
+def test_post_retried_on_429(server):
+    wq = _client(server.url)
+    assert wq.post_json(f"{server.url}/throttled", {}) == {"attempt": 2}
+
+
+def test_post_not_retried_on_read_timeout(server):
+    wq = _client(server.url, timeout=0.2)
+    with pytest.raises(requests.Timeout):
+        wq.post_json(f"{server.url}/slow", {})
+    assert server.hits[("POST", "/slow")] == 1
+
+
+def test_post_opt_in_retries_on_read_timeout(server):
+    wq = _client(server.url, timeout=0.2)
+    assert wq.post_json(f"{server.url}/slow", {}, idempotent=True) == {"attempt": 2}
+
+
+def test_post_retried_when_connection_refused(server, monkeypatch):
+    wq = _client(server.url)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed = s.getsockname()[1]
+
+    attempts = Counter()
+    request = wq.session.request
+
+    def counting(method, url, **kwargs):
+        attempts[method] += 1
+        return request(method, url, **kwargs)
+
+    monkeypatch.setattr(wq.session, "request", counting)
+    with pytest.raises(requests.ConnectionError):
+        wq._send("POST", f"http://127.0.0.1:{closed}/simulations", json={})
+    assert attempts["POST"] == 4
+
+
+def test_cache_ttl_can_depend_on_the_response(server, tmp_path):
+    from http_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=3600.0)
+    wq = _client(server.url, cache=cache)
+    url = f"{server.url}/doc"
+
+    assert wq.get_json(url, cache_ttl=lambda doc: 0.0 if doc["attempt"] == 1 else 100.0) == {"attempt": 1}
+    assert not cache.get(url).fresh
+
+    assert wq.get_json(url, cache_ttl=lambda doc: 0.0 if doc["attempt"] == 1 else 100.0) == {"attempt": 2}
+    entry = cache.get(url)
+    assert entry.fresh and entry.expires_at - entry.stored_at == 100.0
+    assert wq.get_json(url) == {"attempt": 2}
+    assert server.hits[("GET", "/doc")] == 2
@@ -0,0 +1,43 @@
+import threading
+from contextlib import contextmanager
+
+import wq_simulations
+
+
+class _Conn:
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def test_write_schema_ensured_once_before_first_write(monkeypatch):
+    calls = []
+
+    @contextmanager
+    def fake_pg_conn():
+        yield _Conn()
+
+    monkeypatch.setattr(wq_simulations, "pg_conn", fake_pg_conn)
+    monkeypatch.setattr(wq_simulations, "_SCHEMA_READY", False)
+    monkeypatch.setattr(wq_simulations, "ensure_write_schema", lambda conn, cur: calls.append("schema"))
+    monkeypatch.setattr(wq_simulations, "_write_batch", lambda conn, cur, a, m: calls.append("write"))
+
+    alpha = {"alpha_id": "A1", "expression": "close", "universe": "TOP3000", "region": "USA",
+             "delay": 1, "neutralization": "MARKET", "created_at": None}
+    threads = [
+        threading.Thread(target=wq_simulations.write_alpha_result, args=(alpha, {"is_ic_sharpe": 1.0}))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls[0] == "schema"
+    assert calls.count("schema") == 1
+    assert calls.count("write") == 8
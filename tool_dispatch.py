@@ -0,0 +1,202 @@
+# tool_dispatch.py
+"""
+同一轮模型输出里的多个 function_call 互相独立时，并发执行它们。
+
+- 一个有界线程池；每个工具另有自己的并发上限（TOOL_POLICIES），
+  比如 simulate_alpha 不能同时跑太多
+- 每个工具有超时；超时 / 异常只影响那一个 call，其它 call 照常返回
+- 返回顺序和 calls 的顺序一致
+
+线程没法强制中断，超时只是不再等它的结果；线程本身会跑完后释放。
+
+传入 ToolMemo 时，标了 cacheable 的纯工具按 (工具名, 规范化参数) 记忆结果：
+同一个 session 里重复查同一个 alpha 不再打库，同一轮里的重复 call 也只执行一次。
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import instrument
+
+
+@dataclass
+class ToolCall:
+    call_id: str
+    name: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+    # 调用前就确定的错误（比如模型给的 arguments 不是合法 JSON）：不执行，直接作为这个 call 的错误结果
+    error: Optional[str] = None
+
+
+@dataclass
+class ToolResult:
+    call_id: str
+    name: str
+    output: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_output(self) -> str:
+        """function_call_output 需要字符串。"""
+        if self.error is not None:
+            return json.dumps({"ok": False, "error": self.error})
+        return json.dumps(self.output, default=str)
+
+
+def memo_key(name: str, arguments: Dict[str, Any]) -> str:
+    """参数顺序、空白不同的同一组参数得到同一个 key。"""
+    return name + ":" + json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolMemo:
+    """session 级的工具结果缓存，只缓存成功的结果。"""
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        if key in self._data:
+            self.hits += 1
+            instrument.count("tool_memo_total", result="hit")
+            return True, self._data[key]
+        self.misses += 1
+        instrument.count("tool_memo_total", result="miss")
+        return False, None
+
+    def put(self, key: str, output: Any) -> None:
+        # 工具自己兜底返回的 {"ok": False, ...}（比如临时的数据库错误）不缓存
+        if isinstance(output, dict) and output.get("ok") is False:
+            return
+        self._data[key] = output
+
+
+class ToolDispatcher:
+    def __init__(
+        self,
+        registry: Dict[str, Callable[..., Any]],
+        policies: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_workers: int = 8,
+        default_timeout: float = 60.0,
+        default_concurrency: int = 4,
+        memo: Optional[ToolMemo] = None,
+    ):
+        self.registry = registry
+        self.policies = policies or {}
+        self.default_timeout = default_timeout
+        self.memo = memo
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._limits: Dict[str, threading.Semaphore] = {}
+        self._default_concurrency = default_concurrency
+        self._lock = threading.Lock()
+
+    def _limit(self, name: str) -> threading.Semaphore:
+        with self._lock:
+            if name not in self._limits:
+                n = self.policies.get(name, {}).get("max_concurrency", self._default_concurrency)
+                self._limits[name] = threading.Semaphore(n)
+            return self._limits[name]
+
+    def _timeout(self, name: str) -> float:
+        return self.policies.get(name, {}).get("timeout", self.default_timeout)
+
+    def _invoke(self, call: ToolCall) -> Any:
+        limit = self._limit(call.name)
+        t0 = time.perf_counter()
+        with limit:
+            # 等工具并发名额的时间单独记，不算进 tool span
+            instrument.observe("tool_queue_seconds", time.perf_counter() - t0, tool=call.name)
+            with instrument.span("tool", tool=call.name, attrs={"call_id": call.call_id}) as sp:
+                output = self.registry[call.name](**call.arguments)
+                if isinstance(output, dict) and output.get("ok") is False:
+                    sp.note(error=output.get("error"))
+                    instrument.count("tool_errors_total", tool=call.name, kind="returned")
+                return output
+
+    def _cacheable(self, name: str) -> bool:
+        return self.memo is not None and bool(self.policies.get(name, {}).get("cacheable"))
+
+    def run(self, calls: List[ToolCall]) -> List[ToolResult]:
+        """并发执行一轮里的所有 call，按原顺序返回结果。"""
+        submitted = []
+        inflight: Dict[str, Any] = {}
+        for call in calls:
+            if call.error is not None or call.name not in self.registry:
+                submitted.append((call, None, 0.0, None))
+                continue
+
+            key = memo_key(call.name, call.arguments) if self._cacheable(call.name) else None
+            if key is not None:
+                hit, output = self.memo.get(key)
+                if hit:
+                    submitted.append((call, _Done(output), time.monotonic(), None))
+                    continue
+                if key in inflight:
+                    # 同一轮里完全相同的 call，共用一个 future
+                    submitted.append((call,) + inflight[key])
+                    continue
+
+            entry = (self._pool.submit(instrument.bind(self._invoke), call), time.monotonic(), key)
+            if key is not None:
+                inflight[key] = entry
+            submitted.append((call,) + entry)
+
+        results: List[ToolResult] = []
+        for call, fut, started, key in submitted:
+            if fut is None:
+                if call.error is not None:
+                    instrument.count("tool_errors_total", tool=call.name, kind="arguments")
+                error = call.error if call.error is not None else f"unknown tool: {call.name}"
+                results.append(ToolResult(call.call_id, call.name, error=error))
+                continue
+
+            # 超时从提交时算起，排队等并发名额的时间也算在内
+            remaining = max(0.0, started + self._timeout(call.name) - time.monotonic())
+            try:
+                output = fut.result(timeout=remaining)
+                if key is not None:
+                    self.memo.put(key, output)
+                results.append(ToolResult(
+                    call.call_id, call.name, output=output, elapsed=time.monotonic() - started
+                ))
+            except FutureTimeout:
+                fut.cancel()
+                instrument.count("tool_errors_total", tool=call.name, kind="timeout")
+                results.append(ToolResult(
+                    call.call_id, call.name,
+                    error=f"timed out after {self._timeout(call.name)}s",
+                    elapsed=time.monotonic() - started,
+                ))
+            except Exception as e:
+                instrument.count("tool_errors_total", tool=call.name, kind="exception")
+                results.append(ToolResult(
+                    call.call_id, call.name,
+                    error=f"{type(e).__name__}: {e}",
+                    elapsed=time.monotonic() - started,
+                ))
+
+        return results
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Done:
+    """memo 命中时充当已完成的 future。"""
+
+    def __init__(self, output: Any):
+        self._output = output
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        return self._output
+
+    def cancel(self) -> bool:
+        return False
@@ -0,0 +1,38 @@
+from typing import Dict, List, Optional
+
+from correlation import get_pool
+from sim.expr import ExpressionError
+from tools.simulate_alpha import simulate_pnl
+
+
+def check_correlation(
+    expression: Optional[str] = None,
+    pnl: Optional[List[float]] = None,
+    universe: Optional[str] = None,
+    delay: int = 1,
+    neutralization: str = "MARKET",
+    top_k: int = 5,
+) -> Dict:
+    """
+    Maximum correlation of a candidate's daily PnL against the submitted
+    alpha pool (CORR_POOL_PATH), plus the top_k most correlated pool alphas.
+
+    The candidate is either an expression, simulated on the local panel, or a
+    daily PnL series aligned so its last value is the pool's last day.
+    """
+    if not expression and not pnl:
+        return {"ok": False, "error": "expression or pnl is required", "data": None}
+
+    try:
+        pool = get_pool()
+        dates = None
+        if expression:
+            dates, pnl = simulate_pnl(expression, universe, delay, neutralization)
+        result = pool.max_correlation(pnl, dates, top_k=top_k)
+    except KeyError as e:
+        return {"ok": False, "error": e.args[0], "data": None}
+    except (ExpressionError, RuntimeError) as e:
+        return {"ok": False, "error": str(e), "data": None}
+
+    result["pool_size"] = len(pool)
+    return {"ok": True, "data": result, "error": None}
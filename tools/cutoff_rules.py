@@ -0,0 +1,195 @@
+# cutoff_rules.py
+"""
+声明式 cutoff 规则。
+
+规则从 JSON 配置读取（默认 schemas/cutoff_rules.json，可用 CUTOFF_RULES_PATH 覆盖）：
+  - default:  基础规则列表
+  - policies: 按 alpha_context 的 region / frequency / universe 匹配的覆盖规则，
+              同名规则替换，越具体（match 的 key 越多）的越后应用
+  - sql_columns: 规则里的 metric 对应宽表 wq_alpha_metrics_wide 的哪一列
+
+每个 (region, frequency, universe) 组合只编译一次，得到 CompiledPolicy：
+  - evaluate(metrics)      标量判定，输出格式与 resolve_cutoff 一致
+  - masks(cols, n)         向量化判定，给 resolve_cutoff_batch 用
+  - to_sql(include_soft)   WHERE 子句 + 参数，让 Postgres 直接在宽表上筛
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "schemas",
+    "cutoff_rules.json",
+)
+
+CONTEXT_KEYS = ("region", "frequency", "universe")
+
+# 规则写的是"通过条件"
+_PY_OPS = {
+    ">=": lambda x, v: x >= v,
+    ">": lambda x, v: x > v,
+    "<=": lambda x, v: x <= v,
+    "<": lambda x, v: x < v,
+    "between": lambda x, v: (x >= v[0]) & (x <= v[1]),
+}
+
+
+class Rule:
+    def __init__(self, spec: Dict[str, Any]):
+        if spec["op"] not in _PY_OPS:
+            raise ValueError(f"unknown cutoff op {spec['op']!r} in rule {spec.get('name')}")
+        self.name = spec["name"]
+        self.metric = spec["metric"]
+        self.op = spec["op"]
+        self.value = spec["value"]
+        self.severity = spec.get("severity", "hard")
+        self.optional = bool(spec.get("optional", False))
+        self.report_pass = bool(spec.get("report_pass", False))
+        # each=True: metric 是 {period: value} 字典，逐个判定（ladder_sharpe）
+        self.each = bool(spec.get("each", False))
+
+    def passes(self, x):
+        return _PY_OPS[self.op](x, self.value)
+
+    def failure(self, metric_name: str, x: float) -> Dict[str, Any]:
+        if self.op == "between":
+            return {"metric": metric_name, "value": x, "range": list(self.value)}
+        return {"metric": metric_name, "value": x, "cutoff": self.value}
+
+    def sql(self, column: str) -> Tuple[str, List[Any]]:
+        if self.op == "between":
+            clause, params = f"{column} BETWEEN %s AND %s", list(self.value)
+        else:
+            clause, params = f"{column} {self.op} %s", [self.value]
+        if self.optional:
+            clause = f"({column} IS NULL OR {clause})"
+        return clause, params
+
+
+class CompiledPolicy:
+    def __init__(self, rules: List[Rule], sql_columns: Dict[str, str]):
+        self.rules = rules
+        self.sql_columns = sql_columns
+
+    def evaluate(self, metrics: Dict[str, Any]) -> Dict[str, List]:
+        out = {"hard_fail": [], "soft_fail": [], "pass": []}
+
+        for rule in self.rules:
+            bucket = out["hard_fail"] if rule.severity == "hard" else out["soft_fail"]
+
+            if rule.each:
+                for period, x in (metrics.get(rule.metric) or {}).items():
+                    if not rule.passes(x):
+                        bucket.append(rule.failure(f"{rule.metric}_{period}", x))
+                continue
+
+            x = metrics.get(rule.metric) if rule.optional else metrics[rule.metric]
+            if x is None:
+                continue
+            if not rule.passes(x):
+                bucket.append(rule.failure(rule.metric, x))
+            elif rule.report_pass:
+                out["pass"].append(rule.name)
+
+        return out
+
+    def masks(self, cols: Dict[str, np.ndarray], n: int) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        cols: 每个 metric 一列 float 数组，缺失为 NaN；each 规则读 <metric>_<period> 列。
+        NaN 不算失败（对应标量版里缺失就跳过）。
+        """
+        out = {"hard_fail": {}, "soft_fail": {}, "pass": {}}
+
+        for rule in self.rules:
+            bucket = out["hard_fail"] if rule.severity == "hard" else out["soft_fail"]
+
+            if rule.each:
+                prefix = f"{rule.metric}_"
+                for name in cols:
+                    if name.startswith(prefix):
+                        x = np.asarray(cols[name], dtype=np.float64)
+                        bucket[name] = ~np.isnan(x) & ~rule.passes(x)
+                continue
+
+            if rule.metric in cols:
+                x = np.asarray(cols[rule.metric], dtype=np.float64)
+            else:
+                x = np.full(n, np.nan)
+            present = ~np.isnan(x)
+            with np.errstate(invalid="ignore"):
+                fail = present & ~rule.passes(x)
+            bucket[rule.name] = fail
+            if rule.report_pass:
+                # 缺失的值不算通过，和标量版里 x is None 就跳过一致
+                out["pass"][rule.name] = present & ~fail
+
+        return out
+
+    def to_sql(self, include_soft: bool = False) -> Tuple[str, List[Any], List[str]]:
+        """
+        通过条件编译成 WHERE 子句。
+        返回 (where_sql, params, skipped)：skipped 是宽表里没有对应列、没能下推的规则。
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        skipped: List[str] = []
+
+        for rule in self.rules:
+            if rule.severity != "hard" and not include_soft:
+                continue
+            column = self.sql_columns.get(rule.metric)
+            if column is None or rule.each:
+                skipped.append(rule.name)
+                continue
+            clause, p = rule.sql(column)
+            clauses.append(clause)
+            params.extend(p)
+
+        return (" AND ".join(clauses) or "TRUE"), params, skipped
+
+
+class RuleSet:
+    def __init__(self, config: Dict[str, Any]):
+        self.default = config.get("default", [])
+        # 越具体的 policy 越后应用，覆盖前面的同名规则
+        self.policies = sorted(config.get("policies", []), key=lambda p: len(p.get("match", {})))
+        self.sql_columns = config.get("sql_columns", {})
+        self._compiled: Dict[Tuple, CompiledPolicy] = {}
+
+    def resolve(self, region: Optional[str] = None, frequency: Optional[str] = None,
+                universe: Optional[str] = None) -> CompiledPolicy:
+        key = (region, frequency, universe)
+        if key in self._compiled:
+            return self._compiled[key]
+
+        ctx = dict(zip(CONTEXT_KEYS, key))
+        merged: Dict[str, Dict[str, Any]] = {r["name"]: r for r in self.default}
+        for policy in self.policies:
+            match = policy.get("match", {})
+            if all(ctx.get(k) == v for k, v in match.items()):
+                for r in policy.get("rules", []):
+                    merged[r["name"]] = r
+
+        compiled = CompiledPolicy([Rule(spec) for spec in merged.values()], self.sql_columns)
+        self._compiled[key] = compiled
+        return compiled
+
+
+_RULE_SET: Optional[RuleSet] = None
+
+
+def load_rule_set(path: Optional[str] = None) -> RuleSet:
+    """读取并缓存规则配置；传 path 时总是重新读。"""
+    global _RULE_SET
+    if path is None and _RULE_SET is not None:
+        return _RULE_SET
+
+    with open(path or os.getenv("CUTOFF_RULES_PATH", DEFAULT_RULES_PATH)) as f:
+        rule_set = RuleSet(json.load(f))
+
+    if path is None:
+        _RULE_SET = rule_set
+    return rule_set
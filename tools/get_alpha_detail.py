@@ -1,5 +1,5 @@
 from typing import Dict, Optional
-from db import get_pg_conn
+from db import pg_conn
 
 def get_alpha_detail(alpha_id: Optional[str] = None) -> Dict:
     # ===== 参数兜底（必须有）=====
@@ -10,20 +10,19 @@ def get_alpha_detail(alpha_id: Optional[str] = None) -> Dict:
             "data": None,
         }
 
-    conn = None
     try:
-        conn = get_pg_conn()
-        cur = conn.cursor()
+        with pg_conn() as conn:
+            cur = conn.cursor()
 
-        sql = """
-        SELECT * 
-        FROM wq_alphas
-        WHERE alpha_id = %s
-        LIMIT 1;
-        """
+            sql = """
+            SELECT * 
+            FROM wq_alphas
+            WHERE alpha_id = %s
+            LIMIT 1;
+            """
 
-        cur.execute(sql, (alpha_id,))
-        row = cur.fetchone()
+            cur.execute(sql, (alpha_id,))
+            row = cur.fetchone()
 
         if not row:
             return {
@@ -44,8 +43,4 @@ def get_alpha_detail(alpha_id: Optional[str] = None) -> Dict:
             "ok": False,
             "error": str(e),
             "data": None,
-        }
-
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+        }
\ No newline at end of file
@@ -1,11 +1,13 @@
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional
 import psycopg2
 import psycopg2.extras
 
+from db import pg_conn
+
 
 def get_backtest_metrics(
     alpha_id: str,
-    conn
+    conn=None
 ) -> Optional[Dict]:
     """
     Fetch backtest metrics for a single alpha from Postgres.
@@ -13,8 +15,11 @@ def get_backtest_metrics(
     This function:
     - Reads factual data only
     - Does NOT do any aggregation
-    - Is NOT intended to be called by LLM
+    - Borrows a pooled connection when `conn` is not given
     """
+    if conn is None:
+        with pg_conn() as pooled:
+            return get_backtest_metrics(alpha_id, pooled)
 
     sql = """
         SELECT
@@ -37,6 +42,10 @@ def get_backtest_metrics(
     if row is None:
         return None
 
+    return _row_to_metrics(row)
+
+
+def _row_to_metrics(row) -> Dict:
     return {
         "alpha_id": row["alpha_id"],
         "sharpe": float(row["sharpe"]),
@@ -44,4 +53,87 @@ def get_backtest_metrics(
         "turnover": float(row["turnover"]),        # percentage
         "max_drawdown": float(row["max_drawdown"]),# percentage
         "margin": float(row["margin"])              # percentage
+    }
+
+
+# 批量查询依赖这个索引：DISTINCT ON (alpha_id) ... ORDER BY alpha_id, updated_at DESC
+# 每个 alpha 只需要读索引里的第一条
+BACKTEST_RESULTS_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS alpha_backtest_results_alpha_updated_idx
+ON alpha_backtest_results (alpha_id, updated_at DESC)
+"""
+
+
+def ensure_backtest_results_index(cur) -> bool:
+    """
+    alpha_backtest_results 不是 dump 写的表，有的库里根本没有；没有就跳过，返回 False。
+    """
+    cur.execute("SELECT to_regclass('alpha_backtest_results') IS NOT NULL AS present")
+    row = cur.fetchone()
+    if not (row["present"] if isinstance(row, dict) else row[0]):
+        return False
+    cur.execute(BACKTEST_RESULTS_INDEX_DDL)
+    return True
+
+
+def iter_backtest_metrics(
+    alpha_ids: List[str],
+    chunk_size: int = 500,
+    conn=None
+) -> Iterator[List[Dict]]:
+    """
+    Resolve the latest backtest row for many alphas, one set-based query per
+    chunk of ids, yielding each chunk's results as soon as it is fetched.
+    """
+    if conn is None:
+        with pg_conn() as pooled:
+            yield from iter_backtest_metrics(alpha_ids, chunk_size, pooled)
+        return
+
+    sql = """
+        SELECT DISTINCT ON (alpha_id)
+            alpha_id,
+            sharpe,
+            fitness,
+            turnover,
+            max_drawdown,
+            margin
+        FROM alpha_backtest_results
+        WHERE alpha_id = ANY(%s)
+        ORDER BY alpha_id, updated_at DESC
+    """
+
+    ids = list(dict.fromkeys(alpha_ids))
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            cur.execute(sql, (chunk,))
+            rows = cur.fetchall()
+        yield [_row_to_metrics(r) for r in rows]
+
+
+def get_backtest_metrics_batch(
+    alpha_ids: List[str],
+    chunk_size: int = 500,
+) -> Dict:
+    """
+    Batched get_backtest_metrics for LLM tool use: latest metrics for every
+    alpha_id, plus the ids that have no backtest row.
+    """
+    if not alpha_ids:
+        return {"ok": False, "error": "alpha_ids is required", "data": None}
+
+    try:
+        data: List[Dict] = []
+        for chunk in iter_backtest_metrics(alpha_ids, chunk_size):
+            data.extend(chunk)
+    except Exception as e:
+        return {"ok": False, "error": str(e), "data": None}
+
+    found = {d["alpha_id"] for d in data}
+    return {
+        "ok": True,
+        "data": data,
+        "missing": [a for a in dict.fromkeys(alpha_ids) if a not in found],
+        "error": None,
     }
\ No newline at end of file
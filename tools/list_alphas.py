@@ -1,10 +1,14 @@
 # tools_wq.py
 import os
 import time
-from typing import List, Dict, Any, Optional
+import uuid
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 
 from dotenv import load_dotenv
 
+from db import pg_conn
+from http_cache import ResponseCache
 from wq_client import WQClient
 
 load_dotenv()
@@ -21,11 +25,74 @@ def _get_wq() -> WQClient:
     if not username or not password:
         raise RuntimeError("Missing WQ_USERNAME/WQ_PASSWORD in .env")
 
-    _WQ = WQClient(username=username, password=password)
+    _WQ = WQClient(username=username, password=password, cache=ResponseCache.from_env())
     return _WQ
 
 
-def list_alphas(limit: int = 100, max_pages: int = 5, sleep: float = 0.2) -> List[Dict[str, Any]]:
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # 没带时区的按 UTC 处理，避免和 API 返回的带时区时间比较时报错
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _collect(items: List[Dict[str, Any]], out: List[Dict[str, Any]], since_ts) -> bool:
+    """把一页结果追加进 out；遇到不晚于 since 的 alpha 返回 True（后面不用再翻）。"""
+    for a in items:
+        created = a.get("dateCreated")
+        if since_ts is not None and created and _parse_ts(created) <= since_ts:
+            return True
+        out.append({
+            "alpha_id": a.get("id") or a.get("alphaId") or a.get("alpha_id"),
+            "expression": a.get("expression"),
+            "region": a.get("region"),
+            "universe": a.get("universe"),
+            "delay": a.get("delay"),
+            "neutralization": a.get("neutralization"),
+            "dateCreated": a.get("dateCreated"),
+        })
+    return False
+
+
+def _items(data: Any) -> List[Dict[str, Any]]:
+    return data.get("results", data) if isinstance(data, dict) else data
+
+
+async def _fetch_pages_async(wq, base: str, limit: int, max_pages: int) -> List[List[Dict[str, Any]]]:
+    """
+    先拉第一页拿到 count，剩下的页一次性并发发出去；
+    没有 count 时退回逐页翻。
+    """
+    def page_url(offset: int) -> str:
+        return f"{base}/users/self/alphas?limit={limit}&offset={offset}&order=-dateCreated"
+
+    first = await wq.get_json(page_url(0))
+    pages = [_items(first)]
+    if not pages[0] or max_pages <= 1:
+        return pages
+
+    count = first.get("count") if isinstance(first, dict) else None
+    if count is None:
+        offset = len(pages[0])
+        while len(pages) < max_pages:
+            items = _items(await wq.get_json(page_url(offset)))
+            if not items:
+                break
+            pages.append(items)
+            offset += len(items)
+        return pages
+
+    offsets = list(range(limit, min(count, limit * max_pages), limit))
+    rest = await wq.gather_json([page_url(o) for o in offsets])
+    pages.extend(_items(d) for d in rest)
+    return pages
+
+
+def list_alphas(
+    limit: int = 100,
+    max_pages: int = 5,
+    sleep: float = 0.2,
+    since: Optional[str] = None,
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Pull alphas from WorldQuant BRAIN account via API.
 
@@ -33,34 +100,46 @@ def list_alphas(limit: int = 100, max_pages: int = 5, sleep: float = 0.2) -> Lis
       limit: page size per request (typical 100-500)
       max_pages: safety cap to avoid infinite loops
       sleep: throttle between requests
+      since: only return alphas created after this ISO timestamp; paging stops
+             at the first older alpha (list is ordered by -dateCreated)
+
+    With WQ_ASYNC=1 the pages are fetched concurrently through the shared
+    AsyncWQClient (its rate limiter replaces `sleep`).
 
     Returns:
       List of dicts with alpha_id, expression, dateCreated, region, universe, etc.
+      An unparseable `since` returns {"ok": False, "error": ...} instead.
     """
-    wq = _get_wq()
+    try:
+        since_ts = _parse_ts(since) if since else None
+    except (AttributeError, TypeError, ValueError) as e:
+        return {"ok": False, "error": f"invalid since {since!r}: {e}", "data": None}
+
     base = os.getenv("WQ_API_BASE", "https://api.worldquantbrain.com").rstrip("/")
     out: List[Dict[str, Any]] = []
 
+    if os.getenv("WQ_ASYNC", "0") == "1":
+        import wq_async_client
+
+        client = wq_async_client.get_shared_client()
+        for items in wq_async_client.run_sync(_fetch_pages_async(client, base, limit, max_pages)):
+            if not items or _collect(items, out, since_ts):
+                break
+        return [x for x in out if x.get("alpha_id")]
+
+    wq = _get_wq()
     offset = 0
     pages = 0
     while pages < max_pages:
         url = f"{base}/users/self/alphas?limit={limit}&offset={offset}&order=-dateCreated"
         data = wq.get_json(url)
 
-        items = data.get("results", data) if isinstance(data, dict) else data
+        items = _items(data)
         if not items:
             break
 
-        for a in items:
-            out.append({
-                "alpha_id": a.get("id") or a.get("alphaId") or a.get("alpha_id"),
-                "expression": a.get("expression"),
-                "region": a.get("region"),
-                "universe": a.get("universe"),
-                "delay": a.get("delay"),
-                "neutralization": a.get("neutralization"),
-                "dateCreated": a.get("dateCreated"),
-            })
+        if _collect(items, out, since_ts):
+            break
 
         offset += len(items)
         pages += 1
@@ -69,3 +148,133 @@ def list_alphas(limit: int = 100, max_pages: int = 5, sleep: float = 0.2) -> Lis
     # filter empties
     out = [x for x in out if x.get("alpha_id")]
     return out
+
+
+# ========== Postgres 版本 ==========
+# ingestion 已经把 alpha 落到 wq_alpha，列表直接读库，不再每次打 API。
+# 按 (created_at, alpha_id) 做 keyset 分页：第 N 页和第 1 页一样只是一次索引扫描，
+# 不会像 OFFSET 那样越翻越慢。
+# created_at 可以是 NULL（sync_alphas 会保留没有 dateCreated 的行）。行比较碰到 NULL 永远不成立，
+# 所以分两段扫：先按 (created_at, alpha_id) 扫有时间的行，再按 alpha_id 扫 created_at IS NULL 的行；
+# 游标里 created_at 为 None 表示已经在第二段。
+
+ALPHA_LIST_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS wq_alpha_created_at_alpha_id_idx
+ON wq_alpha (created_at DESC, alpha_id DESC)
+"""
+
+_DB_FILTERS = ("region", "universe", "delay", "neutralization")
+
+
+def ensure_alpha_list_index(cur) -> None:
+    cur.execute(ALPHA_LIST_INDEX_DDL)
+
+
+def iter_alphas_db(
+    after: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    itersize: int = 2000,
+    **filters: Any,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream alphas from Postgres newest first through a named server-side
+    cursor, so memory stays flat regardless of library size.
+
+    Args:
+      after: keyset cursor {"created_at", "alpha_id"}; rows strictly after it.
+             Alphas without created_at come last; their cursor has created_at=None.
+      limit: stop after this many rows (None = everything)
+      itersize: rows fetched from the server per round trip
+      filters: region / universe / delay / neutralization equality filters
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+
+    for key in _DB_FILTERS:
+        if filters.get(key) is not None:
+            clauses.append(f"{key} = %s")
+            params.append(filters[key])
+
+    remaining = limit
+    for keyset, keyset_params, order in _keyset_phases(after):
+        if remaining is not None and remaining <= 0:
+            return
+
+        sql = f"""
+            SELECT alpha_id, expression, region, universe, delay, neutralization, created_at
+            FROM wq_alpha
+            WHERE {" AND ".join(clauses + [keyset])}
+            ORDER BY {order}
+            {"LIMIT %s" if remaining is not None else ""}
+        """
+        phase_params = params + keyset_params + ([remaining] if remaining is not None else [])
+
+        with pg_conn() as conn:
+            with conn.cursor(name=f"list_alphas_{uuid.uuid4().hex}") as cur:
+                cur.itersize = itersize
+                cur.execute(sql, phase_params)
+                for row in cur:
+                    if remaining is not None:
+                        remaining -= 1
+                    yield row
+
+
+def _keyset_phases(after: Optional[Dict[str, Any]]) -> List[Tuple[str, List[Any], str]]:
+    """(条件, 参数, 排序) 的列表：先有 created_at 的行，再 created_at IS NULL 的行。"""
+    dated_order = "created_at DESC, alpha_id DESC"
+    if not after:
+        return [
+            ("created_at IS NOT NULL", [], dated_order),
+            ("created_at IS NULL", [], "alpha_id DESC"),
+        ]
+    if after.get("created_at") is not None:
+        return [
+            ("created_at IS NOT NULL AND (created_at, alpha_id) < (%s, %s)",
+             [after["created_at"], after["alpha_id"]], dated_order),
+            ("created_at IS NULL", [], "alpha_id DESC"),
+        ]
+    return [("created_at IS NULL AND alpha_id < %s", [after["alpha_id"]], "alpha_id DESC")]
+
+
+def list_alphas_db(
+    limit: int = 100,
+    after_created_at: Optional[str] = None,
+    after_alpha_id: Optional[str] = None,
+    region: Optional[str] = None,
+    universe: Optional[str] = None,
+    delay: Optional[int] = None,
+    neutralization: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One page of alphas from Postgres, newest first.
+
+    Pass the returned next_cursor back as after_created_at / after_alpha_id
+    to get the following page. after_created_at is null once the listing has
+    reached alphas without a creation time.
+    """
+    after = None
+    if after_alpha_id:
+        after = {"created_at": after_created_at or None, "alpha_id": after_alpha_id}
+
+    try:
+        rows = list(iter_alphas_db(
+            after=after,
+            limit=limit,
+            itersize=limit,
+            region=region,
+            universe=universe,
+            delay=delay,
+            neutralization=neutralization,
+        ))
+    except Exception as e:
+        return {"ok": False, "error": str(e), "data": None}
+
+    for r in rows:
+        if isinstance(r.get("created_at"), datetime):
+            r["created_at"] = r["created_at"].isoformat()
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = {"created_at": rows[-1]["created_at"], "alpha_id": rows[-1]["alpha_id"]}
+
+    return {"ok": True, "data": rows, "next_cursor": next_cursor, "error": None}
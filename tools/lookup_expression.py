@@ -0,0 +1,49 @@
+from typing import Dict, Optional
+
+from db import pg_conn
+from fingerprint import find_by_fingerprint
+from sim.compiler import canonical_text, hash_canonical
+
+
+def lookup_expression(
+    expression: str,
+    region: Optional[str] = None,
+    universe: Optional[str] = None,
+    delay: Optional[int] = None,
+    neutralization: Optional[str] = None,
+) -> Dict:
+    """
+    Find already-ingested alphas equivalent to an expression (same canonical
+    fingerprint), optionally restricted to the same settings, with their
+    headline metrics. Call before simulating to avoid re-running duplicates.
+    """
+    if not expression:
+        return {"ok": False, "error": "expression is required", "data": None}
+
+    canonical = canonical_text(expression)
+    fp = hash_canonical(canonical)
+
+    try:
+        with pg_conn() as conn:
+            with conn.cursor() as cur:
+                rows = find_by_fingerprint(
+                    cur, fp,
+                    region=region,
+                    universe=universe,
+                    delay=delay,
+                    neutralization=neutralization,
+                )
+    except Exception as e:
+        return {"ok": False, "error": str(e), "data": None}
+
+    return {
+        "ok": True,
+        "data": {
+            "fingerprint": fp,
+            "canonical": canonical,
+            "exists": bool(rows),
+            "alpha_ids": [r["alpha_id"] for r in rows],
+            "matches": rows,
+        },
+        "error": None,
+    }
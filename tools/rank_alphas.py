@@ -0,0 +1,288 @@
+import heapq
+import itertools
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg2.errors import UndefinedTable
+
+from db import pg_conn
+from metrics_wide import METRIC_COLUMNS, PREFIXES, WIDE_TABLE
+
+# rank_alphas.py
+#
+# 两条路径，内存都是 O(k)：
+#   sql    所有指标都在宽表里：ORDER BY <score> LIMIT k 交给 Postgres，
+#          单指标 + region 时走 (region, metric) 索引倒序扫，只读 k 行
+#   stream 指标不在宽表里（或宽表还没建）：named cursor 按 alpha_id 流式读
+#          wq_backtest_metrics，Python 里用大小为 k 的堆选 top-k
+#
+# Pareto 前沿同样流式读，只在内存里保留当前的非支配集合。
+
+DEFAULT_PREFIX = "is_ic"
+PARETO_OBJECTIVES = ["sharpe", "fitness", "-turnover"]
+HEADLINE = ["is_ic_sharpe", "is_ic_fitness", "is_ic_turnover"]
+MAX_LIMIT = 500
+
+_FILTERS = ("region", "universe", "delay", "neutralization")
+
+
+def _metric_name(name: str) -> str:
+    """'fitness' -> 'is_ic_fitness'；已带 is_ic_ / test_rn_ 等前缀的原样返回。"""
+    if any(name.startswith(p + "_") for p in PREFIXES):
+        return name
+    return f"{DEFAULT_PREFIX}_{name}"
+
+
+def _objective(spec: str) -> Tuple[str, float]:
+    """'-turnover' -> ('is_ic_turnover', -1.0)：负号表示越小越好。"""
+    sign = -1.0 if spec.startswith("-") else 1.0
+    return _metric_name(spec.lstrip("+-")), sign
+
+
+def _where(alias: str, filters: Dict[str, Any], created_after: Optional[str],
+           created_before: Optional[str]) -> Tuple[List[str], List[Any]]:
+    clauses: List[str] = []
+    params: List[Any] = []
+    for key in _FILTERS:
+        if filters.get(key) is not None:
+            clauses.append(f"{alias}{key} = %s")
+            params.append(filters[key])
+    if created_after:
+        clauses.append(f"{alias}created_at >= %s")
+        params.append(created_after)
+    if created_before:
+        clauses.append(f"{alias}created_at < %s")
+        params.append(created_before)
+    return clauses, params
+
+
+def _jsonable(row: Dict[str, Any]) -> Dict[str, Any]:
+    if isinstance(row.get("created_at"), datetime):
+        row["created_at"] = row["created_at"].isoformat()
+    return row
+
+
+# ========== 宽表（SQL） ==========
+
+def _wide_rows(terms: Sequence[Tuple[str, float]], limit: int, clauses: List[str],
+               params: List[Any]) -> List[Dict[str, Any]]:
+    cols = list(dict.fromkeys(HEADLINE + [c for c, _ in terms]))
+    not_null = [f"{c} IS NOT NULL" for c, _ in terms]
+
+    if len(terms) == 1:
+        # 单指标直接按列排序，才能用上索引
+        col, sign = terms[0]
+        score = col
+        order = f"{col} {'DESC' if sign > 0 else 'ASC'}"
+    else:
+        score = " + ".join(f"%s * {c}" for c, _ in terms)
+        order = "score DESC"
+        params = [w for _, w in terms] + params
+
+    sql = f"""
+        SELECT alpha_id, region, universe, delay, neutralization, created_at,
+               {", ".join(cols)},
+               {score} AS score
+        FROM {WIDE_TABLE}
+        WHERE {" AND ".join(clauses + not_null)}
+        ORDER BY {order}, alpha_id
+        LIMIT %s
+    """
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, params + [limit])
+            return [_jsonable(dict(r)) for r in cur.fetchall()]
+
+
+def _iter_wide(objectives: Sequence[Tuple[str, float]], clauses: List[str],
+               params: List[Any], itersize: int = 5000) -> Iterator[Dict[str, Any]]:
+    cols = list(dict.fromkeys(HEADLINE + [c for c, _ in objectives]))
+    not_null = [f"{c} IS NOT NULL" for c, _ in objectives]
+    # 按第一个目标排好序读进来，后来的点基本不会支配前沿里已有的点
+    col, sign = objectives[0]
+    sql = f"""
+        SELECT alpha_id, region, universe, delay, neutralization, created_at, {", ".join(cols)}
+        FROM {WIDE_TABLE}
+        WHERE {" AND ".join(clauses + not_null)}
+        ORDER BY {col} {'DESC' if sign > 0 else 'ASC'}
+    """
+    with pg_conn() as conn:
+        with conn.cursor(name=f"rank_alphas_{uuid.uuid4().hex}") as cur:
+            cur.itersize = itersize
+            cur.execute(sql, params)
+            for row in cur:
+                yield dict(row)
+
+
+# ========== EAV 流式（fallback） ==========
+
+def _iter_eav(metrics: Sequence[str], period: str, clauses: List[str], params: List[Any],
+              itersize: int = 20000) -> Iterator[Dict[str, Any]]:
+    """wq_backtest_metrics 按 alpha_id 顺序流式 pivot，一次只攒一个 alpha 的行。"""
+    sql = f"""
+        SELECT m.alpha_id, m.metric_name, m.metric_value,
+               a.region, a.universe, a.delay, a.neutralization, a.created_at
+        FROM wq_backtest_metrics m
+        JOIN wq_alpha a ON a.alpha_id = m.alpha_id
+        WHERE {" AND ".join(["m.period = %s", "m.metric_name = ANY(%s)"] + clauses)}
+        ORDER BY m.alpha_id
+    """
+    wanted = list(dict.fromkeys(list(metrics) + HEADLINE))
+    with pg_conn() as conn:
+        with conn.cursor(name=f"rank_alphas_{uuid.uuid4().hex}") as cur:
+            cur.itersize = itersize
+            cur.execute(sql, [period, wanted] + params)
+            for alpha_id, group in itertools.groupby(cur, key=lambda r: r["alpha_id"]):
+                group = list(group)
+                row = {k: group[0][k] for k in
+                       ("alpha_id", "region", "universe", "delay", "neutralization", "created_at")}
+                row.update({g["metric_name"]: g["metric_value"] for g in group})
+                yield row
+
+
+def _top_k(rows: Iterator[Dict[str, Any]], terms: Sequence[Tuple[str, float]],
+           limit: int) -> List[Dict[str, Any]]:
+    heap: List[Tuple[float, str, Dict[str, Any]]] = []
+    for row in rows:
+        values = [row.get(c) for c, _ in terms]
+        if any(v is None for v in values):
+            continue
+        key = float(sum(w * v for (_, w), v in zip(terms, values)))
+        # 单指标时 score 就是指标值本身（升序排也一样），加权时是加权和
+        row["score"] = float(values[0]) if len(terms) == 1 else key
+        # 小顶堆：堆顶是目前第 k 名，比它差的直接丢
+        item = (key, row["alpha_id"], row)
+        if len(heap) < limit:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    return [_jsonable(row) for _, _, row in sorted(heap, key=lambda x: (-x[0], x[1]))]
+
+
+# ========== Pareto 前沿 ==========
+
+class _Front:
+    """非支配集合。点已按方向统一成越大越好；容量翻倍增长。"""
+
+    def __init__(self, dims: int, capacity: int = 256):
+        self.values = np.empty((capacity, dims))
+        self.rows: List[Dict[str, Any]] = []
+
+    def add(self, p: np.ndarray, row: Dict[str, Any]) -> None:
+        m = len(self.rows)
+        F = self.values[:m]
+        if m and np.any(np.all(F >= p, axis=1) & np.any(F > p, axis=1)):
+            return
+        dominated = np.all(p >= F, axis=1) & np.any(p > F, axis=1)
+        if dominated.any():
+            keep = ~dominated
+            m = int(keep.sum())
+            self.values[:m] = F[keep]
+            self.rows = [r for r, k in zip(self.rows, keep) if k]
+        if m == len(self.values):
+            grown = np.empty((2 * m, self.values.shape[1]))
+            grown[:m] = self.values[:m]
+            self.values = grown
+        self.values[m] = p
+        self.rows.append(row)
+
+
+def _pareto(rows: Iterator[Dict[str, Any]], objectives: Sequence[Tuple[str, float]]) -> List[Dict[str, Any]]:
+    front = _Front(len(objectives))
+    signs = np.array([s for _, s in objectives])
+    for row in rows:
+        values = [row.get(c) for c, _ in objectives]
+        if any(v is None for v in values):
+            continue
+        front.add(signs * np.asarray(values, dtype=np.float64), row)
+    first, sign = objectives[0]
+    return sorted(front.rows, key=lambda r: (-sign * r[first], r["alpha_id"]))
+
+
+def rank_alphas(
+    metric: str = "fitness",
+    weights: Optional[Dict[str, float]] = None,
+    ascending: bool = False,
+    limit: int = 20,
+    region: Optional[str] = None,
+    universe: Optional[str] = None,
+    delay: Optional[int] = None,
+    neutralization: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    pareto: bool = False,
+    objectives: Optional[List[str]] = None,
+    period: str = "full",
+) -> Dict:
+    """
+    Top-k ingested alphas by one metric, or by a weighted score
+    sum(weight * metric), filtered by region / universe / delay /
+    neutralization / created_at range. Alphas missing a scored metric are
+    left out. Bare metric names mean the is_ic_ variant ("sharpe" ->
+    "is_ic_sharpe").
+
+    With pareto=True returns the Pareto front over `objectives` instead
+    (default sharpe, fitness and turnover; a leading "-" means lower is
+    better), best first objective first.
+
+    Metrics in the wide metrics table are ranked in Postgres; others are
+    streamed from wq_backtest_metrics with an O(limit) heap.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    filters = {"region": region, "universe": universe, "delay": delay, "neutralization": neutralization}
+
+    if pareto:
+        terms = [_objective(o) for o in (objectives or PARETO_OBJECTIVES)]
+        if not terms:
+            return {"ok": False, "error": "objectives must not be empty", "data": None}
+    elif weights:
+        terms = [(_metric_name(k), float(w)) for k, w in weights.items()]
+    else:
+        terms = [(_metric_name(metric), -1.0 if ascending else 1.0)]
+
+    use_wide = period == "full" and all(c in METRIC_COLUMNS for c, _ in terms)
+    source = "sql" if use_wide else "stream"
+
+    def stream_rows():
+        clauses, params = _where("a.", filters, created_after, created_before)
+        return _iter_eav([c for c, _ in terms], period, clauses, params)
+
+    try:
+        if pareto:
+            if use_wide:
+                clauses, params = _where("", filters, created_after, created_before)
+                try:
+                    front = _pareto(_iter_wide(terms, clauses, params), terms)
+                except UndefinedTable:
+                    # 同下面 top-k：宽表还没建就退回 EAV
+                    source = "stream"
+                    front = _pareto(stream_rows(), terms)
+            else:
+                front = _pareto(stream_rows(), terms)
+            rows = [_jsonable(r) for r in front[:limit]]
+        elif use_wide:
+            clauses, params = _where("", filters, created_after, created_before)
+            try:
+                rows = _wide_rows(terms, limit, clauses, params)
+            except UndefinedTable:
+                # 宽表还没建（没跑过 ingestion 的 ensure_wide_table），退回 EAV
+                source = "stream"
+                rows = _top_k(stream_rows(), terms, limit)
+        else:
+            rows = _top_k(stream_rows(), terms, limit)
+    except Exception as e:
+        return {"ok": False, "error": str(e), "data": None}
+
+    out = {
+        "ok": True,
+        "data": rows,
+        "score": [{"metric": c, "weight": w} for c, w in terms],
+        "source": source,
+        "error": None,
+    }
+    if pareto:
+        out["front_size"] = len(front)
+    return out
@@ -1,11 +1,20 @@
 from typing import Dict, Any, List
 
+import numpy as np
+
+from correlation import get_pool
+from tools.cutoff_rules import CONTEXT_KEYS, load_rule_set
+
 # resolve_cutoff.py
 
 def resolve_cutoff(input: Dict[str, Any]) -> Dict[str, Any]:
     """
     Resolve WorldQuant cutoff rules based on alpha context and metrics.
     Returns structured evaluation: hard_fail / soft_fail / pass.
+
+    Optional input "pnl" (daily PnL, with "pnl_dates" if not aligned to the
+    pool's last day) fills metrics["self_correlation"] from the submitted
+    pool when it is not given.
     """
 
     alpha_id = input["alpha_id"]
@@ -13,73 +22,17 @@ def resolve_cutoff(input: Dict[str, Any]) -> Dict[str, Any]:
     metrics = input["metrics"]
     policy = input["cutoff_policy"]
 
-    results = {
-        "alpha_id": alpha_id,
-        "hard_fail": [],
-        "soft_fail": [],
-        "pass": []
-    }
+    if input.get("pnl") is not None and metrics.get("self_correlation") is None:
+        corr = get_pool().max_correlation(input["pnl"], input.get("pnl_dates"), exclude=alpha_id)
+        metrics = {**metrics, "self_correlation": corr["max_correlation"]}
 
-    # ---------- Fitness ----------
-    if metrics["fitness"] < 1.0:
-        results["hard_fail"].append({
-            "metric": "fitness",
-            "value": metrics["fitness"],
-            "cutoff": 1.0
-        })
-    else:
-        results["pass"].append("fitness")
-
-    # ---------- Sharpe ----------
-    sharpe_cutoff = 1.58 if ctx["region"] == "USA" else 1.2
-    if metrics["sharpe"] < sharpe_cutoff:
-        results["hard_fail"].append({
-            "metric": "sharpe",
-            "value": metrics["sharpe"],
-            "cutoff": sharpe_cutoff
-        })
-    else:
-        results["pass"].append("sharpe")
-
-    # ---------- Turnover ----------
-    turnover = metrics.get("turnover")
-    if turnover is not None:
-        if turnover < 0.01 or turnover > 0.70:
-            results["soft_fail"].append({
-                "metric": "turnover",
-                "value": turnover,
-                "range": [0.01, 0.70]
-            })
-        else:
-            results["pass"].append("turnover")
-
-    # ---------- Weight concentration ----------
-    wc = metrics.get("weight_concentration")
-    if wc is not None and wc > 0.10:
-        results["soft_fail"].append({
-            "metric": "weight_concentration",
-            "value": wc,
-            "cutoff": 0.10
-        })
-
-    # ---------- Sub-universe Sharpe ----------
-    sub_sharpe = metrics.get("sub_universe_sharpe")
-    if sub_sharpe is not None and sub_sharpe < 0.46:
-        results["soft_fail"].append({
-            "metric": "sub_universe_sharpe",
-            "value": sub_sharpe,
-            "cutoff": 0.46
-        })
-
-    # ---------- Ladder Sharpe ----------
-    ladder = metrics.get("ladder_sharpe", {})
-    for period, value in ladder.items():
-        if value < 2.02:
-            results["soft_fail"].append({
-                "metric": f"ladder_sharpe_{period}",
-                "value": value,
-                "cutoff": 2.02
-            })
+    # 阈值来自 schemas/cutoff_rules.json，按 region / frequency / universe 选规则
+    rules = load_rule_set().resolve(
+        ctx.get("region"), ctx.get("frequency"), ctx.get("universe")
+    )
+
+    results = {"alpha_id": alpha_id}
+    results.update(rules.evaluate(metrics))
 
     # ---------- Final decision ----------
     if results["hard_fail"]:
@@ -91,3 +44,104 @@ def resolve_cutoff(input: Dict[str, Any]) -> Dict[str, Any]:
 
     return results
 
+
+
+# ========== 批量（向量化）版本 ==========
+
+def _columns(frame) -> Dict[str, Any]:
+    """接受 dict of arrays / pandas DataFrame / pyarrow Table，统一成 dict of numpy arrays。"""
+    if hasattr(frame, "column_names"):  # pyarrow.Table
+        return {c: frame[c].to_numpy() for c in frame.column_names}
+    return {c: np.asarray(frame[c]) for c in frame.keys()}
+
+
+def _float_col(cols: Dict[str, Any], name: str, n: int) -> np.ndarray:
+    """缺失的列 / None 统一成 NaN，NaN 的比较结果恒为 False，对应标量版里的 `is not None`。"""
+    if name not in cols:
+        return np.full(n, np.nan)
+    return np.asarray(cols[name], dtype=np.float64)
+
+
+def resolve_cutoff_batch(frame, allow_soft_fail: bool = False, pnl=None) -> Dict[str, Any]:
+    """
+    Vectorized resolve_cutoff over N alphas with the same rules and decisions.
+
+    `frame` holds one column per field: alpha_id, region, fitness, sharpe and
+    optionally frequency, universe, turnover, weight_concentration,
+    sub_universe_sharpe and ladder_sharpe_<period>. Missing values are NaN.
+
+    Rows are grouped by (region, frequency, universe) and each group is
+    evaluated with its compiled policy as NumPy masks.
+
+    `pnl` is an optional (N, W) daily PnL matrix aligned to the correlation
+    pool's dates; it fills the self_correlation column in one blocked
+    matrix product against the pool, skipping each alpha's own row.
+
+    Returns columnar results: boolean masks per rule under hard_fail /
+    soft_fail / pass, and a final_decision array.
+    """
+    cols = _columns(frame)
+    alpha_id = np.asarray(cols["alpha_id"])
+    n = len(alpha_id)
+
+    metric_cols: Dict[str, np.ndarray] = {}
+    for name in cols:
+        if name in ("alpha_id",) + CONTEXT_KEYS:
+            continue
+        try:
+            metric_cols[name] = _float_col(cols, name, n)
+        except (TypeError, ValueError):
+            # 非数值列（theme 之类）不参与判定
+            continue
+    if pnl is not None and "self_correlation" not in metric_cols:
+        metric_cols["self_correlation"] = get_pool().max_correlation_many(
+            pnl, exclude=[str(a) for a in alpha_id]
+        ).astype(np.float64)
+
+    context = [
+        np.asarray(cols[k]).astype(str) if k in cols else np.full(n, None, dtype=object)
+        for k in CONTEXT_KEYS
+    ]
+
+    hard_fail: Dict[str, np.ndarray] = {}
+    soft_fail: Dict[str, np.ndarray] = {}
+    passed: Dict[str, np.ndarray] = {}
+
+    def scatter(target: Dict[str, np.ndarray], masks: Dict[str, np.ndarray], rows: np.ndarray):
+        for name, m in masks.items():
+            if name not in target:
+                target[name] = np.zeros(n, dtype=bool)
+            target[name][rows] = m
+
+    rule_set = load_rule_set()
+    groups = list(dict.fromkeys(zip(*context))) if n else []
+    for key in groups:
+        if len(groups) == 1:
+            rows = np.arange(n)
+        else:
+            rows = np.flatnonzero(
+                np.logical_and.reduce([c == k for c, k in zip(context, key)])
+            )
+        masks = rule_set.resolve(*key).masks(
+            {name: col[rows] for name, col in metric_cols.items()}, len(rows)
+        )
+        scatter(hard_fail, masks["hard_fail"], rows)
+        scatter(soft_fail, masks["soft_fail"], rows)
+        scatter(passed, masks["pass"], rows)
+
+    # ---------- Final decision ----------
+    any_hard = np.logical_or.reduce(list(hard_fail.values())) if hard_fail else np.zeros(n, bool)
+    any_soft = np.logical_or.reduce(list(soft_fail.values())) if soft_fail else np.zeros(n, bool)
+
+    final = np.full(n, "PASS", dtype=object)
+    if allow_soft_fail:
+        final[any_soft] = "REVIEW"
+    final[any_hard] = "REJECT"
+
+    return {
+        "alpha_id": alpha_id,
+        "hard_fail": hard_fail,
+        "soft_fail": soft_fail,
+        "pass": passed,
+        "final_decision": final,
+    }
@@ -0,0 +1,63 @@
+from typing import Dict, Optional
+
+from db import pg_conn
+from metrics_wide import WIDE_TABLE
+from tools.cutoff_rules import load_rule_set
+
+
+def screen_alphas(
+    region: Optional[str] = None,
+    frequency: Optional[str] = None,
+    universe: Optional[str] = None,
+    include_soft: bool = False,
+    limit: int = 100,
+) -> Dict:
+    """
+    List alphas that pass the cutoff policy for a context, evaluated inside
+    Postgres on the wide metrics table.
+
+    Hard rules are always applied; soft rules only with include_soft.
+    Rules without a wide-table column are reported under skipped_rules.
+    """
+    if not region:
+        return {"ok": False, "error": "region is required", "data": None}
+
+    policy = load_rule_set().resolve(region, frequency, universe)
+    where, params, skipped = policy.to_sql(include_soft=include_soft)
+
+    filters = ["region = %s"]
+    filter_params = [region]
+    if universe:
+        filters.append("universe = %s")
+        filter_params.append(universe)
+
+    sql = f"""
+        SELECT
+            alpha_id,
+            region,
+            universe,
+            delay,
+            is_ic_sharpe,
+            is_ic_fitness,
+            is_ic_turnover
+        FROM {WIDE_TABLE}
+        WHERE {" AND ".join(filters)}
+          AND {where}
+        ORDER BY is_ic_fitness DESC NULLS LAST
+        LIMIT %s
+    """
+
+    try:
+        with pg_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, filter_params + params + [limit])
+                rows = cur.fetchall()
+    except Exception as e:
+        return {"ok": False, "error": str(e), "data": None}
+
+    return {
+        "ok": True,
+        "data": rows,
+        "skipped_rules": skipped,
+        "error": None,
+    }
@@ -0,0 +1,195 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+from psycopg2.extras import execute_values
+
+from db import pg_conn
+from sim.scheduler import CANCELLED, DONE, FAILED, QUEUED, RUNNING, SKIPPED, SimJob, SimScheduler
+from tools.get_backtest_metrics import iter_backtest_metrics
+
+_SCHEDULER: Optional[SimScheduler] = None
+_LOCK = threading.Lock()
+
+# 本地模拟的结果和平台回测写在同一张表里，alpha_id 用 job key 派生，
+# 同一个规范化表达式 + settings 永远对应同一个 alpha_id
+LOCAL_ALPHA_PREFIX = "local_"
+
+SIM_RESULTS_DDL = """
+ALTER TABLE alpha_backtest_results ADD COLUMN IF NOT EXISTS expression TEXT
+"""
+
+
+def local_alpha_id(key: str) -> str:
+    return LOCAL_ALPHA_PREFIX + key
+
+
+def ensure_sim_results_columns(cur) -> None:
+    cur.execute(SIM_RESULTS_DDL)
+
+
+def _known_keys(keys: List[str]) -> List[str]:
+    """已经在 alpha_backtest_results 里的 key，走 (alpha_id, updated_at) 索引。"""
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT DISTINCT alpha_id FROM alpha_backtest_results WHERE alpha_id = ANY(%s)",
+                ([local_alpha_id(k) for k in keys],),
+            )
+            rows = cur.fetchall()
+    return [r["alpha_id"][len(LOCAL_ALPHA_PREFIX):] for r in rows]
+
+
+def _persist(jobs: List[SimJob]) -> None:
+    rows = [
+        (
+            local_alpha_id(j.key),
+            j.expression,
+            j.result["sharpe"],
+            j.result["fitness"],
+            j.result["turnover"],
+            j.result["drawdown"],
+            j.result["margin"],
+        )
+        for j in jobs
+    ]
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                INSERT INTO alpha_backtest_results
+                    (alpha_id, expression, sharpe, fitness, turnover, max_drawdown, margin, updated_at)
+                VALUES %s
+                """,
+                rows,
+                template="(%s, %s, %s, %s, %s, %s, %s, now())",
+                page_size=1000,
+            )
+
+
+def _get_scheduler() -> SimScheduler:
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _LOCK:
+            if _SCHEDULER is None:
+                path = os.getenv("SIM_PANEL_PATH")
+                if not path:
+                    raise RuntimeError("Missing SIM_PANEL_PATH (local panel data for simulation)")
+
+                persist = os.getenv("SIM_PERSIST", "1") == "1"
+                if persist:
+                    with pg_conn() as conn:
+                        with conn.cursor() as cur:
+                            ensure_sim_results_columns(cur)
+
+                _SCHEDULER = SimScheduler(
+                    path,
+                    workers=int(os.getenv("SIM_WORKERS", str(os.cpu_count() or 4))),
+                    chunk_size=int(os.getenv("SIM_CHUNK_SIZE", "16")),
+                    cache_bytes=int(os.getenv("SIM_CACHE_MB", "512")) * 1024 * 1024,
+                    known=_known_keys if persist else None,
+                    persist=_persist if persist else None,
+                )
+    return _SCHEDULER
+
+
+def _round(metrics: Dict[str, float]) -> Dict[str, float]:
+    return {k: round(v, 6 if k == "margin" else 4) for k, v in metrics.items()}
+
+
+def enqueue_simulations(
+    expressions: List[str],
+    universe: Optional[str] = None,
+    delay: int = 1,
+    neutralization: str = "MARKET",
+    priority: int = 0,
+) -> Dict:
+    """
+    Queue a batch of local simulations and return immediately with a batch_id.
+
+    Expressions are deduplicated on their canonical form + settings, against
+    this session's queue and against alpha_backtest_results (reported as
+    skipped; poll_simulations returns their stored metrics).
+    """
+    if not expressions:
+        return {"ok": False, "error": "expressions is required", "data": None}
+
+    try:
+        summary = _get_scheduler().submit(
+            expressions, priority=priority,
+            universe=universe, delay=delay, neutralization=neutralization,
+        )
+    except Exception as e:
+        return {"ok": False, "error": str(e), "data": None}
+
+    return {"ok": True, "data": summary, "error": None}
+
+
+def poll_simulations(batch_id: str, limit: int = 50, offset: int = 0) -> Dict:
+    """
+    Progress of a batch plus finished results, best sharpe first, one page
+    at a time.
+    """
+    if not batch_id:
+        return {"ok": False, "error": "batch_id is required", "data": None}
+
+    try:
+        jobs = _get_scheduler().batch_jobs(batch_id)
+    except Exception as e:
+        return {"ok": False, "error": str(e), "data": None}
+    if jobs is None:
+        return {"ok": False, "error": f"unknown batch_id: {batch_id}", "data": None}
+
+    counts = {s: 0 for s in (QUEUED, RUNNING, DONE, FAILED, CANCELLED, SKIPPED)}
+    for j in jobs:
+        counts[j.status] += 1
+
+    finished = [j for j in jobs if j.status in (DONE, FAILED, SKIPPED)]
+    finished.sort(key=lambda j: -j.result["sharpe"] if j.result else float("inf"))
+
+    page = finished[offset:offset + limit]
+    stored = {}
+    skipped_ids = [local_alpha_id(j.key) for j in page if j.status == SKIPPED]
+    if skipped_ids:
+        try:
+            for chunk in iter_backtest_metrics(skipped_ids):
+                stored.update((m["alpha_id"], m) for m in chunk)
+        except Exception as e:
+            return {"ok": False, "error": str(e), "data": None}
+
+    results = []
+    for j in page:
+        item = {"alpha_id": local_alpha_id(j.key), "expression": j.expression, "status": j.status}
+        if j.result:
+            item["metrics"] = _round(j.result)
+        elif item["alpha_id"] in stored:
+            item["stored_metrics"] = stored[item["alpha_id"]]
+        if j.error:
+            item["error"] = j.error
+        results.append(item)
+
+    return {
+        "ok": True,
+        "data": {
+            "batch_id": batch_id,
+            "complete": counts[QUEUED] == 0 and counts[RUNNING] == 0,
+            "counts": counts,
+            "results": results,
+            "next_offset": offset + limit if offset + limit < len(finished) else None,
+        },
+        "error": None,
+    }
+
+
+def cancel_simulations(batch_id: str) -> Dict:
+    """Cancel the unfinished jobs of a batch (jobs shared with other batches keep running)."""
+    if not batch_id:
+        return {"ok": False, "error": "batch_id is required", "data": None}
+
+    try:
+        cancelled = _get_scheduler().cancel(batch_id)
+    except Exception as e:
+        return {"ok": False, "error": str(e), "data": None}
+
+    return {"ok": True, "data": {"batch_id": batch_id, "cancelled": cancelled}, "error": None}
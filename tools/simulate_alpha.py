@@ -1,21 +1,99 @@
-from json import tool
-from typing import Dict
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from sim.compiler import BatchEvaluator
+from sim.engine import simulate
+from sim.expr import ExpressionError
+from sim.panel import Panel
+from sim.store import open_panel
+
+_PANEL: Optional[Panel] = None
+_EVALUATOR: Optional[BatchEvaluator] = None
+
+
+def _get_panel() -> Panel:
+    global _PANEL
+    if _PANEL is not None:
+        return _PANEL
+
+    path = os.getenv("SIM_PANEL_PATH")
+    if not path:
+        raise RuntimeError("Missing SIM_PANEL_PATH (local panel data for simulation)")
+
+    # 目录 -> PanelStore（memmap，多进程共享 page cache）；文件 -> .npz
+    _PANEL = open_panel(path)
+    return _PANEL
+
+
+def _get_evaluator() -> BatchEvaluator:
+    """进程内共享的求值器：多次调用之间复用相同子表达式的中间结果。"""
+    global _EVALUATOR
+    if _EVALUATOR is None:
+        max_mb = int(os.getenv("SIM_CACHE_MB", "1024"))
+        _EVALUATOR = BatchEvaluator(_get_panel(), max_bytes=max_mb * 1024 * 1024)
+    return _EVALUATOR
+
+
+def simulate_pnl(
+    expression: str,
+    universe: Optional[str] = None,
+    delay: int = 1,
+    neutralization: str = "MARKET",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(dates, daily pnl) of an expression on the local panel."""
+    evaluator = _get_evaluator()
+    result = simulate(
+        expression,
+        evaluator.panel,
+        alpha=evaluator.evaluate(expression),
+        delay=delay,
+        universe=universe,
+        neutralization=neutralization,
+    )
+    return evaluator.panel.dates, result["pnl"]
 
 
 def simulate_alpha(
     expression: str,
-    universe: str = "US",
-    delay: int = 1
+    universe: Optional[str] = None,
+    delay: int = 1,
+    neutralization: str = "MARKET",
 ) -> Dict:
     """
-    Run a backtest simulation for a new alpha expression.
+    Run a local backtest simulation for a new alpha expression.
+
+    This is an offline pre-screen on the local panel (SIM_PANEL_PATH), not a
+    BRAIN simulation; numbers approximate the platform's definitions.
     """
+    if not expression:
+        return {"expression": expression, "status": "error", "error": "expression is required"}
+
+    try:
+        evaluator = _get_evaluator()
+        result = simulate(
+            expression,
+            evaluator.panel,
+            alpha=evaluator.evaluate(expression),
+            delay=delay,
+            universe=universe,
+            neutralization=neutralization,
+        )
+    except KeyError as e:
+        return {"expression": expression, "status": "error", "error": e.args[0]}
+    except (ExpressionError, RuntimeError) as e:
+        return {"expression": expression, "status": "error", "error": str(e)}
+
     return {
         "expression": expression,
         "status": "completed",
         "metrics": {
-            "sharpe": 1.31,
-            "fitness": 1.02,
-            "turnover": 0.28
+            "sharpe": round(result["sharpe"], 4),
+            "fitness": round(result["fitness"], 4),
+            "turnover": round(result["turnover"], 4),
+            "returns": round(result["returns"], 4),
+            "drawdown": round(result["drawdown"], 4),
+            "margin": round(result["margin"], 6),
         }
     }
@@ -0,0 +1,286 @@
+# wq_async_client.py
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+import aiohttp
+
+import instrument
+from wq_client import IDEMPOTENT_METHODS, RETRY_STATUS, parse_retry_after
+
+T = TypeVar("T")
+
+
+class AsyncRateLimiter:
+    """
+    协程版的全局限速器：所有请求共享同一个每秒预算。
+    单线程事件循环内不需要锁，预约下一个时间槽后 await 到点即可。
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+
+    async def acquire(self) -> None:
+        if self.interval <= 0:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncWQClient:
+    """
+    asyncio 版 WorldQuant BRAIN client，接口与 WQClient 一致（get_json / post_json）。
+    Auth 同样是 Basic auth + POST /authentication，之后复用同一个 ClientSession。
+
+    - 一个 ClientSession + TCPConnector 连接池，所有协程共享 keep-alive 连接
+    - Semaphore 限制同时在飞的请求数
+    - AsyncRateLimiter 做全局每秒请求预算
+    - 重试 / Retry-After / 401 重新登录的语义与 WQClient 相同
+
+    用法：
+        async with AsyncWQClient(user, pwd, max_concurrency=200, rps=20) as wq:
+            docs = await wq.gather_json(urls)
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        base_url: str = "https://api.worldquantbrain.com",
+        timeout: float = 30.0,
+        max_retries: int = 6,
+        backoff_base: float = 0.8,
+        max_concurrency: int = 64,
+        rps: float = 0.0,
+    ):
+        self.username = username
+        self.password = password
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_concurrency = max_concurrency
+
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._limiter = AsyncRateLimiter(rps)
+        self._auth_lock = asyncio.Lock()
+        self._auth_generation = 0
+
+    async def open(self) -> "AsyncWQClient":
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self.session = aiohttp.ClientSession(
+                auth=aiohttp.BasicAuth(self.username, self.password),
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            await self._authenticate()
+        return self
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> "AsyncWQClient":
+        return await self.open()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _authenticate(self) -> None:
+        url = f"{self.base_url}/authentication"
+        async with self.session.post(url) as r:
+            # 401/403 => auth failed; raise to show exact reason
+            r.raise_for_status()
+
+    async def _reauthenticate(self, stale_generation: int) -> None:
+        # 多个协程可能同时拿到 401，只让第一个去重新登录
+        async with self._auth_lock:
+            if self._auth_generation != stale_generation:
+                return
+            await self._authenticate()
+            self._auth_generation += 1
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return delay
+        return random.uniform(0, min(60.0, self.backoff_base * (2 ** attempt)))
+
+    async def get_json(self, url: str) -> Any:
+        """
+        GET a URL and return parsed JSON.
+        Includes retry on transient errors and respects Retry-After if present.
+        """
+        return await self._request_json("GET", url)
+
+    async def post_json(self, url: str, payload: Optional[Dict[str, Any]] = None,
+                        idempotent: bool = False) -> Any:
+        return await self._request_json("POST", url, idempotent=idempotent, json=payload)
+
+    async def gather_json(self, urls: List[str]) -> List[Any]:
+        """并发 GET 一组 URL，结果顺序与 urls 一致。"""
+        return await asyncio.gather(*(self.get_json(u) for u in urls))
+
+    async def send(self, method: str, url: str, idempotent: Optional[bool] = None,
+                   **kwargs) -> Tuple[int, Any, bytes]:
+        """
+        发请求并处理传输层问题（与 WQClient._send 相同）：
+          - 连接错误 / 超时 / 429 / 5xx：退避重试，优先遵守 Retry-After
+          - 401：重新登录后重试一次
+        idempotent=False（不传时按 method 判断，POST / PATCH 是 False）只重试 429、401
+        和没连上的请求。
+        返回最后一次的 (status, headers, body)，非 2xx 由调用方处理。
+        """
+        if self.session is None:
+            await self.open()
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        with instrument.span("http", method=method, attrs={"url": url}) as sp:
+            status, headers, body = await self._send_retrying(method, url, idempotent, **kwargs)
+            sp.set(status=status)
+            return status, headers, body
+
+    async def _send_retrying(self, method: str, url: str, idempotent: bool,
+                             **kwargs) -> Tuple[int, Any, bytes]:
+        reauthed = False
+        attempt = 0
+
+        while True:
+            generation = self._auth_generation
+            try:
+                async with self._semaphore:
+                    await self._limiter.acquire()
+                    async with self.session.request(method, url, **kwargs) as resp:
+                        status = resp.status
+                        headers = resp.headers
+                        body = await resp.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                # ClientConnectorError：连接没建立起来，请求肯定没发出去
+                if attempt >= self.max_retries or not (
+                    idempotent or isinstance(e, aiohttp.ClientConnectorError)
+                ):
+                    raise
+                await self._sleep_backoff(self._backoff(attempt), "connection")
+                attempt += 1
+                continue
+
+            if status == 401 and not reauthed:
+                reauthed = True
+                instrument.count("http_reauth_total")
+                await self._reauthenticate(generation)
+                continue
+
+            retryable = status == 429 or (idempotent and status in RETRY_STATUS)
+            if retryable and attempt < self.max_retries:
+                # 退避在 semaphore 外面等，不占并发名额
+                await self._sleep_backoff(self._backoff(attempt, headers.get("Retry-After")), str(status))
+                attempt += 1
+                continue
+
+            return status, headers, body
+
+    @staticmethod
+    async def _sleep_backoff(delay: float, reason: str) -> None:
+        instrument.count("http_retries_total", reason=reason)
+        instrument.count("http_backoff_seconds_total", delay, reason=reason)
+        if reason == "429":
+            instrument.count("http_throttled_total")
+        await asyncio.sleep(delay)
+
+    async def _request_json(self, method: str, url: str, idempotent: Optional[bool] = None,
+                            **kwargs) -> Any:
+        status, headers, body = await self.send(method, url, idempotent, **kwargs)
+        return parse_json_body(method, url, status, headers, body)
+
+
+def parse_json_body(method: str, url: str, status: int, headers, body: bytes) -> Any:
+    text = body.decode("utf-8", errors="replace")
+    if "application/json" not in headers.get("Content-Type", ""):
+        raise RuntimeError(
+            f"Non-JSON response from {url}\n"
+            f"Status: {status}\n"
+            f"Content-Type: {headers.get('Content-Type')}\n"
+            f"Body (first 300 chars):\n{text[:300]}"
+        )
+
+    if status >= 400:
+        raise RuntimeError(f"{method} {url} failed with {status}: {text[:300]}")
+    return json.loads(text)
+
+
+# ========== 同步代码里复用同一个 client ==========
+# aiohttp 的 session 绑定在创建它的事件循环上。工具函数和 dump 脚本都是同步代码，
+# 这里起一个常驻的后台事件循环线程，共享一个 AsyncWQClient，
+# 同步调用方通过 submit() / run_sync() 把协程丢进去。
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_CLIENT: Optional[AsyncWQClient] = None
+_LOCK = threading.RLock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            t = threading.Thread(target=loop.run_forever, name="wq-async-loop", daemon=True)
+            t.start()
+            _LOOP = loop
+        return _LOOP
+
+
+def submit(coro: Awaitable[T]):
+    """把协程提交到后台事件循环，返回 concurrent.futures.Future。"""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop())
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    return submit(coro).result()
+
+
+def get_shared_client(
+    max_concurrency: Optional[int] = None,
+    rps: Optional[float] = None,
+) -> AsyncWQClient:
+    """
+    进程内共享的 AsyncWQClient（凭证从 WQ_USERNAME / WQ_PASSWORD 读取）。
+    并发和限速参数只在第一次创建时生效。
+    """
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+
+    username = os.getenv("WQ_USERNAME")
+    password = os.getenv("WQ_PASSWORD")
+    if not username or not password:
+        raise RuntimeError("Missing WQ_USERNAME/WQ_PASSWORD in .env")
+
+    async def _create() -> AsyncWQClient:
+        client = AsyncWQClient(
+            username=username,
+            password=password,
+            base_url=os.getenv("WQ_API_BASE", "https://api.worldquantbrain.com"),
+            max_concurrency=max_concurrency or int(os.getenv("WQ_ASYNC_CONCURRENCY", "64")),
+            rps=rps if rps is not None else float(os.getenv("WQ_ASYNC_RPS", "0")),
+        )
+        return await client.open()
+
+    with _LOCK:
+        if _CLIENT is None:
+            # 在后台循环里创建，保证 Semaphore / Lock / session 都绑定在那个循环上
+            _CLIENT = run_sync(_create())
+    return _CLIENT
@@ -1,9 +1,25 @@
 # wq_client.py
 from __future__ import annotations
 
+import json
+import random
+import threading
 import time
-from typing import Any, Dict, Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+import instrument
+from http_cache import ResponseCache
+
+# 429 限流 + 5xx 服务端错误才重试；4xx 其他状态直接交给调用方
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 超时 / 5xx / 连接中途断开时服务端可能已经处理了请求，只有幂等的方法能放心重发。
+# POST（提交模拟等）默认只在确定没被处理时重试：429、401 重新登录、连接没建立起来。
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
 
 
 class WQClient:
@@ -23,6 +39,8 @@ class WQClient:
         timeout: float = 30.0,
         max_retries: int = 6,
         backoff_base: float = 0.8,
+        pool_size: int = 32,
+        cache: Optional[ResponseCache] = None,
     ):
         self.username = username
         self.password = password
@@ -30,9 +48,18 @@ class WQClient:
         self.timeout = timeout
         self.max_retries = max_retries
         self.backoff_base = backoff_base
+        self.cache = cache
 
         self.session = requests.Session()
         self.session.auth = (self.username, self.password)
+        # 并发调用方共享同一个 session：连接池要至少和 worker 数一样大，
+        # 否则多出来的连接用完即丢，keep-alive 形同虚设
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._auth_lock = threading.Lock()
+        self._auth_generation = 0
 
         self._authenticate()
 
@@ -44,20 +71,148 @@ class WQClient:
         # 有些返回是 {"token":...} / {"user":...}，这里不强依赖结构
         # 只要 session 后续请求不 401 就算成功
 
-    def get_json(self, url: str) -> Any:
+    def get_json(self, url: str,
+                 cache_ttl: Union[None, float, Callable[[Any], Optional[float]]] = None) -> Any:
         """
         GET a URL and return parsed JSON.
         Includes retry on transient errors and respects Retry-After if present.
+
+        With a ResponseCache attached, fresh entries are served locally; stale
+        ones are revalidated with If-None-Match / If-Modified-Since.
+        cache_ttl overrides the cache's default TTL for this URL; it may be a
+        function of the parsed response (e.g. short for documents that are
+        still changing).
+        """
+        if self.cache is None:
+            return self._request_json("GET", url)
+
+        entry = self.cache.get(url)
+        if entry is not None and entry.fresh:
+            instrument.count("http_cache_total", result="fresh")
+            return json.loads(entry.body)
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        resp = self._send("GET", url, headers=headers)
+        if resp.status_code == 304 and entry is not None:
+            instrument.count("http_cache_total", result="revalidated")
+            data = json.loads(entry.body)
+            self.cache.refresh(url, ttl=cache_ttl(data) if callable(cache_ttl) else cache_ttl)
+            return data
+        instrument.count("http_cache_total", result="miss")
+
+        data = self._parse_json(resp, url)
+        self.cache.put(
+            url,
+            resp.content,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            ttl=cache_ttl(data) if callable(cache_ttl) else cache_ttl,
+        )
+        return data
+
+    def post_json(self, url: str, payload: Optional[Dict[str, Any]] = None,
+                  idempotent: bool = False) -> Any:
+        """POST JSON. Retried on timeouts / 5xx only if the caller says it is idempotent."""
+        return self._request_json("POST", url, idempotent=idempotent, json=payload)
+
+    def poll_json(self, url: str, max_wait: float = 300.0, min_poll: float = 1.0) -> Any:
+        """
+        GET a resource the server is still generating (alpha recordsets,
+        simulation progress): while it answers 2xx with Retry-After, sleep and
+        ask again, then return the parsed JSON. Not cached.
         """
-        return self._request_json("GET", url)
+        deadline = time.monotonic() + max_wait
+        while True:
+            resp = self._send("GET", url)
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if retry_after is None or resp.status_code >= 300:
+                return self._parse_json(resp, url)
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} still not ready after {max_wait:.0f}s")
+            time.sleep(max(min_poll, retry_after))
 
-    def post_json(self, url: str, payload: Optional[Dict[str, Any]] = None) -> Any:
-        return self._request_json("POST", url, json=payload)
+    def _reauthenticate(self, stale_generation: int) -> None:
+        # 多个线程可能同时拿到 401，只让第一个去重新登录
+        with self._auth_lock:
+            if self._auth_generation != stale_generation:
+                return
+            self._authenticate()
+            self._auth_generation += 1
 
- 
-    def _request_json(self, method: str, url: str):
-        resp = self.session.request(method, url)
+    def _backoff(self, attempt: int, resp: Optional[requests.Response] = None) -> float:
+        if resp is not None:
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after
+        # full jitter: [0, base * 2^attempt]，上限 60s
+        return random.uniform(0, min(60.0, self.backoff_base * (2 ** attempt)))
 
+    def _send(self, method: str, url: str, idempotent: Optional[bool] = None,
+              **kwargs) -> requests.Response:
+        """
+        发请求并处理传输层问题：
+          - 连接错误 / 超时 / 429 / 5xx：指数退避 + jitter 重试，优先遵守 Retry-After
+          - 401：session 过期，重新 _authenticate() 后重试一次
+        idempotent=False（不传时按 method 判断，POST / PATCH 是 False）只重试 429、401
+        和没连上的请求，免得服务端其实已经收到的请求被再发一遍。
+        返回最后一次的 Response（可能仍是非 2xx，由调用方决定如何处理）。
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        with instrument.span("http", method=method, attrs={"url": url}) as sp:
+            resp = self._send_retrying(method, url, idempotent, **kwargs)
+            sp.set(status=resp.status_code)
+            return resp
+
+    def _send_retrying(self, method: str, url: str, idempotent: bool, **kwargs) -> requests.Response:
+        reauthed = False
+        attempt = 0
+
+        while True:
+            generation = self._auth_generation
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries or not (idempotent or _not_sent(e)):
+                    raise
+                self._sleep_backoff(self._backoff(attempt), "connection")
+                attempt += 1
+                continue
+
+            if resp.status_code == 401 and not reauthed:
+                reauthed = True
+                instrument.count("http_reauth_total")
+                self._reauthenticate(generation)
+                continue
+
+            retryable = resp.status_code == 429 or (idempotent and resp.status_code in RETRY_STATUS)
+            if retryable and attempt < self.max_retries:
+                self._sleep_backoff(self._backoff(attempt, resp), str(resp.status_code))
+                attempt += 1
+                continue
+
+            return resp
+
+    @staticmethod
+    def _sleep_backoff(delay: float, reason: str) -> None:
+        # 429 单独计数：看一次 run 里有多少时间耗在 WQ 的限流上
+        instrument.count("http_retries_total", reason=reason)
+        instrument.count("http_backoff_seconds_total", delay, reason=reason)
+        if reason == "429":
+            instrument.count("http_throttled_total")
+        time.sleep(delay)
+
+    def _request_json(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs) -> Any:
+        return self._parse_json(self._send(method, url, idempotent, **kwargs), url)
+
+    def _parse_json(self, resp: requests.Response, url: str) -> Any:
         if "application/json" not in resp.headers.get("Content-Type", ""):
             raise RuntimeError(
                 f"Non-JSON response from {url}\n"
@@ -70,5 +225,26 @@ class WQClient:
         return resp.json()
 
 
+def _not_sent(exc: Exception) -> bool:
+    """连接没建立起来（拒绝连接 / DNS / 连接超时），请求肯定没到服务端。"""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
 
-        raise RuntimeError(f"Request failed after retries: {method} {url}")
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 可能是秒数，也可能是 HTTP-date。"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,281 @@
+# wq_simulations.py
+"""
+在 BRAIN 上批量跑模拟：POST /simulations -> 轮询进度地址 -> 取 alpha 详情 -> 写库。
+
+账号能同时跑的模拟数有限（slots）。每个模拟是同一个事件循环上的一个协程：
+  - 先拿 slot（asyncio.Semaphore，等待者先到先得，本身就是一个排队队列）
+  - POST /simulations，响应头 Location 是进度地址
+  - GET 进度地址：没跑完时响应带 Retry-After，按它 sleep 之后再问；没有 Retry-After 就是跑完了
+  - 跑完立即释放 slot，排队的下一个马上提交；取详情和写库都在 slot 外面做
+一个线程就能挂着成千上万个待跑的模拟，slot 始终是满的。
+
+提交被拒（429，超过并发上限）交给 AsyncWQClient 的重试 + Retry-After 处理。
+POST /simulations 不是幂等的：超时 / 5xx 时服务端可能已经开跑，不自动重发（重发会多扣一次额度），
+直接算这个模拟失败。
+结果直接写进 wq_alpha / wq_backtest_metrics / 宽表，和 dump 脚本走同一条写库路径；
+进程里第一次写之前先补齐这条路径要的 schema（ensure_write_schema），没跑过 dump 的库也能写。
+
+提交之前按表达式指纹去重：库里已有同指纹、同 settings（region / universe / delay / neutralization
+之外，decay / truncation / pasteurization 等也都一致）的 alpha 直接返回（status=duplicate），
+同一批里等价的写法只提交一次。
+
+对着本地 stub 测试：WQ_API_BASE=http://127.0.0.1:8080
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from db import pg_conn
+from dump_wq_alphas_to_postgres import (
+    _alpha_row,
+    _metric_rows,
+    _parse_alpha,
+    _write_batch,
+    ensure_write_schema,
+    parse_backtest_metrics,
+)
+from fingerprint import find_by_fingerprint
+from sim.compiler import fingerprint
+from wq_async_client import AsyncWQClient, parse_json_body
+from wq_client import parse_retry_after
+
+DEFAULT_SETTINGS = {
+    "instrumentType": "EQUITY",
+    "region": "USA",
+    "universe": "TOP3000",
+    "delay": 1,
+    "decay": 0,
+    "neutralization": "INDUSTRY",
+    "truncation": 0.08,
+    "pasteurization": "ON",
+    "unitHandling": "VERIFY",
+    "nanHandling": "OFF",
+    "language": "FASTEXPR",
+    "visualization": False,
+}
+
+
+# wq_alpha 里单独成列的 settings；其余的（visualization 不影响结果，除外）按 wq_alpha.settings 比较
+_COLUMN_SETTINGS = ("region", "universe", "delay", "neutralization")
+_IGNORED_SETTINGS = ("visualization",)
+
+
+class SimulationError(RuntimeError):
+    pass
+
+
+def simulation_payload(expression: str, **settings: Any) -> Dict[str, Any]:
+    return {
+        "type": "REGULAR",
+        "settings": {**DEFAULT_SETTINGS, **settings},
+        "regular": expression,
+    }
+
+
+def find_existing(expression: str, settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            return find_by_fingerprint(
+                cur, fingerprint(expression),
+                region=settings.get("region"),
+                universe=settings.get("universe"),
+                delay=settings.get("delay"),
+                neutralization=settings.get("neutralization"),
+                settings={k: v for k, v in settings.items()
+                          if k not in _COLUMN_SETTINGS + _IGNORED_SETTINGS},
+            )
+
+
+_SCHEMA_READY = False
+_SCHEMA_LOCK = threading.Lock()
+
+
+def _ensure_schema(conn, cur) -> None:
+    global _SCHEMA_READY
+    with _SCHEMA_LOCK:
+        if not _SCHEMA_READY:
+            ensure_write_schema(conn, cur)
+            _SCHEMA_READY = True
+
+
+def prepare_database() -> None:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            _ensure_schema(conn, cur)
+
+
+def write_alpha_result(alpha: Dict[str, Any], metrics: Dict[str, float]) -> None:
+    with pg_conn() as conn:
+        with conn.cursor() as cur:
+            _ensure_schema(conn, cur)
+            _write_batch(conn, cur, [_alpha_row(alpha)], _metric_rows(alpha["alpha_id"], metrics))
+
+
+class SimulationPipeline:
+    """
+    用法（在 client 所在的事件循环里）：
+        pipeline = SimulationPipeline(client, slots=3)
+        results = await pipeline.run([(expr, {"universe": "TOP1000"}), ...])
+    """
+
+    def __init__(
+        self,
+        client: AsyncWQClient,
+        slots: int = 3,
+        min_poll: float = 1.0,
+        max_poll: float = 60.0,
+        timeout: float = 6 * 3600,
+        write: bool = True,
+        dedupe: bool = True,
+    ):
+        self.client = client
+        self.slots = slots
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.timeout = timeout
+        self.write = write
+        self.dedupe = dedupe
+        self._slots = asyncio.Semaphore(slots)
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "duplicates": 0, "polls": 0}
+
+    async def _start(self, payload: Dict[str, Any]) -> str:
+        url = f"{self.client.base_url}/simulations"
+        status, headers, body = await self.client.send("POST", url, idempotent=False, json=payload)
+        if status >= 400:
+            text = body.decode("utf-8", errors="replace")
+            raise SimulationError(f"POST {url} failed with {status}: {text[:300]}")
+        location = headers.get("Location")
+        if not location:
+            raise SimulationError(f"POST {url} returned no Location header")
+        return urljoin(self.client.base_url + "/", location)
+
+    async def _wait(self, url: str) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            status, headers, body = await self.client.send("GET", url)
+            self.stats["polls"] += 1
+            data = parse_json_body("GET", url, status, headers, body) if body else {}
+
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            if retry_after is None:
+                return data
+            if time.monotonic() > deadline:
+                raise SimulationError(f"simulation {url} still running after {self.timeout:.0f}s")
+            await asyncio.sleep(min(self.max_poll, max(self.min_poll, retry_after)))
+
+    async def run_one(self, expression: str, **settings: Any) -> Dict[str, Any]:
+        payload = simulation_payload(expression, **settings)
+
+        if self.dedupe:
+            loop = asyncio.get_running_loop()
+            existing = await loop.run_in_executor(None, find_existing, expression, payload["settings"])
+            if existing:
+                self.stats["duplicates"] += 1
+                return {
+                    "expression": expression,
+                    "status": "duplicate",
+                    "alpha_id": existing[0]["alpha_id"],
+                    "alpha_ids": [r["alpha_id"] for r in existing],
+                }
+
+        async with self._slots:
+            location = await self._start(payload)
+            self.stats["submitted"] += 1
+            progress = await self._wait(location)
+
+        alpha_id = progress.get("alpha")
+        if progress.get("status") == "ERROR" or not alpha_id:
+            raise SimulationError(progress.get("message") or f"simulation failed: {progress}")
+
+        detail = await self.client.get_json(f"{self.client.base_url}/alphas/{alpha_id}")
+        alpha = _parse_alpha(detail)
+        metrics = parse_backtest_metrics(detail)
+        if self.write:
+            # psycopg2 是阻塞的，放到线程里写，不卡事件循环
+            await asyncio.get_running_loop().run_in_executor(None, write_alpha_result, alpha, metrics)
+
+        return {"expression": expression, "status": "completed", "alpha_id": alpha_id, "metrics": metrics}
+
+    async def run(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        所有模拟同时排队，结果顺序与 items 一致；单个失败不影响其它。
+        指纹和 settings 都相同的条目共用一次模拟。
+        """
+        if self.write or self.dedupe:
+            # schema 有问题要在提交（花额度）之前暴露出来，而不是模拟跑完写库时
+            await asyncio.get_running_loop().run_in_executor(None, prepare_database)
+
+        async def guarded(expression: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                result = await self.run_one(expression, **settings)
+            except Exception as e:
+                self.stats["failed"] += 1
+                return {"expression": expression, "status": "error", "error": str(e)}
+            if result["status"] == "completed":
+                self.stats["completed"] += 1
+            return result
+
+        tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        order = []
+        for expression, settings in items:
+            key = (fingerprint(expression), repr(sorted(settings.items())))
+            if key not in tasks:
+                tasks[key] = asyncio.ensure_future(guarded(expression, settings))
+            order.append((expression, key))
+
+        await asyncio.gather(*tasks.values())
+        return [{**tasks[key].result(), "expression": expression} for expression, key in order]
+
+
+def simulate_remote(
+    items: List[Tuple[str, Dict[str, Any]]],
+    slots: int = 3,
+    write: bool = True,
+    dedupe: bool = True,
+    client: Optional[AsyncWQClient] = None,
+) -> List[Dict[str, Any]]:
+    """同步入口：在共享的后台事件循环上跑完一批模拟。"""
+    import wq_async_client
+
+    client = client or wq_async_client.get_shared_client()
+    pipeline = SimulationPipeline(client, slots=slots, write=write, dedupe=dedupe)
+    return wq_async_client.run_sync(pipeline.run(items))
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import os
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("expressions", help="每行一个表达式的文件")
+    parser.add_argument("--slots", type=int, default=int(os.getenv("WQ_SIM_SLOTS", "3")),
+                        help="账号的并发模拟上限")
+    parser.add_argument("--region")
+    parser.add_argument("--universe")
+    parser.add_argument("--delay", type=int)
+    parser.add_argument("--neutralization")
+    parser.add_argument("--no-write", action="store_true", help="只打印结果，不写库")
+    parser.add_argument("--no-dedupe", action="store_true", help="不查库里的同指纹 alpha")
+    args = parser.parse_args()
+
+    settings = {
+        k: v for k, v in {
+            "region": args.region,
+            "universe": args.universe,
+            "delay": args.delay,
+            "neutralization": args.neutralization,
+        }.items() if v is not None
+    }
+    with open(args.expressions) as f:
+        exprs = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    for r in simulate_remote([(e, settings) for e in exprs], slots=args.slots,
+                             write=not args.no_write, dedupe=not args.no_dedupe):
+        print(json.dumps(r, default=str))